@@ -3,8 +3,9 @@ This module provides an abstract base class for defining agents in a reinforceme
 """
 
 from abc import ABC, abstractmethod
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 import numpy as np
+from .telemetry import Telemetry
 
 
 class Agent(ABC):
@@ -12,6 +13,9 @@ class Agent(ABC):
     Agent base class.
     """
 
+    # the collector the agent publishes its measurements to, see `set_telemetry`
+    telemetry: Optional[Telemetry] = None
+
     def __init__(self, action_space, player):
         """
         Initialize the Agent.
@@ -26,6 +30,21 @@ class Agent(ABC):
         self.action_space = action_space
         self.player: int = player
 
+    def set_telemetry(self, telemetry: Optional[Telemetry]) -> None:
+        """
+        Publish the measurements of the agent to a collector.
+
+        Agents that measure their internals, such as the phases of a search, override
+        this to start measuring. The latency of the moves is measured by the caller of
+        `act`, see `tournament.play_game`.
+
+        Parameters
+        ----------
+        telemetry : Telemetry or None
+            The collector, None to stop publishing.
+        """
+        self.telemetry = telemetry
+
     @abstractmethod
     def act(
         self, observation: Dict[str, np.ndarray], reward: float, info: Dict[str, Any]
@@ -2,29 +2,136 @@
 This module provides an agent implementation for Monte Carlo Tree Search (MCTS) in the Quoridor game.
 """
 
-from typing import Optional, Set
+from typing import Callable, Dict, List, Optional, Set, Tuple
 from quoridor import Quoridor
+import numpy as np
 
 from .agent import Agent
+from .telemetry import Telemetry, peak_memory
+from .time_manager import TimeManager
+from .tree import NO_CHILDREN, ArrayTree
+from Environment.state import QuoridorState
 from Environment.utils import (
-    convert_quoridor_move_to_discrete,
+    NUM_ACTIONS,
     convert_observation_quoridor_game,
+    state_to_observation,
 )
+from Policies.evaluation import Evaluation
 from Policies.policy import ShortestPathPolicy
+from Policies.rollout import RolloutEngine
 from math import sqrt, log
-from copy import deepcopy
+import multiprocessing as mp
+from multiprocessing.connection import Connection
 import random
 import time
 
 
 EXPLORATION_CONSTANT = 1.414
+C_PUCT = 1.5
+VIRTUAL_LOSS = 1
+PARALLEL_MODES = ("root", "leaf")
+# timer name -> the methods of the agent and of the array tree timed by
+# `MCTSAgent.set_telemetry`
+TIMED_METHODS = {
+    "select": ("_best_child", "_puct_traversal"),
+    "expand": ("_expand",),
+    "rollout": ("_rollout_state",),
+    "backpropagate": ("_backpropagate",),
+    "evaluate": ("_evaluate_states",),
+}
+TIMED_TREE_METHODS = {
+    "select": ("select_uct", "select_puct"),
+    "expand": ("expand",),
+    "backpropagate": ("backpropagate",),
+}
+
+# (observations, action_masks, players) -> (priors, values), see `MCTSAgent`
+Evaluator = Callable[
+    [np.ndarray, np.ndarray, np.ndarray], Tuple[np.ndarray, np.ndarray]
+]
 
 
 class MCTSAgent(Agent):
     """
     An agent that uses Monte Carlo Tree Search to select actions in the Quoridor game.
+
+    Statistics are kept in a transposition table keyed on the Zobrist key of the
+    position, so nodes reached through different move orders share their visits and
+    rewards. The table outlives a move: the node of the position after the reply of
+    the opponent becomes the next root, and only its subtree is kept.
+
+    Nodes hold a `QuoridorState` snapshot without move history, so expanding a node
+    or starting a rollout from it takes the same time at any ply.
+
+    With more than one worker the search runs in worker processes, in one of two
+    modes:
+
+    - "root": every worker process grows its own tree from the root, and the visits
+      and rewards of the children of the roots are summed. Each worker gets exactly
+      one search task per move, so no tree is left idle.
+    - "leaf": a single tree is grown and the rollouts of a batch of leaves run in
+      parallel. A virtual loss on the path to a pending leaf steers the selection of
+      the next leaves of the batch to other parts of the tree.
+
+    With `rollout_plies` a rollout is cut after that many plies and the position it
+    reached is valued by an `Evaluation` of the shortest paths and walls left, as a
+    reward between -1 and 1; with 0 plies the leaf itself is valued, without rollout.
+
+    The search stops after `max_iterations` iterations (per tree in root mode) or
+    `max_time` seconds, whichever comes first, and plays the best move found so far.
+    The deadline is checked on the monotonic clock before every iteration (every
+    batch in leaf mode and PUCT), so a move overruns it by at most one iteration or
+    batch, and the first one always runs. With a `time_manager` the budget of a move
+    is the smaller of `max_time` and the share of the game clock the manager gives
+    to the position, and the time of every move is charged to the clock. The
+    iterations, time and tree size of the last search are kept in `search_info`.
+
+    With a collector set by `set_telemetry` the phases of the search are timed and
+    the statistics of every search are published to it, see `TIMED_METHODS`. The
+    "select" timer counts a call per level of the tree in UCT and per traversal in
+    PUCT, and the rollouts of the parallel modes run in the workers, untimed.
+
+    With an `evaluator` the search is PUCT instead of UCT, as in AlphaZero: the
+    children of a node are selected by their value plus an exploration bonus
+    weighted by the prior probability of their move, and a leaf is valued by the
+    evaluator instead of a rollout. The evaluator is called on batches of
+    `batch_size` leaves, with the (B, 9, 9, 6) observations, the (B, 209) action
+    masks and the (B,) players to move (1 or 2) of the leaves. It returns the (B, 209)
+    priors and the (B,) values of the leaves for the players to move, between -1 and
+    1. The leaves of a batch are spread over the tree with a virtual loss, and the
+    most visited move is played. The PUCT search runs in this process, whatever
+    `num_workers`.
+
+    With a `tree_capacity` the tree is an `ArrayTree` of that many nodes instead of
+    `Node` objects and a transposition table: the statistics live in preallocated
+    arrays, children are selected with vectorized UCT or PUCT, and the state of a
+    node is rebuilt from the root during selection. The search then runs in this
+    process, and positions reached through different move orders are separate
+    nodes. The pool holds at least the root and its children, `1 + NUM_ACTIONS`
+    nodes, so the root can always be expanded. When the pool is full the search goes
+    on without expanding new nodes.
     """
 
+    class Entry:
+        """
+        The statistics of a position in the transposition table.
+        """
+
+        __slots__ = ("visits", "total_reward", "node")
+
+        def __init__(self, node: Optional["MCTSAgent.Node"] = None) -> None:
+            """
+            Initializes a new Entry instance.
+
+            Parameters:
+            -----------
+            node: MCTSAgent.Node, optional
+                A node of the position, used to reuse its subtree as root.
+            """
+            self.visits: int = 0
+            self.total_reward: int = 0
+            self.node: Optional["MCTSAgent.Node"] = node
+
     class Node:
         """
         A node in the MCTS tree.
@@ -32,32 +139,74 @@ class MCTSAgent(Agent):
 
         def __init__(
             self,
-            state: str,
+            state: QuoridorState,
             parent: Optional["MCTSAgent.Node"] = None,
-            action: Optional[str] = None,
+            action: Optional[int] = None,
             terminal: bool = False,
+            entry: Optional["MCTSAgent.Entry"] = None,
         ) -> None:
             """
             Initializes a new Node instance.
 
             Parameters:
             -----------
-            state: str
+            state: QuoridorState
                 The state associated with the node.
             parent: MCTSAgent.Node, optional
                 The parent node of this node.
-            action: str, optional
-                The action that leads to this node.
+            action: int, optional
+                The discrete action that leads to this node.
             terminal: bool, optional
                 Indicates whether the node represents a terminal state.
+            entry: MCTSAgent.Entry, optional
+                The transposition table entry holding the statistics of the state,
+                a private one is created if not given.
             """
-            self.state: str = state
+            self.state: QuoridorState = state
             self.parent: Optional["MCTSAgent.Node"] = parent
             self.children: Set["MCTSAgent.Node"] = set()
-            self.total_reward: int = 0
-            self.visits: int = 0
-            self.action: Optional[str] = action
+            self.entry: MCTSAgent.Entry = entry or MCTSAgent.Entry(self)
+            self.action: Optional[int] = action
             self.is_terminal: bool = terminal
+            # the prior probability of the action, set by the PUCT search
+            self.prior: float = 0.0
+
+        @property
+        def key(self) -> int:
+            """
+            The Zobrist key of the state.
+            """
+            return self.state.key
+
+        @property
+        def visits(self) -> int:
+            """
+            The number of visits of the state.
+            """
+            return self.entry.visits
+
+        @visits.setter
+        def visits(self, value: int) -> None:
+            self.entry.visits = value
+
+        @property
+        def total_reward(self) -> int:
+            """
+            The total reward of the state.
+            """
+            return self.entry.total_reward
+
+        @total_reward.setter
+        def total_reward(self, value: int) -> None:
+            self.entry.total_reward = value
+
+        def __hash__(self) -> int:
+            """
+            Hashes the node by the Zobrist key of its state rather than by its
+            address, so that the order of the children, and with it a seeded search,
+            is reproducible.
+            """
+            return hash(self.state.key)
 
         def __str__(self) -> str:
             """
@@ -72,7 +221,20 @@ class MCTSAgent(Agent):
             return f"action: {self.action}, visits: {self.visits}, total_reward: {self.total_reward}"
 
     def __init__(
-        self, action_space=None, player: int = None, max_iterations=10000, max_time=10
+        self,
+        action_space=None,
+        player: int = None,
+        max_iterations=10000,
+        max_time=10,
+        num_workers: int = 1,
+        parallel: str = "root",
+        rollout_policy: str = "random",
+        rollout_plies: Optional[int] = None,
+        evaluator: Optional[Evaluator] = None,
+        batch_size: int = 8,
+        c_puct: float = C_PUCT,
+        tree_capacity: Optional[int] = None,
+        time_manager: Optional[TimeManager] = None,
     ) -> None:
         """
         Initializes a new MCTSAgent instance.
@@ -87,11 +249,64 @@ class MCTSAgent(Agent):
             The maximum number of iterations for the MCTS algorithm.
         max_time: int, optional
             The maximum time (in seconds) allowed for the MCTS algorithm.
+        num_workers: int, optional
+            The number of processes searching in parallel, 1 searches in this process.
+        parallel: str, optional
+            The parallel mode, "root" or "leaf".
+        rollout_policy: str, optional
+            The policy of the rollouts, "random" or "shortest_path", see
+            `RolloutEngine`.
+        rollout_plies: int, optional
+            The number of plies after which a rollout is cut and valued, see the
+            class docstring. Rollouts play to the end of the game if not given.
+        evaluator: callable, optional
+            The evaluator of the leaves of a PUCT search, see the class docstring.
+        batch_size: int, optional
+            The number of leaves the evaluator is called on at once.
+        c_puct: float, optional
+            The weight of the exploration bonus of the PUCT search.
+        tree_capacity: int, optional
+            The number of nodes of the array tree, at least `1 + NUM_ACTIONS`, see
+            the class docstring.
+        time_manager: TimeManager, optional
+            The manager of the game clock of the agent, see the class docstring.
         """
         super().__init__(action_space, player)
+        if parallel not in PARALLEL_MODES:
+            raise ValueError(f"Unknown parallel mode: {parallel}")
+        if tree_capacity is not None and tree_capacity < 1 + NUM_ACTIONS:
+            raise ValueError(
+                f"The tree capacity must hold the root and its children, at least "
+                f"{1 + NUM_ACTIONS} nodes"
+            )
         self.max_iterations = max_iterations
         self.max_time = max_time
+        self.num_workers = num_workers
+        self.parallel = parallel
+        self.rollout_policy = rollout_policy
+        self.rollout_engine = RolloutEngine(rollout_policy)
+        self.rollout_plies = rollout_plies
+        self.evaluation = Evaluation()
+        self.evaluator = evaluator
+        self.batch_size = batch_size
+        self.c_puct = c_puct
+        self.tree: Optional[ArrayTree] = (
+            ArrayTree(tree_capacity) if tree_capacity is not None else None
+        )
+        # the state of the root of the array tree and the action played from it
+        self._tree_state: Optional[QuoridorState] = None
+        self._tree_action: Optional[int] = None
+        self.time_manager = time_manager
+        # "iterations", "time", "budget", "nodes", "iterations_per_second" and
+        # "nodes_per_second" of the last search, see `_record_search`
+        self.search_info: Dict[str, float] = {}
         self.root: MCTSAgent.Node = None
+        self.table: Dict[int, MCTSAgent.Entry] = {}
+        self._pool = None
+        # the processes of the root parallel search and the pipes to them
+        self._workers: List[Tuple[mp.Process, Connection]] = []
+        # the iterations of every worker in the last root parallel search
+        self.worker_iterations: List[int] = []
 
     def act(self, observation: dict, reward: int, info: dict) -> int:
         """
@@ -111,19 +326,133 @@ class MCTSAgent(Agent):
         int:
             The action to take.
         """
-        quoridor: Quoridor = convert_observation_quoridor_game(
-            observation["observation"], self.player
-        )
+        start = time.monotonic()
+        state = QuoridorState.from_observation(observation["observation"], self.player)
         # If walls are not available, use shortest path policy to speed up the game.
-        if quoridor.current_player.walls == 0:
-            return ShortestPathPolicy().get_action(quoridor)
+        if state.walls_left[state.current] == 0:
+            quoridor: Quoridor = convert_observation_quoridor_game(
+                observation["observation"], self.player
+            )
+            action = ShortestPathPolicy().get_action(quoridor)
+        else:
+            budget = self.max_time
+            if self.time_manager is not None:
+                # on a copy, the distance fields the budget computes would be copied
+                # into and updated in every node of the search
+                position = state.copy(history=False)
+                budget = min(budget, self.time_manager.budget(position))
+            if self.tree is not None:
+                action = self._array_search(state, budget)
+            else:
+                self.root = self._get_root(state)
+                action = self._search(self.root, budget)
+        if self.time_manager is not None:
+            self.time_manager.update(time.monotonic() - start)
+        return action
+
+    def set_telemetry(self, telemetry: Optional[Telemetry]) -> None:
+        """
+        Publishes the measurements of the search to a collector: timers of the
+        phases of the search, and per search the samples of `search_info` and of the
+        peak memory of the process.
+
+        The timed methods are wrapped on this instance only, so an agent without a
+        collector runs the plain methods.
+
+        Parameters:
+        -----------
+        telemetry: Telemetry or None
+            The collector, None to stop publishing.
+        """
+        super().set_telemetry(telemetry)
+        for target, methods in ((self, TIMED_METHODS), (self.tree, TIMED_TREE_METHODS)):
+            if target is None:
+                continue
+            for name, method_names in methods.items():
+                for method_name in method_names:
+                    # drop the wrapper of an earlier collector
+                    vars(target).pop(method_name, None)
+                    if telemetry is not None:
+                        method = getattr(target, method_name)
+                        setattr(target, method_name, telemetry.timed(name, method))
+
+    def close(self) -> None:
+        """
+        Stops the worker processes of the parallel search, if any.
+        """
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+        for process, connection in self._workers:
+            try:
+                connection.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            connection.close()
+        for process, _ in self._workers:
+            process.join(timeout=1)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        self._workers = []
+
+    def _get_root(self, state: QuoridorState) -> Node:
+        """
+        Returns the root node of the given state, reusing the tree if it holds it.
+
+        Parameters:
+        -----------
+        state: QuoridorState
+            The state to search from.
+
+        Returns:
+        --------
+        MCTSAgent.Node:
+            The root node, the table is pruned to its subtree.
+        """
+        entry = self.table.get(state.key)
+        if entry is not None and entry.node is not None:
+            root = entry.node
+            root.parent = None
+        else:
+            root = self.Node(
+                state.copy(history=False), entry=self._get_entry(state.key)
+            )
+        self._prune_table(root)
+        return root
 
-        self.root = self.Node(info["pgn"])
-        action = self._search(self.root)
+    def _get_pool(self):
+        """
+        Returns the process pool of the leaf parallel search, starting it if needed.
+        """
+        if self._pool is None:
+            self._pool = mp.Pool(
+                self.num_workers,
+                initializer=_init_worker,
+                initargs=(self.rollout_policy, self.rollout_plies),
+            )
+        return self._pool
 
-        return convert_quoridor_move_to_discrete(action)
+    def _get_workers(self) -> List[Tuple[mp.Process, Connection]]:
+        """
+        Returns the worker processes of the root parallel search and the pipes to
+        them, starting them if needed.
+        """
+        if not self._workers:
+            for _ in range(self.num_workers):
+                connection, worker_connection = mp.Pipe()
+                process = mp.Process(
+                    target=_root_worker,
+                    args=(worker_connection, self.rollout_policy, self.rollout_plies),
+                    daemon=True,
+                )
+                process.start()
+                worker_connection.close()
+                self._workers.append((process, connection))
+        return self._workers
 
-    def _get_child_node(self, node: Node, action: str) -> Optional[Node]:
+    def _get_child_node(self, node: Node, action: int) -> Optional[Node]:
         """
         Returns the child node with the given action.
         """
@@ -131,24 +460,54 @@ class MCTSAgent(Agent):
             if child.action == action:
                 return child
 
+    def _get_entry(self, key: int) -> Entry:
+        """
+        Returns the transposition table entry of the given key, adding it if needed.
+        """
+        entry = self.table.get(key)
+        if entry is None:
+            entry = self.table[key] = self.Entry()
+        return entry
+
+    def _prune_table(self, root: Node) -> None:
+        """
+        Keeps only the entries of the positions in the subtree of the given root.
+
+        Parameters:
+        -----------
+        root: MCTSAgent.Node
+            The new root of the search.
+        """
+        table = {}
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            if node.key not in table:
+                table[node.key] = node.entry
+                node.entry.node = node
+            stack.extend(node.children)
+        self.table = table
+
     def _expand(self, node: Node) -> None:
         """
         Expands the node by adding all possible children.
         """
-        quoridor = self._convert_state_to_quoridor(node.state)
-        for move in quoridor.get_legal_moves():
-            quoridor_copy = deepcopy(quoridor)
-            quoridor_copy.make_move(move)
-            node.children.add(
-                self.Node(
-                    state=self._convert_quoridor_to_state(quoridor_copy),
-                    parent=node,
-                    action=move,
-                    terminal=quoridor_copy.is_terminated,
-                )
+        for action in node.state.legal_actions():
+            state = node.state.copy(history=False)
+            state.make_action(action)
+            entry = self._get_entry(state.key)
+            child = self.Node(
+                state=state,
+                parent=node,
+                action=action,
+                terminal=state.is_terminated,
+                entry=entry,
             )
+            if entry.node is None:
+                entry.node = child
+            node.children.add(child)
 
-    def _rollout(self, node: Node) -> int:
+    def _rollout(self, node: Node) -> float:
         """
         Performs a rollout from the given node.
 
@@ -159,39 +518,42 @@ class MCTSAgent(Agent):
 
         Returns:
         --------
-        int:
-            The reward obtained from the rollout.
+        float:
+            The reward obtained from the rollout, from the perspective of the player
+            who made the move leading to the node: 1 or -1, or the value of the
+            position a cut rollout reached.
+        """
+        return self._rollout_state(node.state)
+
+    def _rollout_state(self, state: QuoridorState) -> float:
         """
-        quoridor = self._convert_state_to_quoridor(node.state)
-        while not quoridor.is_terminated:
-            move = self._rollout_policy(quoridor)
-            quoridor.make_move(move)
+        Performs a rollout from the given state, see `_rollout`.
+        """
+        # the winner of a finished game is still the player to move
+        mover = state.current if state.is_terminated else 1 - state.current
 
-        if quoridor.current_player.id == self.player:
+        if self.rollout_plies == 0:
+            # the distance fields of the state are cheaper than a search of the engine
+            value = self.evaluation.value(state)
+            return value if state.current == mover else -value
+        if self.rollout_plies is not None:
+            value = self.rollout_engine.value(
+                state, self.rollout_plies, self.evaluation
+            )
+            return value if state.current == mover else -value
+        if self.rollout_engine.play(state) == mover:
             return 1
         else:
             return -1
 
-    def _rollout_policy(self, quoridor: Quoridor) -> str:
-        """
-        Selects a random action from the legal actions given the current state.
-
-        Parameters:
-        -----------
-        quoridor: Quoridor
-            The Quoridor game state.
-
-        Returns:
-        --------
-        str:
-            The selected action.
-        """
-        return random.choice(list(quoridor.get_legal_pawn_moves()))
-
     def _backpropagate(self, node: Node, reward: int) -> None:
         """
         Backpropagates the reward up the tree.
 
+        A position that appears more than once on the path, e.g. after pawn moves
+        back and forth, shares its transposition table entry between its nodes, and
+        the entry is only updated once, at the deepest of them.
+
         Parameters:
         -----------
         node: MCTSAgent.Node
@@ -199,9 +561,13 @@ class MCTSAgent(Agent):
         reward: int
             The reward to propagate.
         """
+        updated: Set[MCTSAgent.Entry] = set()
         while node is not None:
-            node.visits += 1
-            node.total_reward += reward
+            entry = node.entry
+            if entry not in updated:
+                updated.add(entry)
+                entry.visits += 1
+                entry.total_reward += reward
             node = node.parent
             reward *= -1
 
@@ -224,7 +590,7 @@ class MCTSAgent(Agent):
                 return child
         return max(node.children, key=self._uct_score)
 
-    def _best_action(self, node: Node) -> str:
+    def _best_action(self, node: Node) -> int:
         """
         Returns the best action from the given node.
 
@@ -235,13 +601,13 @@ class MCTSAgent(Agent):
 
         Returns:
         --------
-        str:
+        int:
             The best action.
         """
         best_node = max(node.children, key=lambda x: x.total_reward)
         return best_node.action
 
-    def _search(self, root: Node) -> str:
+    def _search(self, root: Node, budget: Optional[float] = None) -> int:
         """
         Searches the tree starting from the given root node.
 
@@ -249,26 +615,301 @@ class MCTSAgent(Agent):
         -----------
         root: MCTSAgent.Node
             The root node of the search.
+        budget: float, optional
+            The time (in seconds) of the search, `max_time` if not given.
 
         Returns:
         --------
-        str:
+        int:
             The selected action.
         """
-        print("searching")
-        start = time.time()
+        budget = self.max_time if budget is None else budget
+        start = time.monotonic()
+        deadline = start + budget
+        nodes = len(self.table)
+
+        if self.evaluator is not None:
+            iterations = self._puct_search(root, deadline)
+        elif self.num_workers <= 1:
+            iterations = self._iterate(root, self.max_iterations, deadline)
+        elif self.parallel == "root":
+            iterations = self._root_parallel_search(root, deadline)
+        else:
+            iterations = self._leaf_parallel_search(root, deadline)
+        self._record_search(iterations, start, budget, nodes, len(self.table))
+        if self.evaluator is not None:
+            return max(root.children, key=lambda child: child.visits).action
+        return self._best_action(root)
+
+    def _record_search(
+        self, iterations: int, start: float, budget: float, before: int, after: int
+    ) -> None:
+        """
+        Keeps the statistics of a search in `search_info`.
 
-        for i in range(self.max_iterations):
-            if i % 1000 == 0:
-                print(f"iteration {i+1}")
+        Parameters:
+        -----------
+        iterations: int
+            The number of iterations run.
+        start: float
+            The time (as returned by `time.monotonic`) the search started.
+        budget: float
+            The time (in seconds) the search was given.
+        before: int
+            The number of nodes of the tree before the search.
+        after: int
+            The number of nodes of the tree after the search.
+        """
+        elapsed = time.monotonic() - start
+        self.search_info = {
+            "iterations": iterations,
+            "time": elapsed,
+            "budget": budget,
+            "nodes": after,
+            "iterations_per_second": iterations / elapsed if elapsed > 0 else 0.0,
+            "nodes_per_second": (after - before) / elapsed if elapsed > 0 else 0.0,
+        }
+        if self.telemetry is not None:
+            self.telemetry.count("searches")
+            for name, value in self.search_info.items():
+                self.telemetry.observe(name, value)
+            self.telemetry.observe("memory", peak_memory())
 
+    def _iterate(self, root: Node, max_iterations: int, deadline: float) -> int:
+        """
+        Runs search iterations from the given root node.
+
+        Parameters:
+        -----------
+        root: MCTSAgent.Node
+            The root node of the search.
+        max_iterations: int
+            The maximum number of iterations.
+        deadline: float
+            The time (as returned by `time.monotonic`) after which no iteration is started.
+
+        Returns:
+        --------
+        int:
+            The number of iterations run.
+        """
+        iterations = 0
+        while _searching(iterations, max_iterations, deadline):
             node = self._tree_traversal(root)
             reward = self._rollout(node)
             self._backpropagate(node, reward)
-        print(sorted(root.children, key=lambda x: x.total_reward, reverse=True)[:10])
-        end = time.time()
-        print(f"search time: {end-start}")
-        return self._best_action(root)
+            iterations += 1
+        return iterations
+
+    def _root_parallel_search(self, root: Node, deadline: float) -> int:
+        """
+        Grows a tree from the root in every worker and merges the root statistics.
+
+        Parameters:
+        -----------
+        root: MCTSAgent.Node
+            The root node of the search.
+        deadline: float
+            The time (as returned by `time.monotonic`) after which no iteration is started.
+
+        Returns:
+        --------
+        int:
+            The number of iterations run by all workers together.
+        """
+        workers = self._get_workers()
+        for _, connection in workers:
+            connection.send((root.state, self.max_iterations, deadline))
+        results = [connection.recv() for _, connection in workers]
+        self.worker_iterations = [worker_iterations for worker_iterations, _ in results]
+
+        if not root.children:
+            self._expand(root)
+        children = {child.action: child for child in root.children}
+        iterations = 0
+        for worker_iterations, statistics in results:
+            iterations += worker_iterations
+            root.visits += worker_iterations
+            for action, (visits, total_reward) in statistics.items():
+                children[action].visits += visits
+                children[action].total_reward += total_reward
+        return iterations
+
+    def _leaf_parallel_search(self, root: Node, deadline: float) -> int:
+        """
+        Grows a single tree, running the rollouts of a batch of leaves in parallel.
+
+        Parameters:
+        -----------
+        root: MCTSAgent.Node
+            The root node of the search.
+        deadline: float
+            The time (as returned by `time.monotonic`) after which no batch is started.
+
+        Returns:
+        --------
+        int:
+            The number of iterations run.
+        """
+        pool = self._get_pool()
+        iterations = 0
+        while _searching(iterations, self.max_iterations, deadline):
+            leaves = []
+            for _ in range(min(self.num_workers, self.max_iterations - iterations)):
+                node = self._tree_traversal(root)
+                self._add_virtual_loss(node, 1)
+                leaves.append(node)
+            rewards = pool.map(_rollout_worker, [leaf.state for leaf in leaves])
+            for node, reward in zip(leaves, rewards):
+                self._add_virtual_loss(node, -1)
+                self._backpropagate(node, reward)
+            iterations += len(leaves)
+        return iterations
+
+    def _puct_search(self, root: Node, deadline: float) -> int:
+        """
+        Grows the tree with PUCT, evaluating the leaves in batches.
+
+        Parameters:
+        -----------
+        root: MCTSAgent.Node
+            The root node of the search.
+        deadline: float
+            The time (as returned by `time.monotonic`) after which no batch is started.
+
+        Returns:
+        --------
+        int:
+            The number of iterations run.
+        """
+        iterations = 0
+        while _searching(iterations, self.max_iterations, deadline):
+            leaves = []
+            for _ in range(min(self.batch_size, self.max_iterations - iterations)):
+                node = self._puct_traversal(root)
+                iterations += 1
+                if node.is_terminal:
+                    # the player who moved into a finished game won it
+                    self._backpropagate(node, 1)
+                    continue
+                if any(leaf is node for leaf in leaves):
+                    # the virtual losses could not steer away from this leaf
+                    iterations -= 1
+                    break
+                self._add_virtual_loss(node, 1)
+                leaves.append(node)
+            if leaves:
+                self._evaluate(leaves)
+        return iterations
+
+    def _evaluate(self, leaves: list) -> None:
+        """
+        Evaluates a batch of leaves, expands them with the priors of the evaluator
+        and backpropagates their values.
+
+        Parameters:
+        -----------
+        leaves: list of MCTSAgent.Node
+            The leaves, with a virtual loss on their paths.
+        """
+        priors, values = self._evaluate_states([leaf.state for leaf in leaves])
+        for leaf, leaf_priors, value in zip(leaves, priors, values):
+            self._add_virtual_loss(leaf, -1)
+            if not leaf.children:
+                self._expand(leaf)
+                for child in leaf.children:
+                    child.prior = leaf_priors[child.action]
+            # the value is for the player to move, the reward for the one who moved
+            self._backpropagate(leaf, -float(value))
+
+    def _evaluate_states(self, states: list) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Calls the evaluator on a batch of states.
+
+        Parameters:
+        -----------
+        states: list of QuoridorState
+            The states, not terminated.
+
+        Returns:
+        --------
+        (np.ndarray, np.ndarray):
+            The (B, 209) priors, normalized over the legal actions, and the (B,)
+            values for the players to move.
+        """
+        observations = np.stack([state_to_observation(state) for state in states])
+        action_masks = np.stack([state.legal_action_mask() for state in states])
+        players = np.array([state.player for state in states])
+        priors, values = self.evaluator(observations, action_masks, players)
+        legal = action_masks == 1
+        priors = np.where(legal, np.asarray(priors, dtype=float), 0.0)
+        # uniform priors for the leaves where the evaluator gives no weight to legal
+        # moves
+        priors = np.where(priors.sum(axis=1, keepdims=True) > 0, priors, legal)
+        priors /= priors.sum(axis=1, keepdims=True)
+        return priors, values
+
+    def _puct_traversal(self, node: Node) -> Node:
+        """
+        Descends the tree from the given node with PUCT, down to a node without
+        children or a terminal node.
+
+        Parameters:
+        -----------
+        node: MCTSAgent.Node
+            The node from which to start the traversal.
+
+        Returns:
+        --------
+        MCTSAgent.Node:
+            The selected leaf.
+        """
+        while node.children and not node.is_terminal:
+            node = max(node.children, key=self._puct_score)
+        return node
+
+    def _puct_score(self, node: Node) -> float:
+        """
+        Calculates the PUCT score of the given node.
+
+        Parameters:
+        -----------
+        node: MCTSAgent.Node
+            The node for which to calculate the PUCT score.
+
+        Returns:
+        --------
+        float:
+            The PUCT score of the node, an unvisited node has a value of 0.
+        """
+        visits = node.visits
+        value = node.total_reward / visits if visits > 0 else 0.0
+        exploration = self.c_puct * sqrt(max(node.parent.visits, 1)) / (1 + visits)
+        return value + node.prior * exploration
+
+    def _add_virtual_loss(self, node: Node, sign: int) -> None:
+        """
+        Adds (sign 1) or removes (sign -1) a virtual loss on the path to the node.
+
+        A virtual loss counts as a visit that was lost for the player choosing the
+        node, at every level of the path, once per transposition table entry as in
+        `_backpropagate`.
+
+        Parameters:
+        -----------
+        node: MCTSAgent.Node
+            The leaf the path leads to.
+        sign: int
+            1 to add the virtual loss, -1 to remove it.
+        """
+        updated: Set[MCTSAgent.Entry] = set()
+        while node is not None:
+            entry = node.entry
+            if entry not in updated:
+                updated.add(entry)
+                entry.visits += sign
+                entry.total_reward -= sign * VIRTUAL_LOSS
+            node = node.parent
 
     def _tree_traversal(self, node: Node) -> Node:
         """
@@ -310,34 +951,260 @@ class MCTSAgent(Agent):
             log(node.parent.visits) / node.visits
         )
 
-    def _convert_state_to_quoridor(self, state: str) -> Quoridor:
+    def _array_search(
+        self, state: QuoridorState, budget: Optional[float] = None
+    ) -> int:
         """
-        Converts the given state to a Quoridor game.
+        Searches the array tree from the given state.
 
         Parameters:
         -----------
-        state: str
-            The state to convert.
+        state: QuoridorState
+            The state to search from.
+        budget: float, optional
+            The time (in seconds) of the search, `max_time` if not given.
 
         Returns:
         --------
-        Quoridor:
-            The corresponding Quoridor game.
+        int:
+            The selected action.
         """
-        return Quoridor.init_from_pgn(state)
+        budget = self.max_time if budget is None else budget
+        start = time.monotonic()
+        deadline = start + budget
+        self._array_root(state)
+        tree = self.tree
+        nodes = len(tree)
+        iterations = 0
+        while _searching(iterations, self.max_iterations, deadline):
+            if self.evaluator is not None:
+                batch_size = min(self.batch_size, self.max_iterations - iterations)
+                iterations += self._array_puct_batch(batch_size)
+            else:
+                self._array_iteration()
+                iterations += 1
+        self._record_search(iterations, start, budget, nodes, len(tree))
+        best = tree.best_child(0, "visits" if self.evaluator else "value_sums")
+        self._tree_action = int(tree.actions[best])
+        return self._tree_action
 
-    def _convert_quoridor_to_state(self, quoridor: Quoridor) -> str:
+    def _array_root(self, state: QuoridorState) -> None:
         """
-        Converts the given Quoridor game to a state.
+        Moves the root of the array tree to the given state if the tree holds it,
+        after the action played from the previous root and a reply, and clears the
+        tree otherwise.
 
         Parameters:
         -----------
-        quoridor: Quoridor
-            The Quoridor game to convert.
+        state: QuoridorState
+            The state to search from.
+        """
+        tree = self.tree
+        root = -1
+        if self._tree_state is not None and self._tree_action is not None:
+            played = tree.find_child(0, self._tree_action)
+            if played >= 0:
+                after = self._tree_state.copy(history=False)
+                after.make_action(self._tree_action)
+                for reply in tree.children(played):
+                    candidate = after.copy(history=False)
+                    candidate.make_action(int(tree.actions[reply]))
+                    if candidate.key == state.key:
+                        root = reply
+                        break
+        if root >= 0:
+            tree.reroot(root)
+        else:
+            tree.reset()
+        self._tree_state = state.copy(history=False)
+        self._tree_action = None
+
+    def _array_iteration(self) -> None:
+        """
+        Runs a UCT iteration on the array tree: selection, expansion, rollout and
+        backpropagation.
+        """
+        tree = self.tree
+        state = self._tree_state.copy(history=False)
+        node = 0
+        path = [node]
+        while not state.is_terminated:
+            if tree.first_child[node] == NO_CHILDREN:
+                if tree.expand(node, state.legal_actions()):
+                    node = random.choice(tree.children(node))
+                    path.append(node)
+                    state.make_action(int(tree.actions[node]))
+                break
+            node = tree.select_uct(node, EXPLORATION_CONSTANT)
+            path.append(node)
+            state.make_action(int(tree.actions[node]))
+        tree.backpropagate(path, self._rollout_state(state))
+
+    def _array_puct_batch(self, batch_size: int) -> int:
+        """
+        Runs a batch of PUCT iterations on the array tree, evaluating their leaves
+        at once.
+
+        Parameters:
+        -----------
+        batch_size: int
+            The maximum number of iterations.
 
         Returns:
         --------
-        str:
-            The corresponding state.
+        int:
+            The number of iterations run.
         """
-        return quoridor.get_pgn()
+        tree = self.tree
+        paths = []
+        states = []
+        iterations = 0
+        for _ in range(batch_size):
+            state = self._tree_state.copy(history=False)
+            node = 0
+            path = [node]
+            while not state.is_terminated and tree.first_child[node] != NO_CHILDREN:
+                node = tree.select_puct(node, self.c_puct)
+                path.append(node)
+                state.make_action(int(tree.actions[node]))
+            if state.is_terminated:
+                # the player who moved into a finished game won it
+                tree.backpropagate(path, 1)
+                iterations += 1
+                continue
+            if any(other[-1] == node for other in paths):
+                # the virtual losses could not steer away from this leaf
+                break
+            tree.add_virtual_loss(path, 1, VIRTUAL_LOSS)
+            paths.append(path)
+            states.append(state)
+            iterations += 1
+        if not states:
+            return iterations
+        priors, values = self._evaluate_states(states)
+        for path, state, leaf_priors, value in zip(paths, states, priors, values):
+            tree.add_virtual_loss(path, -1, VIRTUAL_LOSS)
+            actions = state.legal_actions()
+            tree.expand(path[-1], actions, leaf_priors[actions])
+            # the value is for the player to move, the reward for the one who moved
+            tree.backpropagate(path, -float(value))
+        return iterations
+
+
+def _searching(iterations: int, max_iterations: int, deadline: float) -> bool:
+    """
+    Tells whether a search starts another iteration.
+
+    Parameters:
+    -----------
+    iterations: int
+        The number of iterations run.
+    max_iterations: int
+        The maximum number of iterations.
+    deadline: float
+        The time (as returned by `time.monotonic`) after which no iteration is started.
+
+    Returns:
+    --------
+    bool:
+        True if the search goes on. The first iteration always runs, so the search
+        has a move to return.
+    """
+    return iterations < max_iterations and (
+        iterations == 0 or time.monotonic() < deadline
+    )
+
+
+# the agent of a worker process of the parallel search
+_worker_agent: Optional[MCTSAgent] = None
+
+
+def _init_worker(rollout_policy: str, rollout_plies: Optional[int]) -> None:
+    """
+    Initializes a worker process of the parallel search.
+
+    Parameters:
+    -----------
+    rollout_policy: str
+        The policy of the rollouts.
+    rollout_plies: int or None
+        The number of plies after which a rollout is cut.
+    """
+    global _worker_agent
+    # forked workers inherit the random state of the parent, so they would all
+    # play the same rollouts
+    random.seed()
+    _worker_agent = MCTSAgent(
+        rollout_policy=rollout_policy, rollout_plies=rollout_plies
+    )
+
+
+def _root_worker(
+    connection: Connection, rollout_policy: str, rollout_plies: Optional[int]
+) -> None:
+    """
+    Runs a worker process of the root parallel search: answers every search task
+    received on the pipe with the result of `_search_worker`, until it receives None
+    or the pipe is closed.
+
+    Parameters:
+    -----------
+    connection: Connection
+        The end of the pipe of the worker.
+    rollout_policy: str
+        The policy of the rollouts.
+    rollout_plies: int or None
+        The number of plies after which a rollout is cut.
+    """
+    _init_worker(rollout_policy, rollout_plies)
+    while True:
+        try:
+            task = connection.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        connection.send(_search_worker(*task))
+
+
+def _search_worker(
+    state: QuoridorState, max_iterations: int, deadline: float
+) -> Tuple[int, Dict[int, Tuple[int, int]]]:
+    """
+    Grows the tree of the worker from the given state, reusing it between moves.
+
+    Parameters:
+    -----------
+    state: QuoridorState
+        The root state.
+    max_iterations: int
+        The maximum number of iterations.
+    deadline: float
+        The time (as returned by `time.monotonic`) after which no iteration is started.
+
+    Returns:
+    --------
+    (int, dict):
+        The number of iterations run, and the visits and total reward every child
+        of the root gained from them, by action.
+    """
+    root = _worker_agent._get_root(state)
+    before = {
+        child.action: (child.visits, child.total_reward) for child in root.children
+    }
+    iterations = _worker_agent._iterate(root, max_iterations, deadline)
+    statistics: Dict[int, Tuple[int, int]] = {}
+    for child in root.children:
+        visits, total_reward = before.get(child.action, (0, 0))
+        statistics[child.action] = (
+            child.visits - visits,
+            child.total_reward - total_reward,
+        )
+    return iterations, statistics
+
+
+def _rollout_worker(state: QuoridorState) -> float:
+    """
+    Performs a rollout from the given leaf state, see `MCTSAgent._rollout`.
+    """
+    return _worker_agent._rollout(MCTSAgent.Node(state))
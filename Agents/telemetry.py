@@ -0,0 +1,259 @@
+"""
+This module provides a collector of measurements published by agents: counters, timers
+and samples of per-move values such as the latency of a move.
+
+Instrumentation is opt-in. An agent without a collector runs its plain methods, and
+`MCTSAgent.set_telemetry` replaces the methods of the search phases by timed wrappers
+on the instance only, so a disabled collector costs nothing in the hot loop.
+Collectors are merged with `merge` and sent between processes as plain dicts with
+`to_dict` and `from_dict`.
+"""
+
+import sys
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+def peak_memory() -> Optional[int]:
+    """
+    Get the peak resident memory of this process.
+
+    Returns
+    -------
+    int or None
+        The number of bytes, None where the platform does not report it.
+    """
+    if resource is None:
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes on Linux and the BSDs
+    if sys.platform == "darwin":
+        return maxrss
+    return maxrss * 1024
+
+
+class Telemetry:
+    """
+    Collector of the measurements of an agent.
+
+    Attributes
+    ----------
+    counters : Dict[str, int]
+        The counts of events by name.
+    timers : Dict[str, List[float]]
+        The number of calls and the total seconds of timed code by name.
+    samples : Dict[str, List[float]]
+        The observed values by name, one per move, see `histogram`.
+    """
+
+    def __init__(self):
+        """
+        Initialize an empty collector.
+        """
+        self.counters: Dict[str, int] = {}
+        self.timers: Dict[str, List[float]] = {}
+        self.samples: Dict[str, List[float]] = {}
+
+    def count(self, name: str, number: int = 1) -> None:
+        """
+        Count events.
+
+        Parameters
+        ----------
+        name : str
+            The name of the counter.
+        number : int, optional
+            The number of events (default is 1).
+        """
+        self.counters[name] = self.counters.get(name, 0) + number
+
+    def add_time(self, name: str, seconds: float, calls: int = 1) -> None:
+        """
+        Add the time of timed code.
+
+        Parameters
+        ----------
+        name : str
+            The name of the timer.
+        seconds : float
+            The time taken.
+        calls : int, optional
+            The number of calls that took it (default is 1).
+        """
+        timer = self.timers.setdefault(name, [0, 0.0])
+        timer[0] += calls
+        timer[1] += seconds
+
+    def observe(self, name: str, value: float) -> None:
+        """
+        Keep a sample of a value.
+
+        Parameters
+        ----------
+        name : str
+            The name of the value.
+        value : float
+            The value, None is ignored.
+        """
+        if value is not None:
+            self.samples.setdefault(name, []).append(value)
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """
+        Time a block of code.
+
+        Parameters
+        ----------
+        name : str
+            The name of the timer.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def timed(self, name: str, function: Callable) -> Callable:
+        """
+        Wrap a function to time its calls.
+
+        Parameters
+        ----------
+        name : str
+            The name of the timer.
+        function : Callable
+            The function.
+
+        Returns
+        -------
+        Callable
+            The wrapper, it returns what the function returns.
+        """
+        timer = self.timers.setdefault(name, [0, 0.0])
+        perf_counter = time.perf_counter
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                timer[0] += 1
+                timer[1] += perf_counter() - start
+
+        return wrapper
+
+    def histogram(self, name: str, bins: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Compute the histogram of the samples of a value.
+
+        Parameters
+        ----------
+        name : str
+            The name of the value.
+        bins : int, optional
+            The number of bins (default is 10).
+
+        Returns
+        -------
+        (np.ndarray, np.ndarray)
+            The counts of the bins and their edges, see `numpy.histogram`.
+        """
+        return np.histogram(self.samples.get(name, []), bins=bins)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Summarize the measurements.
+
+        Returns
+        -------
+        Dict[str, Dict[str, float]]
+            By counter name its "count"; by timer name its "calls", "total" seconds
+            and "mean" seconds per call; by value name the "count", "mean", "p50",
+            "p90", "p99" and "max" of its samples.
+        """
+        summary: Dict[str, Dict[str, float]] = {
+            name: {"count": count} for name, count in self.counters.items()
+        }
+        for name, (calls, total) in self.timers.items():
+            summary[name] = {
+                "calls": calls,
+                "total": total,
+                "mean": total / calls if calls else 0.0,
+            }
+        for name, values in self.samples.items():
+            values = np.asarray(values, dtype=float)
+            p50, p90, p99 = np.percentile(values, [50, 90, 99])
+            summary[name] = {
+                "count": len(values),
+                "mean": float(values.mean()),
+                "p50": float(p50),
+                "p90": float(p90),
+                "p99": float(p99),
+                "max": float(values.max()),
+            }
+        return summary
+
+    def merge(self, other: "Telemetry") -> None:
+        """
+        Add the measurements of another collector.
+
+        Parameters
+        ----------
+        other : Telemetry
+            The collector.
+        """
+        for name, count in other.counters.items():
+            self.count(name, count)
+        for name, (calls, total) in other.timers.items():
+            self.add_time(name, total, calls)
+        for name, values in other.samples.items():
+            self.samples.setdefault(name, []).extend(values)
+
+    def to_dict(self) -> Dict[str, Dict]:
+        """
+        Convert the measurements to plain dicts and lists, e.g. to send them to
+        another process or save them as JSON.
+
+        Returns
+        -------
+        Dict[str, Dict]
+            The "counters", "timers" and "samples".
+        """
+        return {
+            "counters": dict(self.counters),
+            "timers": {name: list(timer) for name, timer in self.timers.items()},
+            "samples": {name: list(values) for name, values in self.samples.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Dict]) -> "Telemetry":
+        """
+        Create a collector from the output of `to_dict`.
+
+        Parameters
+        ----------
+        data : Dict[str, Dict]
+            The measurements.
+
+        Returns
+        -------
+        Telemetry
+            The collector.
+        """
+        telemetry = cls()
+        telemetry.counters = dict(data["counters"])
+        telemetry.timers = {name: list(timer) for name, timer in data["timers"].items()}
+        telemetry.samples = {
+            name: list(values) for name, values in data["samples"].items()
+        }
+        return telemetry
@@ -1,20 +1,23 @@
+import random
+import time
+import numpy as np
+import pytest
 from Agents.mcts_agent import MCTSAgent
+from Agents.telemetry import Telemetry, peak_memory
+from Agents.time_manager import TimeManager
 from Environment import QuoridorEnv, env
-from Environment.utils import (
-    convert_quoridor_move_to_discrete,
-    convert_observation_quoridor_game,
-)
-from quoridor import Quoridor
+from Environment.state import QuoridorState
 
 
 def test_node_initialization():
-    state = "e2/e8"
-    parent = MCTSAgent.Node(state="e2")
-    action = "e8"
+    state = QuoridorState.init_from_pgn("e2/e8")
+    parent = MCTSAgent.Node(state=QuoridorState.init_from_pgn("e2"))
+    action = 76
     terminal = False
     node = MCTSAgent.Node(state, parent, action, terminal)
 
-    assert node.state == state
+    assert node.state is state
+    assert node.key == state.key
     assert node.parent == parent
     assert node.children == set()
     assert node.total_reward == 0
@@ -25,52 +28,62 @@ def test_node_initialization():
 
 def test_expand():
     mcts_agent: MCTSAgent = MCTSAgent(player=1, max_iterations=5)
-    quoridor_game: Quoridor = Quoridor()
-
-    state = quoridor_game.get_pgn()
+    state = QuoridorState()
     node = MCTSAgent.Node(state)
 
     assert len(node.children) == 0
 
     mcts_agent._expand(node)
 
-    assert len(node.children) > 0
+    assert len(node.children) == len(state.legal_actions())
     for child in node.children:
         assert isinstance(child, MCTSAgent.Node)
         assert child.parent == node
-        assert child.action in quoridor_game.get_legal_moves()
+        assert child.action in state.legal_actions()
         assert child.is_terminal == False
+        expected = state.copy()
+        expected.make_action(child.action)
+        assert child.key == expected.key
+        assert len(child.state.moves) == 1
+    assert state.moves == []
 
 
 def test_rollout():
     mcts_agent: MCTSAgent = MCTSAgent(player=1, max_iterations=5)
-    quoridor_game: Quoridor = Quoridor()
-    state = quoridor_game.get_pgn()
+    state = QuoridorState.init_from_pgn("e2/e8")
     node = MCTSAgent.Node(state)
 
     reward = mcts_agent._rollout(node)
 
     assert reward in [-1, 1]
+    assert state.get_pgn() == "e2/e8"
 
 
-def test_rollout_policy():
+def test_rollout_terminal():
     mcts_agent: MCTSAgent = MCTSAgent(player=1, max_iterations=5)
-    quoridor_game: Quoridor = Quoridor()
-    legal_moves = quoridor_game.get_legal_pawn_moves()
+    # the player who just moved into a terminal node has won
+    state = QuoridorState.init_from_pgn("e2/d9/e3/c9/e4/b9/e5/a9/e6/a8/e7/a7/e8/a6/e9")
+    assert state.is_terminated
+    node = MCTSAgent.Node(state, terminal=True)
+
+    assert mcts_agent._rollout(node) == 1
 
-    action = mcts_agent._rollout_policy(quoridor_game)
 
-    assert action in legal_moves
+def test_rollout_shortest_path():
+    mcts_agent = MCTSAgent(player=1, max_iterations=5, rollout_policy="shortest_path")
+    state = QuoridorState.init_from_pgn("e2/e8")
+    node = MCTSAgent.Node(state)
+
+    assert mcts_agent._rollout(node) in [-1, 1]
 
 
 def test_backpropagate():
     mcts_agent: MCTSAgent = MCTSAgent(player=1, max_iterations=5)
-    quoridor_game: Quoridor = Quoridor()
-    root = MCTSAgent.Node(state=quoridor_game.get_pgn())
-    child1 = MCTSAgent.Node(state="", parent=root)
-    child2 = MCTSAgent.Node(state="", parent=root)
-    grandchild1 = MCTSAgent.Node(state="", parent=child1)
-    grandchild2 = MCTSAgent.Node(state="", parent=child1)
+    root = MCTSAgent.Node(state=QuoridorState())
+    child1 = MCTSAgent.Node(state=QuoridorState(), parent=root)
+    child2 = MCTSAgent.Node(state=QuoridorState(), parent=root)
+    grandchild1 = MCTSAgent.Node(state=QuoridorState(), parent=child1)
+    grandchild2 = MCTSAgent.Node(state=QuoridorState(), parent=child1)
 
     reward = 1
 
@@ -95,3 +108,370 @@ def test_act():
     action = mcts_agent.act(observation, reward, info)
     assert isinstance(action, int)
     assert observation["action_mask"][action] == 1
+
+
+def play_seeded_game(seed, **kwargs):
+    random.seed(seed)
+    quoridor_env: QuoridorEnv = env()
+    quoridor_env.reset()
+    agents = {
+        "player_1": MCTSAgent(player=1, max_iterations=30, **kwargs),
+        "player_2": MCTSAgent(player=2, max_iterations=30, **kwargs),
+    }
+    for agent in quoridor_env.agent_iter():
+        observation, reward, termination, truncation, info = quoridor_env.last()
+        if termination or len(info["pgn"].split("/")) >= 20:
+            return info["pgn"]
+        quoridor_env.step(agents[agent].act(observation, reward, info))
+
+
+@pytest.mark.parametrize("tree_capacity", [None, 20000])
+def test_seeded_search(tree_capacity):
+    # the rollouts draw from the global random generator
+    games = [play_seeded_game(seed, tree_capacity=tree_capacity) for seed in (5, 5, 6)]
+    assert games[0] == games[1]
+    assert games[0] != games[2]
+
+
+def test_transposition_table():
+    mcts_agent = MCTSAgent(player=1, max_iterations=5)
+    root = MCTSAgent.Node(state=QuoridorState.init_from_pgn("e2/e8"))
+    mcts_agent._expand(root)
+    for child in root.children:
+        assert mcts_agent.table[child.key] is child.entry
+
+    first = MCTSAgent.Node(state=QuoridorState.init_from_pgn("e2/e8/a1h/a8h"))
+    mcts_agent._expand(first)
+    second = MCTSAgent.Node(state=QuoridorState.init_from_pgn("a1h/a8h/e2/e8"))
+    mcts_agent._expand(second)
+    assert first.key == second.key
+    first_children = {child.action: child for child in first.children}
+    for child in second.children:
+        assert child.entry is first_children[child.action].entry
+    child = next(iter(second.children))
+    mcts_agent._backpropagate(child, 1)
+    assert first_children[child.action].visits == 1
+
+
+def test_backpropagate_repetition():
+    mcts_agent = MCTSAgent(player=1, max_iterations=5)
+    moves = ["e2", "e8", "e1", "e9", "e2", "e8"]
+    root = mcts_agent._get_root(QuoridorState.init_from_pgn("/".join(moves[:2])))
+    path = [root]
+    # the pawns move back and forth to the position of the root
+    for ply in range(3, len(moves) + 1):
+        key = QuoridorState.init_from_pgn("/".join(moves[:ply])).key
+        mcts_agent._expand(path[-1])
+        path.append(next(child for child in path[-1].children if child.key == key))
+    assert path[-1].entry is root.entry
+
+    mcts_agent._backpropagate(path[-1], 1)
+    # one playout is one visit of every position on the path
+    assert [node.visits for node in path] == [1, 1, 1, 1, 1]
+    assert [node.total_reward for node in path] == [1, -1, 1, -1, 1]
+
+    mcts_agent._add_virtual_loss(path[-1], 1)
+    assert [node.visits for node in path] == [2, 2, 2, 2, 2]
+    mcts_agent._add_virtual_loss(path[-1], -1)
+    assert [node.total_reward for node in path] == [1, -1, 1, -1, 1]
+
+
+def test_tree_reuse():
+    mcts_agent = MCTSAgent(player=1, max_iterations=1)
+    quoridor_env: QuoridorEnv = env()
+    quoridor_env.reset()
+    observation, reward, termination, truncation, info = quoridor_env.last()
+    action = mcts_agent.act(observation, reward, info)
+    quoridor_env.step(action)
+    played = next(child for child in mcts_agent.root.children if child.action == action)
+    mcts_agent._expand(played)
+    reply = next(iter(played.children))
+    mcts_agent._backpropagate(reply, 1)
+    quoridor_env.step(reply.action)
+
+    observation, reward, termination, truncation, info = quoridor_env.last()
+    mcts_agent.act(observation, reward, info)
+    assert mcts_agent.root is reply
+    assert mcts_agent.root.parent is None
+    assert mcts_agent.root.visits == 2
+    assert mcts_agent.root.key in mcts_agent.table
+    assert played.key not in mcts_agent.table
+
+
+def test_max_time():
+    mcts_agent = MCTSAgent(player=1, max_iterations=10**9, max_time=0.5)
+    root = MCTSAgent.Node(QuoridorState())
+    start = time.time()
+    action = mcts_agent._search(root)
+    assert time.time() - start < 2
+    assert action in QuoridorState().legal_actions()
+    assert 0 < root.visits < 10**9
+    info = mcts_agent.search_info
+    assert info["iterations"] == root.visits
+    assert info["budget"] == 0.5
+    assert 0.5 <= info["time"] < 2
+    assert info["iterations_per_second"] == pytest.approx(
+        info["iterations"] / info["time"]
+    )
+    assert info["nodes"] == len(mcts_agent.table)
+
+
+def test_anytime():
+    # a search out of time still runs an iteration and returns a move
+    mcts_agent = MCTSAgent(player=1, max_iterations=10**9)
+    root = MCTSAgent.Node(QuoridorState())
+    action = mcts_agent._search(root, budget=0)
+    assert action in QuoridorState().legal_actions()
+    assert root.visits == mcts_agent.search_info["iterations"] == 1
+
+    mcts_agent = MCTSAgent(player=1, max_iterations=10**9, tree_capacity=10**4)
+    action = mcts_agent._array_search(QuoridorState(), budget=0)
+    assert action in QuoridorState().legal_actions()
+    assert mcts_agent.search_info["iterations"] == 1
+
+
+def test_time_manager():
+    manager = TimeManager(2, overhead=0)
+    mcts_agent = MCTSAgent(player=1, max_iterations=10**9, time_manager=manager)
+    quoridor_env: QuoridorEnv = env()
+    quoridor_env.reset()
+    observation, reward, termination, truncation, info = quoridor_env.last()
+    start = time.monotonic()
+    mcts_agent.act(observation, reward, info)
+    elapsed = time.monotonic() - start
+    # 2 seconds split over 18 moves in a close race
+    assert mcts_agent.search_info["budget"] == pytest.approx(2 / 18 * 1.5)
+    assert mcts_agent.search_info["time"] < elapsed
+    assert 2 - elapsed <= manager.time_left < 2 - mcts_agent.search_info["time"]
+    # the root of the search does not carry the distance fields of the budget
+    assert mcts_agent.root.state._distances is None
+
+
+def test_root_parallel():
+    mcts_agent = MCTSAgent(player=1, max_iterations=20, num_workers=2)
+    try:
+        root = MCTSAgent.Node(QuoridorState.init_from_pgn("e2/e8"))
+        action = mcts_agent._search(root)
+        assert action in root.state.legal_actions()
+        assert root.visits == 40
+        assert sum(child.visits for child in root.children) == 40
+    finally:
+        mcts_agent.close()
+
+
+def test_root_parallel_workers():
+    mcts_agent = MCTSAgent(player=1, max_iterations=10**9, max_time=0.3, num_workers=3)
+    try:
+        for pgn in ("e2/e8", "e2/e8/e3"):
+            root = MCTSAgent.Node(QuoridorState.init_from_pgn(pgn))
+            mcts_agent._search(root)
+            # every worker process grew its tree for the whole search
+            assert len(mcts_agent.worker_iterations) == 3
+            assert all(iterations > 0 for iterations in mcts_agent.worker_iterations)
+            assert sum(mcts_agent.worker_iterations) == root.visits
+        processes = [process for process, _ in mcts_agent._workers]
+    finally:
+        mcts_agent.close()
+    assert mcts_agent._workers == []
+    assert not any(process.is_alive() for process in processes)
+
+
+def test_leaf_parallel():
+    mcts_agent = MCTSAgent(player=1, max_iterations=21, num_workers=4, parallel="leaf")
+    try:
+        root = MCTSAgent.Node(QuoridorState.init_from_pgn("e2/e8"))
+        action = mcts_agent._search(root)
+        assert action in root.state.legal_actions()
+        # every virtual loss is removed again
+        assert root.visits == 21
+        assert sum(child.visits for child in root.children) == 21
+        assert abs(root.total_reward) <= 21
+    finally:
+        mcts_agent.close()
+
+
+class UniformEvaluator:
+    def __init__(self):
+        self.batch_sizes = []
+
+    def __call__(self, observations, action_masks, players):
+        assert observations.shape == (len(players), 9, 9, 6)
+        assert action_masks.shape == (len(players), 209)
+        self.batch_sizes.append(len(players))
+        return np.ones(action_masks.shape), np.zeros(len(players))
+
+
+def test_puct():
+    evaluator = UniformEvaluator()
+    mcts_agent = MCTSAgent(
+        player=1, max_iterations=200, evaluator=evaluator, batch_size=8
+    )
+    # player 1 wins by moving from e8 to e9
+    state = QuoridorState.init_from_pgn("e2/d9/e3/c9/e4/b9/e5/a9/e6/a8/e7/a7/e8/a6")
+    root = MCTSAgent.Node(state)
+    action = mcts_agent._search(root)
+    assert action == 76
+    assert sum(evaluator.batch_sizes) < 200
+    # every iteration is a visit of the root, the virtual losses are removed
+    assert root.visits == 200
+    assert sum(child.visits for child in root.children) == 199
+    assert sum(child.prior for child in root.children) == pytest.approx(1)
+
+
+def test_puct_batches():
+    evaluator = UniformEvaluator()
+    mcts_agent = MCTSAgent(
+        player=1, max_iterations=17, evaluator=evaluator, batch_size=8
+    )
+    # no move ends the game, so whatever the order of the children every batch after
+    # the root is spread over 8 of its children by the virtual losses
+    root = MCTSAgent.Node(QuoridorState.init_from_pgn("e2/e8"))
+    mcts_agent._search(root)
+    assert evaluator.batch_sizes == [1, 8, 8]
+    assert root.visits == 17
+    assert sum(child.visits > 0 for child in root.children) == 16
+
+
+def test_puct_priors():
+    # an evaluator without weight on legal moves gets uniform priors
+    def evaluator(observations, action_masks, players):
+        assert list(players) == [2]
+        return np.where(action_masks == 1, 0, 1), np.zeros(len(players))
+
+    mcts_agent = MCTSAgent(player=2, max_iterations=1, evaluator=evaluator)
+    root = MCTSAgent.Node(QuoridorState.init_from_pgn("e2"))
+    mcts_agent._search(root)
+    priors = [child.prior for child in root.children]
+    assert priors == pytest.approx([1 / len(priors)] * len(priors))
+
+
+def test_array_tree():
+    # a pool too small for the tree, the search goes on without expanding
+    mcts_agent = MCTSAgent(player=1, max_iterations=300, tree_capacity=1000)
+    state = QuoridorState.init_from_pgn("e2/d9/e3/c9/e4/b9/e5/a9/e6/a8/e7/a7/e8/a6")
+    action = mcts_agent._array_search(state)
+    assert action in state.legal_actions()
+    tree = mcts_agent.tree
+    assert len(tree) <= 1000
+    assert tree.visits[0] == 300
+    children = tree.children(0)
+    assert tree.visits[children.start : children.stop].sum() == 300
+    # moving to e9 always wins
+    winning = tree.find_child(0, 76)
+    assert tree.value_sums[winning] == tree.visits[winning] > 0
+
+
+def test_array_tree_capacity():
+    with pytest.raises(ValueError):
+        MCTSAgent(player=1, tree_capacity=100)
+
+    # a pool that only holds the root and its children
+    mcts_agent = MCTSAgent(player=1, max_iterations=300, tree_capacity=210)
+    quoridor_env: QuoridorEnv = env()
+    quoridor_env.reset()
+    observation, reward, termination, truncation, info = quoridor_env.last()
+    action = mcts_agent.act(observation, reward, info)
+    assert observation["action_mask"][action] == 1
+    tree = mcts_agent.tree
+    assert len(tree) == 1 + len(QuoridorState().legal_actions())
+    assert tree.visits[0] == 300
+
+
+def test_array_tree_puct():
+    evaluator = UniformEvaluator()
+    mcts_agent = MCTSAgent(
+        player=1,
+        max_iterations=200,
+        evaluator=evaluator,
+        batch_size=8,
+        tree_capacity=10**5,
+    )
+    state = QuoridorState.init_from_pgn("e2/d9/e3/c9/e4/b9/e5/a9/e6/a8/e7/a7/e8/a6")
+    assert mcts_agent._array_search(state) == 76
+    # terminal leaves are not evaluated
+    assert sum(evaluator.batch_sizes) < 200
+    tree = mcts_agent.tree
+    # every iteration is a visit of the root, the virtual losses are removed
+    assert tree.visits[0] == 200
+    children = tree.children(0)
+    assert tree.visits[children.start : children.stop].sum() == 199
+    assert tree.priors[children.start : children.stop].sum() == pytest.approx(1)
+
+
+def test_array_tree_puct_batches():
+    evaluator = UniformEvaluator()
+    mcts_agent = MCTSAgent(
+        player=1,
+        max_iterations=17,
+        evaluator=evaluator,
+        batch_size=8,
+        tree_capacity=10**5,
+    )
+    mcts_agent._array_search(QuoridorState.init_from_pgn("e2/e8"))
+    # the root alone, then the virtual losses spread full batches over its children
+    assert evaluator.batch_sizes == [1, 8, 8]
+    assert mcts_agent.tree.visits[0] == 17
+
+
+def test_array_tree_reuse():
+    mcts_agent = MCTSAgent(player=1, max_iterations=200, tree_capacity=10**5)
+    quoridor_env: QuoridorEnv = env()
+    quoridor_env.reset()
+    observation, reward, termination, truncation, info = quoridor_env.last()
+    action = mcts_agent.act(observation, reward, info)
+    quoridor_env.step(action)
+    tree = mcts_agent.tree
+    played = tree.find_child(0, action)
+    reply = tree.best_child(played)
+    visits = int(tree.visits[reply])
+    quoridor_env.step(int(tree.actions[reply]))
+
+    observation, reward, termination, truncation, info = quoridor_env.last()
+    mcts_agent.max_iterations = 1
+    mcts_agent.act(observation, reward, info)
+    assert tree.visits[0] == visits + 1
+
+
+@pytest.mark.parametrize("tree_capacity", [None, 10**5])
+def test_telemetry(tree_capacity):
+    mcts_agent = MCTSAgent(player=1, max_iterations=50, tree_capacity=tree_capacity)
+    telemetry = Telemetry()
+    mcts_agent.set_telemetry(telemetry)
+    quoridor_env: QuoridorEnv = env()
+    quoridor_env.reset()
+    observation, reward, termination, truncation, info = quoridor_env.last()
+    mcts_agent.act(observation, reward, info)
+
+    assert telemetry.counters == {"searches": 1}
+    assert telemetry.samples["iterations"] == [50]
+    assert telemetry.timers["rollout"][0] == 50
+    assert telemetry.timers["backpropagate"][0] == 50
+    assert telemetry.timers["expand"][0] >= 1
+    assert telemetry.timers["select"][0] >= 49
+    assert "memory" in telemetry.samples or peak_memory() is None
+
+    # without a collector the plain methods run again
+    mcts_agent.set_telemetry(None)
+    assert "_rollout_state" not in vars(mcts_agent)
+    if tree_capacity is not None:
+        assert "expand" not in vars(mcts_agent.tree)
+    mcts_agent.act(observation, reward, info)
+    assert telemetry.counters == {"searches": 1}
+
+
+@pytest.mark.parametrize("rollout_plies", [0, 4])
+def test_cut_rollouts(rollout_plies):
+    mcts_agent = MCTSAgent(player=1, max_iterations=300, rollout_plies=rollout_plies)
+    state = QuoridorState.init_from_pgn("e2/d9/e3/c9/e4/b9/e5/a9/e6/a8/e7/a7/e8/a6")
+    node = MCTSAgent.Node(state)
+    reward = mcts_agent._rollout(node)
+    # the reward is for player 2, who moved into the state and is behind
+    assert -1 <= reward < 0
+    if rollout_plies == 0:
+        assert reward == -mcts_agent.evaluation.value(state)
+    root = MCTSAgent.Node(state)
+    action = mcts_agent._search(root)
+    assert action in state.legal_actions()
+    if rollout_plies == 0:
+        # valued leaves tell the winning move from the random rollouts that win too
+        assert action == 76
@@ -0,0 +1,78 @@
+import json
+import pytest
+from Agents import telemetry as telemetry_module
+from Agents.telemetry import Telemetry, peak_memory
+
+
+def test_collect():
+    telemetry = Telemetry()
+    telemetry.count("moves")
+    telemetry.count("moves", 2)
+    telemetry.add_time("search", 0.5)
+    with telemetry.timer("search"):
+        pass
+    for value in range(1, 101):
+        telemetry.observe("move_time", value)
+    telemetry.observe("memory", None)
+
+    summary = telemetry.summary()
+    assert summary["moves"] == {"count": 3}
+    assert summary["search"]["calls"] == 2
+    assert 0.5 <= summary["search"]["total"] < 0.6
+    assert summary["move_time"]["count"] == 100
+    assert summary["move_time"]["mean"] == 50.5
+    assert summary["move_time"]["p50"] == 50.5
+    assert summary["move_time"]["max"] == 100
+    assert "memory" not in summary
+    counts, edges = telemetry.histogram("move_time", bins=4)
+    assert list(counts) == [25, 25, 25, 25]
+    assert edges[0] == 1 and edges[-1] == 100
+
+
+def test_timed():
+    telemetry = Telemetry()
+    square = telemetry.timed("square", lambda x: x * x)
+    assert square(3) == 9
+    assert square(4) == 16
+    assert telemetry.timers["square"][0] == 2
+
+    def fail():
+        raise ValueError
+
+    with pytest.raises(ValueError):
+        telemetry.timed("square", fail)()
+    assert telemetry.timers["square"][0] == 3
+
+
+def test_merge():
+    first = Telemetry()
+    first.count("games")
+    first.add_time("rollout", 1.0, 10)
+    first.observe("move_time", 1.0)
+    second = Telemetry()
+    second.count("games")
+    second.add_time("rollout", 2.0, 5)
+    second.observe("move_time", 3.0)
+
+    # through JSON, as from a worker process
+    first.merge(Telemetry.from_dict(json.loads(json.dumps(second.to_dict()))))
+    assert first.counters == {"games": 2}
+    assert first.timers == {"rollout": [15, 3.0]}
+    assert first.samples == {"move_time": [1.0, 3.0]}
+    assert second.samples == {"move_time": [3.0]}
+
+
+def test_peak_memory():
+    memory = peak_memory()
+    assert memory is None or memory > 0
+
+
+@pytest.mark.skipif(telemetry_module.resource is None, reason="no resource module")
+@pytest.mark.parametrize("platform, expected", [("linux", 2048), ("darwin", 2)])
+def test_peak_memory_units(monkeypatch, platform, expected):
+    class Usage:
+        ru_maxrss = 2
+
+    monkeypatch.setattr(telemetry_module.resource, "getrusage", lambda who: Usage)
+    monkeypatch.setattr(telemetry_module.sys, "platform", platform)
+    assert peak_memory() == expected
@@ -0,0 +1,31 @@
+import pytest
+from Agents.time_manager import MIN_MOVES_TO_GO, TimeManager
+from Environment.state import QuoridorState
+
+
+def test_budget():
+    manager = TimeManager(60, increment=1, overhead=0)
+    # 8 moves to the goal and 10 walls for each player, a close race
+    state = QuoridorState()
+    assert manager.budget(state) == pytest.approx((60 / 18 + 1) * 1.5)
+    # player 1 is 4 moves ahead
+    state = QuoridorState.init_from_pgn("e2/a1h/e3/c1h/e4/e1h/e5/g1h")
+    assert manager.budget(state) == pytest.approx(60 / 14 + 1)
+
+
+def test_budget_limits():
+    manager = TimeManager(60, overhead=0.5)
+    state = QuoridorState.init_from_pgn("e2/e8")
+    # at least MIN_MOVES_TO_GO moves
+    state.walls_left = [0, 0]
+    assert manager.budget(state) == pytest.approx(60 / MIN_MOVES_TO_GO * 1.5 - 0.5)
+    manager.max_fraction = 0.05
+    assert manager.budget(state) == pytest.approx(3 - 0.5)
+    manager.time_left = 0.1
+    assert manager.budget(state) == 0
+
+
+def test_update():
+    manager = TimeManager(10, increment=2)
+    manager.update(3)
+    assert manager.time_left == 9
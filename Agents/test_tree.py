@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+from Agents.tree import NO_CHILDREN, ArrayTree
+
+
+def test_expand():
+    tree = ArrayTree(capacity=10)
+    assert len(tree) == 1
+    assert tree.children(0) == range(0)
+
+    assert tree.expand(0, [3, 5, 7], [0.2, 0.3, 0.5])
+    assert tree.children(0) == range(1, 4)
+    assert list(tree.actions[1:4]) == [3, 5, 7]
+    assert list(tree.priors[1:4]) == pytest.approx([0.2, 0.3, 0.5])
+    assert tree.find_child(0, 5) == 2
+    assert tree.find_child(0, 4) == -1
+    assert tree.find_child(1, 3) == -1
+
+    # no room for the children, the node stays a leaf
+    assert not tree.expand(1, list(range(7)))
+    assert tree.first_child[1] == NO_CHILDREN
+    assert len(tree) == 4
+    assert tree.nbytes == 10 * 23
+
+
+def test_backpropagate():
+    tree = ArrayTree(capacity=10)
+    tree.expand(0, [0, 1])
+    tree.expand(1, [2, 3])
+    tree.backpropagate([0, 1, 3], 1)
+
+    assert list(tree.visits[:5]) == [1, 1, 0, 1, 0]
+    assert list(tree.value_sums[:5]) == [1, -1, 0, 1, 0]
+
+    tree.add_virtual_loss([0, 1, 3], 1, 1)
+    assert list(tree.visits[[0, 1, 3]]) == [2, 2, 2]
+    tree.add_virtual_loss([0, 1, 3], -1, 1)
+    assert list(tree.visits[[0, 1, 3]]) == [1, 1, 1]
+    assert list(tree.value_sums[[0, 1, 3]]) == [1, -1, 1]
+
+    # paths of any depth
+    tree = ArrayTree(capacity=5000)
+    path = list(range(5000))
+    tree.backpropagate(path, 1)
+    assert tree.value_sums[-1] == 1
+    assert tree.value_sums[-2] == -1
+    assert tree.value_sums[0] == -1
+    assert tree.value_sums.sum() == 0
+
+
+def test_select():
+    tree = ArrayTree(capacity=10)
+    tree.expand(0, [0, 1, 2], [0.1, 0.8, 0.1])
+    # unvisited children first, in order
+    assert tree.select_uct(0, 1.414) == 1
+    tree.backpropagate([0, 1], 1)
+    assert tree.select_uct(0, 1.414) == 2
+    tree.backpropagate([0, 2], -1)
+    tree.backpropagate([0, 3], 1)
+    tree.backpropagate([0, 3], 1)
+    # child 3 has the best mean and the exploration bonus of child 1
+    assert tree.select_uct(0, 0) == 1
+    assert tree.best_child(0) == 3
+    assert tree.best_child(0, "value_sums") == 3
+    # without visits the prior decides
+    tree.reset()
+    tree.expand(0, [0, 1, 2], [0.1, 0.8, 0.1])
+    assert tree.select_puct(0, 1.5) == 2
+
+
+def test_reroot():
+    tree = ArrayTree(capacity=20)
+    tree.expand(0, [0, 1])
+    tree.expand(1, [2, 3])
+    tree.expand(2, [4, 5, 6])
+    tree.expand(5, [7])
+    tree.backpropagate([0, 2, 6], 1)
+    tree.backpropagate([0, 2, 5, 8], -1)
+
+    tree.reroot(2)
+    assert len(tree) == 5
+    # the subtree of node 2, in breadth first order
+    assert list(tree.actions[:5]) == [1, 4, 5, 6, 7]
+    assert list(tree.visits[:5]) == [2, 1, 1, 0, 1]
+    assert list(tree.value_sums[:5]) == [-2, 1, 1, 0, -1]
+    assert tree.children(0) == range(1, 4)
+    assert tree.children(1) == range(4, 5)
+    assert tree.children(2) == range(0)
+    assert tree.children(4) == range(0)
+    # the discarded nodes are reused, cleared
+    assert tree.expand(2, [8, 9])
+    assert tree.children(2) == range(5, 7)
+    assert list(tree.visits[5:7]) == [0, 0]
+    assert list(tree.first_child[5:7]) == [NO_CHILDREN, NO_CHILDREN]
@@ -0,0 +1,87 @@
+"""
+This module provides the time management of a search agent playing on a game clock.
+"""
+
+from Environment.state import QuoridorState
+
+# the seconds kept aside per move for the time spent outside the search
+MOVE_OVERHEAD = 0.05
+# the least number of moves the time left is split over
+MIN_MOVES_TO_GO = 10
+# the budget of a position where neither player is ahead by more than a move
+CLOSE_RACE_FACTOR = 1.5
+# the largest part of the time left a single move may take
+MAX_FRACTION = 0.5
+
+
+class TimeManager:
+    """
+    Splits the time left on the clock of a player over its remaining moves.
+
+    The player is expected to make as many more moves as the length of its shortest
+    path plus the walls it has left, and at least `MIN_MOVES_TO_GO`. A move gets its
+    share of the time left plus the increment, and 1.5 times that share in a close
+    race, where neither pawn is more than a move ahead, since the moves there decide
+    the game. A move never takes more than `max_fraction` of the time left, and
+    `overhead` is kept aside for the time spent outside the search.
+    """
+
+    def __init__(
+        self,
+        time_left: float,
+        increment: float = 0.0,
+        overhead: float = MOVE_OVERHEAD,
+        max_fraction: float = MAX_FRACTION,
+    ) -> None:
+        """
+        Initializes a new TimeManager instance.
+
+        Parameters:
+        -----------
+        time_left: float
+            The seconds on the clock of the player at the start of the game.
+        increment: float, optional
+            The seconds added to the clock after every move (default is 0).
+        overhead: float, optional
+            The seconds kept aside per move (default is `MOVE_OVERHEAD`).
+        max_fraction: float, optional
+            The largest part of the time left a move may take.
+        """
+        self.time_left = time_left
+        self.increment = increment
+        self.overhead = overhead
+        self.max_fraction = max_fraction
+
+    def budget(self, state: QuoridorState) -> float:
+        """
+        Returns the time budget of the search of the given position.
+
+        Parameters:
+        -----------
+        state: QuoridorState
+            The position, with the player of the clock to move.
+
+        Returns:
+        --------
+        float:
+            The seconds the search may take, 0 when the clock is about to run out.
+        """
+        player = state.current
+        path_length = state.path_length(player)
+        moves_to_go = max(MIN_MOVES_TO_GO, path_length + state.walls_left[player])
+        share = self.time_left / moves_to_go + self.increment
+        if abs(path_length - state.path_length(1 - player)) <= 1:
+            share *= CLOSE_RACE_FACTOR
+        share = min(share, self.max_fraction * self.time_left)
+        return max(0.0, share - self.overhead)
+
+    def update(self, elapsed: float) -> None:
+        """
+        Charges a move to the clock.
+
+        Parameters:
+        -----------
+        elapsed: float
+            The seconds the move took.
+        """
+        self.time_left += self.increment - elapsed
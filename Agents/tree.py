@@ -0,0 +1,313 @@
+"""
+This module provides a search tree stored in preallocated NumPy arrays.
+
+Every node is an index into a set of arrays (struct of arrays): its visits, the sum of
+its rewards, the prior probability and the action of the move leading to it, and the
+index and number of its children. The children of a node are allocated together, so
+they form a contiguous slice and selecting among them is a vectorized operation on
+that slice. A node takes 23 bytes and holds no game state: the state of a node is
+rebuilt by playing the actions on the path from the root.
+
+Nodes come from a pool of fixed capacity with bump allocation. Moving the root to a
+node compacts its subtree to the front of the pool, so the nodes of the discarded
+subtrees are reused by the next search.
+"""
+
+from math import log, sqrt
+from typing import List, Sequence
+import numpy as np
+
+NO_CHILDREN = -1
+
+
+class ArrayTree:
+    """
+    Search tree in preallocated arrays, with the root at index 0.
+
+    Rewards follow `MCTSAgent`: the reward of a node is for the player who made the
+    move leading to it.
+    """
+
+    def __init__(self, capacity: int = 1_000_000) -> None:
+        """
+        Initializes a new ArrayTree instance holding only a root.
+
+        Parameters
+        ----------
+        capacity : int, optional
+            The maximum number of nodes (default is 1,000,000, about 23 MB).
+        """
+        self.capacity = capacity
+        self.visits = np.zeros(capacity, dtype=np.int32)
+        self.value_sums = np.zeros(capacity, dtype=np.float64)
+        self.priors = np.zeros(capacity, dtype=np.float32)
+        self.first_child = np.full(capacity, NO_CHILDREN, dtype=np.int32)
+        self.num_children = np.zeros(capacity, dtype=np.int16)
+        self.actions = np.zeros(capacity, dtype=np.uint8)
+        self.size = 0
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Removes all nodes but a new root.
+        """
+        self.size = 1
+        self._clear(0, 1)
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def nbytes(self) -> int:
+        """
+        The memory taken by the arrays of the pool.
+        """
+        return sum(
+            array.nbytes
+            for array in (
+                self.visits,
+                self.value_sums,
+                self.priors,
+                self.first_child,
+                self.num_children,
+                self.actions,
+            )
+        )
+
+    def children(self, node: int) -> range:
+        """
+        Returns the indices of the children of the given node.
+
+        Parameters
+        ----------
+        node : int
+            The node.
+
+        Returns
+        -------
+        range
+            The indices, empty if the node is not expanded.
+        """
+        first = int(self.first_child[node])
+        if first == NO_CHILDREN:
+            return range(0)
+        return range(first, first + int(self.num_children[node]))
+
+    def expand(
+        self, node: int, actions: Sequence[int], priors: Sequence[float] = None
+    ) -> bool:
+        """
+        Allocates the children of the given node.
+
+        Parameters
+        ----------
+        node : int
+            The node, without children.
+        actions : Sequence[int]
+            The discrete actions of the children.
+        priors : Sequence[float], optional
+            The prior probabilities of the actions (default is 0).
+
+        Returns
+        -------
+        bool
+            False if the pool has no room for the children, the node stays a leaf.
+        """
+        count = len(actions)
+        start = self.size
+        if count == 0 or start + count > self.capacity:
+            return False
+        stop = start + count
+        self._clear(start, stop)
+        self.actions[start:stop] = actions
+        if priors is not None:
+            self.priors[start:stop] = priors
+        self.first_child[node] = start
+        self.num_children[node] = count
+        self.size = stop
+        return True
+
+    def select_uct(self, node: int, exploration: float) -> int:
+        """
+        Selects the child of the given node to visit with UCT: the first unvisited
+        child, or else the child with the highest mean reward plus exploration bonus.
+
+        Parameters
+        ----------
+        node : int
+            The expanded node.
+        exploration : float
+            The exploration constant.
+
+        Returns
+        -------
+        int
+            The selected child.
+        """
+        first = int(self.first_child[node])
+        stop = first + int(self.num_children[node])
+        visits = self.visits[first:stop]
+        unvisited = visits <= 0
+        if unvisited.any():
+            return first + int(unvisited.argmax())
+        scores = self.value_sums[first:stop] / visits + exploration * np.sqrt(
+            log(max(int(self.visits[node]), 1)) / visits
+        )
+        return first + int(scores.argmax())
+
+    def select_puct(self, node: int, c_puct: float) -> int:
+        """
+        Selects the child of the given node to visit with PUCT: the highest mean
+        reward, 0 for unvisited children, plus prior weighted exploration bonus.
+
+        Parameters
+        ----------
+        node : int
+            The expanded node.
+        c_puct : float
+            The weight of the exploration bonus.
+
+        Returns
+        -------
+        int
+            The selected child.
+        """
+        first = int(self.first_child[node])
+        stop = first + int(self.num_children[node])
+        visits = self.visits[first:stop]
+        values = self.value_sums[first:stop] / np.maximum(visits, 1)
+        exploration = c_puct * sqrt(max(int(self.visits[node]), 1)) / (1 + visits)
+        return first + int((values + self.priors[first:stop] * exploration).argmax())
+
+    def backpropagate(self, path: List[int], reward: float) -> None:
+        """
+        Adds a visit and a reward to every node of a path, flipping the sign of the
+        reward at every level.
+
+        Parameters
+        ----------
+        path : List[int]
+            The nodes from the root down to the node the reward is for.
+        reward : float
+            The reward of the last node of the path.
+        """
+        # the sign of the reward at every level, seen from the last node
+        signs = np.ones(len(path))
+        signs[len(path) % 2 :: 2] = -1
+        self.visits[path] += 1
+        self.value_sums[path] += reward * signs
+
+    def add_virtual_loss(self, path: List[int], sign: int, loss: float) -> None:
+        """
+        Adds (sign 1) or removes (sign -1) a virtual loss on a path, see
+        `MCTSAgent._add_virtual_loss`.
+
+        Parameters
+        ----------
+        path : List[int]
+            The nodes from the root down to a pending leaf.
+        sign : int
+            1 to add the virtual loss, -1 to remove it.
+        loss : float
+            The reward counted as lost.
+        """
+        self.visits[path] += sign
+        self.value_sums[path] -= sign * loss
+
+    def best_child(self, node: int, by: str = "visits") -> int:
+        """
+        Returns the child of the given node with the most visits or reward.
+
+        Parameters
+        ----------
+        node : int
+            The expanded node.
+        by : str, optional
+            "visits" or "value_sums" (default is "visits").
+
+        Returns
+        -------
+        int
+            The child.
+        """
+        children = self.children(node)
+        values = getattr(self, by)[children.start : children.stop]
+        return children.start + int(values.argmax())
+
+    def find_child(self, node: int, action: int) -> int:
+        """
+        Returns the child of the given node reached with the given action.
+
+        Parameters
+        ----------
+        node : int
+            The node.
+        action : int
+            The discrete action.
+
+        Returns
+        -------
+        int
+            The child, or -1 if the node has no such child.
+        """
+        children = self.children(node)
+        matches = np.flatnonzero(self.actions[children.start : children.stop] == action)
+        return children.start + int(matches[0]) if len(matches) else -1
+
+    def reroot(self, node: int) -> None:
+        """
+        Makes the given node the root, keeping only its subtree. The subtree is
+        compacted to the front of the pool, in breadth first order, so its nodes
+        keep their statistics and all other nodes are free again.
+
+        Parameters
+        ----------
+        node : int
+            The new root.
+        """
+        if node == 0:
+            return
+        used = slice(0, self.size)
+        old = {
+            name: getattr(self, name)[used].copy()
+            for name in ("visits", "value_sums", "priors", "actions")
+        }
+        old_first = self.first_child[used].copy()
+        old_counts = self.num_children[used].copy()
+
+        self.size = 1
+        self._clear(0, 1)
+        self._copy(old, node, 0, 1)
+        # pairs of old and new indices of the expanded nodes, in breadth first order
+        queue = [(node, 0)] if old_counts[node] > 0 else []
+        for old_node, new_node in queue:
+            count = int(old_counts[old_node])
+            first = int(old_first[old_node])
+            start = self.size
+            self.size += count
+            self._clear(start, self.size)
+            self._copy(old, first, start, count)
+            self.first_child[new_node] = start
+            self.num_children[new_node] = count
+            expanded = np.flatnonzero(old_counts[first : first + count] > 0)
+            queue.extend(zip((first + expanded).tolist(), (start + expanded).tolist()))
+
+    def _clear(self, start: int, stop: int) -> None:
+        """
+        Resets the nodes [start, stop) to unvisited leaves.
+        """
+        self.visits[start:stop] = 0
+        self.value_sums[start:stop] = 0
+        self.priors[start:stop] = 0
+        self.first_child[start:stop] = NO_CHILDREN
+        self.num_children[start:stop] = 0
+        self.actions[start:stop] = 0
+
+    def _copy(self, old: dict, source: int, target: int, count: int) -> None:
+        """
+        Copies the statistics of `count` nodes of a saved pool into the pool.
+        """
+        for name, values in old.items():
+            getattr(self, name)[target : target + count] = values[
+                source : source + count
+            ]
@@ -1 +1,5 @@
-from .env import QuoridorEnv, env
+from .env import QuoridorEnv, env, parallel_env
+from .vec_env import QuoridorVecEnv
+from .rollout_pool import RolloutPool
+from .records import GameRecord, GameRecordReader, GameRecordWriter
+from .replay import EpisodeRecorder, ReplayBuffer
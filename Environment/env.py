@@ -5,7 +5,7 @@
 | Import             | `from Environment import QuoridorEnv, env` |
 |--------------------|------------------------------------|
 | Actions            | Discrete                           |
-| Parallel API       | No                                |
+| Parallel API       | Yes (turn based, `parallel_env`)  |
 | Manual Control     | No                                 |
 | Agents             | `agents= ['player_1', 'player_2']` |
 | Agents             | 2                                  |
@@ -79,18 +79,15 @@ Which means the action space can be represented with an action shape of Discrete
 """
 
 
-from quoridor import Quoridor
 import numpy as np
 from gymnasium import spaces
-from pettingzoo import AECEnv
+from pettingzoo import AECEnv, ParallelEnv
 from pettingzoo.utils import wrappers
+from pettingzoo.utils.conversions import turn_based_aec_to_parallel
 from pettingzoo.utils.agent_selector import agent_selector
 from pettingzoo.test import api_test  # noqa: E402
-from Environment.utils import (
-    board_to_observation,
-    convert_discrete_to_quoridor_move,
-    convert_quoridor_move_to_discrete,
-)
+from Environment.state import QuoridorState
+from Environment.utils import state_to_observation, update_observation
 
 
 class QuoridorEnv(AECEnv):
@@ -107,7 +104,8 @@ class QuoridorEnv(AECEnv):
 
     def __init__(self, render_mode: str = None):
         super().__init__()
-        self.board = Quoridor()
+        self.board = QuoridorState()
+        self._observation = state_to_observation(self.board)
         self.agents = ["player_1", "player_2"]
         self.possible_agents = self.agents[:]
         self._agent_selector = agent_selector(self.agents)
@@ -163,7 +161,8 @@ class QuoridorEnv(AECEnv):
 
         self.agents = self.possible_agents[:]
 
-        self.board = Quoridor()
+        self.board = QuoridorState()
+        self._observation = state_to_observation(self.board)
 
         self._agent_selector = agent_selector(self.agents)
 
@@ -193,8 +192,8 @@ class QuoridorEnv(AECEnv):
         ):
             return self._was_dead_step(action)
 
-        chosen_move = convert_discrete_to_quoridor_move(action)
-        self.board.make_move(chosen_move)
+        self.board.make_action(action)
+        update_observation(self._observation, self.board, int(action))
         game_over = self.board.is_terminated
 
         if game_over:
@@ -252,10 +251,9 @@ class QuoridorEnv(AECEnv):
         observation: dict
             A dictionary containing the observation and action mask.
         """
-        observation = board_to_observation(self.board)
-        action_mask = np.zeros(209, dtype=np.int8)
-        for move in self.board.get_legal_moves():
-            action_mask[convert_quoridor_move_to_discrete(move)] = True
+        # the observation is kept up to date by `step`, the copy belongs to the caller
+        observation = self._observation.copy()
+        action_mask = self.board.legal_action_mask()
         return {"observation": observation, "action_mask": action_mask}
 
     def render(self) -> None:
@@ -325,5 +323,25 @@ def env(render_mode: str = None) -> QuoridorEnv:
     return env
 
 
+def parallel_env(render_mode: str = None) -> ParallelEnv:
+    """
+    Create a Quoridor environment with the PettingZoo Parallel API.
+
+    Quoridor is turn based: every step only the action of the agent in the
+    `active_agent` info is played.
+
+    Parameters:
+    -----------
+    render_mode: str, optional
+        The render mode for the environment (default is None).
+
+    Returns:
+    --------
+    env: ParallelEnv
+        The created Quoridor environment.
+    """
+    return turn_based_aec_to_parallel(env(render_mode=render_mode))
+
+
 if __name__ == "__main__":
     api_test(QuoridorEnv(), num_cycles=1_000_000)
@@ -0,0 +1,290 @@
+"""
+This module provides a compact binary format for finished games.
+
+A record file starts with the 4 byte magic ``b"QGR2"``, followed by the records of the
+games back to back. A record is a fixed header (number of moves, winner and flags,
+lengths of the agent names and seed), the UTF-8 names of the two agents and one byte
+per move, the discrete action of the move. A game has at most 65535 moves, names take
+at most 255 bytes and seeds are signed 64-bit integers. A game of 60 moves between two named agents takes about
+100 bytes, against over 200 bytes of PGN text, and its moves are read without parsing.
+
+The writer only appends to the file, and the reader maps it into memory, so a file can
+be read while games are still being written to it: a reader sees the games that were
+complete when it was opened. A record cut short by an interrupted writer is ignored by
+the reader and removed by the next writer. Files of the first version, ``b"QGR1"``,
+where a seed of -1 stood for no seed, can still be read but not appended to.
+"""
+
+import os
+import struct
+from typing import Iterator, List, NamedTuple, Optional, Sequence, Union
+import numpy as np
+from .utils import MOVE_ARRAY, NUM_ACTIONS, convert_quoridor_moves_to_discrete
+
+MAGIC = b"QGR2"
+# the magic of the first version of the format, without the seed flag
+LEGACY_MAGIC = b"QGR1"
+# number of moves, winner (0 if unknown, 1 or 2) and flags, lengths of the two agent
+# names and seed (0 if unknown)
+RECORD_HEADER = struct.Struct("<HBBBq")
+# the flag of the winner byte set when the record has a seed
+HAS_SEED = 0x80
+WINNER_MASK = 0x03
+# the seed of a record of the first version without a seed
+LEGACY_NO_SEED = -1
+MAX_MOVES = 2**16 - 1
+MAX_NAME_BYTES = 2**8 - 1
+MIN_SEED = -(2**63)
+MAX_SEED = 2**63 - 1
+
+
+class GameRecord(NamedTuple):
+    """
+    A finished game.
+
+    Attributes
+    ----------
+    moves : np.ndarray
+        The (M,) uint8 discrete actions of the moves.
+    agent_1 : str
+        The name of the agent of player 1.
+    agent_2 : str
+        The name of the agent of player 2.
+    winner : int
+        The winning player, 1 or 2, or 0 if unknown.
+    seed : int, optional
+        The seed of the game.
+    """
+
+    moves: np.ndarray
+    agent_1: str = ""
+    agent_2: str = ""
+    winner: int = 0
+    seed: Optional[int] = None
+
+    @classmethod
+    def from_pgn(cls, pgn: str, **kwargs) -> "GameRecord":
+        """
+        Create a record from a PGN string.
+
+        Parameters
+        ----------
+        pgn : str
+            The PGN string.
+        **kwargs
+            The other fields of the record.
+
+        Returns
+        -------
+        GameRecord
+            The record.
+        """
+        moves = pgn.split("/") if pgn else []
+        actions = convert_quoridor_moves_to_discrete(np.array(moves, dtype=str))
+        return cls(actions.astype(np.uint8), **kwargs)
+
+    def to_pgn(self) -> str:
+        """
+        Convert the moves of the record to a PGN string.
+
+        Returns
+        -------
+        str
+            The PGN string.
+        """
+        return "/".join(MOVE_ARRAY[self.moves])
+
+
+class GameRecordWriter:
+    """
+    Appends game records to a file.
+    """
+
+    def __init__(self, path: Union[str, os.PathLike]):
+        """
+        Open a record file for appending, creating it if needed.
+
+        Parameters
+        ----------
+        path : str or os.PathLike
+            The path of the file.
+        """
+        self.path = path
+        end = None
+        if os.path.exists(path) and os.path.getsize(path) >= len(MAGIC):
+            reader = GameRecordReader(path)
+            if reader.legacy:
+                raise ValueError(f"{path} is in an older format, it cannot be appended")
+            end = reader.end
+        elif os.path.exists(path):
+            with open(path, "rb") as file:
+                if not MAGIC.startswith(file.read()):
+                    raise ValueError(f"{path} is not a game record file")
+        self._file = open(path, "ab")
+        if end is None:
+            # a new file, or one cut short in its magic number
+            self._file.truncate(0)
+            self._file.write(MAGIC)
+        elif end < self._file.tell():
+            # drop the record cut short, the next record would be appended to it
+            self._file.truncate(end)
+
+    def write(
+        self,
+        moves: Union[Sequence[int], str],
+        agent_1: str = "",
+        agent_2: str = "",
+        winner: int = 0,
+        seed: Optional[int] = None,
+    ) -> None:
+        """
+        Append a game.
+
+        Parameters
+        ----------
+        moves : Sequence[int] or str
+            The discrete actions of the moves, or a PGN string.
+        agent_1 : str, optional
+            The name of the agent of player 1.
+        agent_2 : str, optional
+            The name of the agent of player 2.
+        winner : int, optional
+            The winning player, 1 or 2, or 0 if unknown (default).
+        seed : int, optional
+            The seed of the game.
+        """
+        if isinstance(moves, str):
+            moves = GameRecord.from_pgn(moves).moves
+        moves = np.asarray(moves)
+        if moves.size and (moves.min() < 0 or moves.max() >= NUM_ACTIONS):
+            raise ValueError("Moves must be discrete actions")
+        if moves.size > MAX_MOVES:
+            raise ValueError(f"A game has at most {MAX_MOVES} moves, not {moves.size}")
+        if winner not in (0, 1, 2):
+            raise ValueError(f"Invalid winner: {winner}")
+        names = agent_1.encode(), agent_2.encode()
+        for name in names:
+            if len(name) > MAX_NAME_BYTES:
+                raise ValueError(
+                    f"An agent name takes at most {MAX_NAME_BYTES} bytes, not "
+                    f"{len(name)}"
+                )
+        if seed is not None and not MIN_SEED <= seed <= MAX_SEED:
+            raise ValueError(f"The seed must be a signed 64-bit integer, not {seed}")
+        header = RECORD_HEADER.pack(
+            moves.size,
+            winner if seed is None else winner | HAS_SEED,
+            len(names[0]),
+            len(names[1]),
+            0 if seed is None else seed,
+        )
+        self._file.write(
+            header + names[0] + names[1] + moves.astype(np.uint8).tobytes()
+        )
+
+    def write_record(self, record: GameRecord) -> None:
+        """
+        Append a game record.
+
+        Parameters
+        ----------
+        record : GameRecord
+            The record.
+        """
+        self.write(*record)
+
+    def flush(self) -> None:
+        """
+        Flush the written games to the file.
+        """
+        self._file.flush()
+
+    def close(self) -> None:
+        """
+        Close the file.
+        """
+        self._file.close()
+
+    def __enter__(self) -> "GameRecordWriter":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+class GameRecordReader:
+    """
+    Reads the game records of a file, mapped into memory.
+
+    Opening the reader scans the headers to find the offsets of the records, the moves
+    are only read when a record is accessed. The moves of a record are a view on the
+    mapped file.
+
+    Attributes
+    ----------
+    legacy : bool
+        Whether the file is of the first version of the format.
+    end : int
+        The offset of the end of the last complete record.
+    """
+
+    def __init__(self, path: Union[str, os.PathLike]):
+        """
+        Map a record file into memory.
+
+        Parameters
+        ----------
+        path : str or os.PathLike
+            The path of the file, a ValueError is raised if it is not a record file.
+        """
+        self.path = path
+        if os.path.getsize(path) < len(MAGIC):
+            raise ValueError(f"{path} is not a game record file")
+        self._data = np.memmap(path, dtype=np.uint8, mode="r")
+        magic = bytes(self._data[: len(MAGIC)])
+        if magic not in (MAGIC, LEGACY_MAGIC):
+            raise ValueError(f"{path} is not a game record file")
+        self.legacy = magic == LEGACY_MAGIC
+        self._offsets: List[int] = []
+        offset = len(MAGIC)
+        size = len(self._data)
+        while offset + RECORD_HEADER.size <= size:
+            num_moves, _, length_1, length_2, _ = RECORD_HEADER.unpack_from(
+                self._data, offset
+            )
+            end = offset + RECORD_HEADER.size + length_1 + length_2 + num_moves
+            if end > size:
+                break
+            self._offsets.append(offset)
+            offset = end
+        # the end of the last complete record
+        self.end = offset
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __getitem__(self, index: int) -> GameRecord:
+        offset = self._offsets[index]
+        num_moves, winner, length_1, length_2, seed = RECORD_HEADER.unpack_from(
+            self._data, offset
+        )
+        offset += RECORD_HEADER.size
+        agent_1 = bytes(self._data[offset : offset + length_1]).decode()
+        offset += length_1
+        agent_2 = bytes(self._data[offset : offset + length_2]).decode()
+        offset += length_2
+        if self.legacy:
+            has_seed = seed != LEGACY_NO_SEED
+        else:
+            has_seed = bool(winner & HAS_SEED)
+        return GameRecord(
+            np.asarray(self._data[offset : offset + num_moves]),
+            agent_1,
+            agent_2,
+            winner & WINNER_MASK,
+            seed if has_seed else None,
+        )
+
+    def __iter__(self) -> Iterator[GameRecord]:
+        for index in range(len(self)):
+            yield self[index]
@@ -0,0 +1,360 @@
+"""
+This module provides a replay buffer of played positions for training, stored in
+memory-mapped NumPy files.
+
+Every sample is the observation and action mask of the player to move, the action it
+played and the outcome of the game for that player. The boolean observation and mask
+are packed as bits, 61 + 27 bytes instead of 486 + 209, and the files are preallocated
+for the capacity of the buffer, so samples are written in place and a minibatch only
+reads the rows it samples.
+"""
+
+import json
+import os
+from typing import Dict, List, Optional, Union
+import numpy as np
+from .utils import NUM_ACTIONS
+
+OBSERVATION_SHAPE = (9, 9, 6)
+OBSERVATION_SIZE = int(np.prod(OBSERVATION_SHAPE))
+# name -> (shape of one sample, dtype) of every file of the buffer
+FIELDS = {
+    "observations": (((OBSERVATION_SIZE + 7) // 8,), np.uint8),
+    "action_masks": (((NUM_ACTIONS + 7) // 8,), np.uint8),
+    "actions": ((), np.uint8),
+    "outcomes": ((), np.int8),
+}
+METADATA = "buffer.json"
+
+
+def pack_observations(observations: np.ndarray) -> np.ndarray:
+    """
+    Packs observations as bits.
+
+    Parameters
+    ----------
+    observations : np.ndarray
+        The (N, 9, 9, 6) bool observations.
+
+    Returns
+    -------
+    np.ndarray
+        The (N, 61) uint8 packed observations.
+    """
+    observations = np.asarray(observations, dtype=bool)
+    return np.packbits(observations.reshape(len(observations), -1), axis=1)
+
+
+def unpack_observations(packed: np.ndarray) -> np.ndarray:
+    """
+    Unpacks observations packed by `pack_observations`.
+
+    Parameters
+    ----------
+    packed : np.ndarray
+        The (N, 61) uint8 packed observations.
+
+    Returns
+    -------
+    np.ndarray
+        The (N, 9, 9, 6) bool observations.
+    """
+    bits = np.unpackbits(packed, axis=1, count=OBSERVATION_SIZE)
+    return bits.view(bool).reshape(len(packed), *OBSERVATION_SHAPE)
+
+
+def pack_action_masks(action_masks: np.ndarray) -> np.ndarray:
+    """
+    Packs action masks as bits.
+
+    Parameters
+    ----------
+    action_masks : np.ndarray
+        The (N, 209) action masks.
+
+    Returns
+    -------
+    np.ndarray
+        The (N, 27) uint8 packed action masks.
+    """
+    return np.packbits(np.asarray(action_masks) != 0, axis=1)
+
+
+def unpack_action_masks(packed: np.ndarray) -> np.ndarray:
+    """
+    Unpacks action masks packed by `pack_action_masks`.
+
+    Parameters
+    ----------
+    packed : np.ndarray
+        The (N, 27) uint8 packed action masks.
+
+    Returns
+    -------
+    np.ndarray
+        The (N, 209) int8 action masks, as returned by the environments.
+    """
+    return np.unpackbits(packed, axis=1, count=NUM_ACTIONS).view(np.int8)
+
+
+class ReplayBuffer:
+    """
+    Ring buffer of samples in memory-mapped files in a directory.
+
+    Once the buffer is full the oldest samples are overwritten. Opening a directory
+    that already holds a buffer continues with its samples. The size and position of
+    the buffer are only saved by `flush` and `close`, so samples added after the last
+    of them are not seen when the directory is opened again.
+    """
+
+    def __init__(
+        self, directory: Union[str, os.PathLike], capacity: Optional[int] = None
+    ):
+        """
+        Create a buffer, or open the buffer in the given directory.
+
+        Parameters
+        ----------
+        directory : str or os.PathLike
+            The directory of the files of the buffer.
+        capacity : int, optional
+            The maximum number of samples of a new buffer. It must be left out or
+            match when an existing buffer is opened.
+        """
+        self.directory = directory
+        metadata = os.path.join(directory, METADATA)
+        if os.path.exists(metadata):
+            with open(metadata, encoding="utf-8") as file:
+                state = json.load(file)
+            if capacity not in (None, state["capacity"]):
+                raise ValueError(
+                    f"The buffer in {directory} has a capacity of {state['capacity']}"
+                )
+            mode = "r+"
+        elif capacity is None:
+            raise ValueError(f"There is no buffer in {directory}, give a capacity")
+        else:
+            os.makedirs(directory, exist_ok=True)
+            state = {"capacity": capacity, "size": 0, "position": 0}
+            mode = "w+"
+        self.capacity: int = state["capacity"]
+        self.size: int = state["size"]
+        self.position: int = state["position"]
+        self._arrays: Dict[str, np.memmap] = {
+            name: np.lib.format.open_memmap(
+                os.path.join(directory, f"{name}.npy"),
+                mode=mode,
+                dtype=dtype,
+                shape=(self.capacity, *shape),
+            )
+            for name, (shape, dtype) in FIELDS.items()
+        }
+        if mode == "w+":
+            self._save_metadata()
+
+    def __len__(self) -> int:
+        return self.size
+
+    def add(
+        self,
+        observations: np.ndarray,
+        action_masks: np.ndarray,
+        actions: np.ndarray,
+        outcomes: np.ndarray,
+    ) -> None:
+        """
+        Adds samples to the buffer.
+
+        Parameters
+        ----------
+        observations : np.ndarray
+            The (N, 9, 9, 6) observations, or the (N, 61) packed observations.
+        action_masks : np.ndarray
+            The (N, 209) action masks, or the (N, 27) packed action masks.
+        actions : np.ndarray
+            The (N,) actions played.
+        outcomes : np.ndarray or int
+            The (N,) outcomes of the games for the players to move: 1 for a win, -1
+            for a loss.
+        """
+        observations = np.asarray(observations)
+        if observations.shape[1:] == OBSERVATION_SHAPE:
+            observations = pack_observations(observations)
+        action_masks = np.asarray(action_masks)
+        if action_masks.shape[1:] == (NUM_ACTIONS,):
+            action_masks = pack_action_masks(action_masks)
+        count = len(observations)
+        samples = {
+            "observations": observations,
+            "action_masks": action_masks,
+            "actions": np.broadcast_to(actions, count),
+            "outcomes": np.broadcast_to(outcomes, count),
+        }
+        # the last `capacity` samples, written from the position and wrapping around
+        start = max(0, count - self.capacity)
+        rows = (self.position + np.arange(start, count)) % self.capacity
+        for name, array in self._arrays.items():
+            array[rows] = samples[name][start:]
+        self.position = (self.position + count) % self.capacity
+        self.size = min(self.size + count, self.capacity)
+
+    def sample(
+        self, batch_size: int, rng: Optional[np.random.Generator] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Samples a minibatch uniformly, with replacement.
+
+        Parameters
+        ----------
+        batch_size : int
+            The number of samples.
+        rng : np.random.Generator, optional
+            The random generator (default is a new unseeded generator).
+
+        Returns
+        -------
+        Dict[str, np.ndarray]
+            The unpacked "observations", "action_masks", "actions" and "outcomes".
+        """
+        if self.size == 0:
+            raise ValueError("The buffer is empty")
+        rng = np.random.default_rng() if rng is None else rng
+        # reading the rows in file order keeps the reads sequential
+        rows = np.sort(rng.integers(self.size, size=batch_size))
+        return {
+            "observations": unpack_observations(self._arrays["observations"][rows]),
+            "action_masks": unpack_action_masks(self._arrays["action_masks"][rows]),
+            "actions": np.asarray(self._arrays["actions"][rows], dtype=np.int64),
+            "outcomes": np.asarray(self._arrays["outcomes"][rows]),
+        }
+
+    def flush(self) -> None:
+        """
+        Writes the samples to disk.
+        """
+        for array in self._arrays.values():
+            array.flush()
+        self._save_metadata()
+
+    def close(self) -> None:
+        """
+        Writes the samples to disk and releases the files, the buffer cannot be used
+        afterwards.
+        """
+        self.flush()
+        self._arrays = {}
+
+    def __enter__(self) -> "ReplayBuffer":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def _save_metadata(self) -> None:
+        """
+        Writes the size and position of the buffer.
+        """
+        path = os.path.join(self.directory, METADATA)
+        state = {
+            "capacity": self.capacity,
+            "size": self.size,
+            "position": self.position,
+        }
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(state, file)
+
+
+class EpisodeRecorder:
+    """
+    Records the games of a `QuoridorVecEnv` or `RolloutPool` into a replay buffer.
+
+    The samples of a game are kept until it ends, when its outcome is known, and then
+    added to the buffer. Per step, call `record` with the observations, action masks
+    and actions of the players to move before stepping, and `finish` with what the
+    step returns.
+    """
+
+    def __init__(self, buffer: ReplayBuffer, num_envs: int):
+        """
+        Initialize the recorder.
+
+        Parameters
+        ----------
+        buffer : ReplayBuffer
+            The buffer finished games are added to.
+        num_envs : int
+            The number of games of the environment.
+        """
+        self.buffer = buffer
+        self.num_envs = num_envs
+        # the player to move in every game, right after a reset it is player 1
+        self._players = np.ones(num_envs, dtype=np.int64)
+        self._observations: List[List[np.ndarray]] = [[] for _ in range(num_envs)]
+        self._action_masks: List[List[np.ndarray]] = [[] for _ in range(num_envs)]
+        self._actions: List[List[int]] = [[] for _ in range(num_envs)]
+        self._movers: List[List[int]] = [[] for _ in range(num_envs)]
+
+    def record(
+        self, observations: np.ndarray, action_masks: np.ndarray, actions: np.ndarray
+    ) -> None:
+        """
+        Keeps the positions of a step until their games end.
+
+        Parameters
+        ----------
+        observations : np.ndarray
+            The (N, 9, 9, 6) observations given to the players.
+        action_masks : np.ndarray
+            The (N, 209) action masks given to the players.
+        actions : np.ndarray
+            The (N,) actions of the players.
+        """
+        # packing copies, so the buffers of a `RolloutPool` can be overwritten
+        observations = pack_observations(observations)
+        action_masks = pack_action_masks(action_masks)
+        for game in range(self.num_envs):
+            self._observations[game].append(observations[game])
+            self._action_masks[game].append(action_masks[game])
+            self._actions[game].append(int(actions[game]))
+            self._movers[game].append(int(self._players[game]))
+
+    def finish(
+        self, rewards: np.ndarray, dones: np.ndarray, infos: Dict[str, np.ndarray]
+    ) -> int:
+        """
+        Adds the games that ended with the step to the buffer.
+
+        Parameters
+        ----------
+        rewards : np.ndarray
+            The (N, 2) rewards returned by the step.
+        dones : np.ndarray
+            The (N,) done flags returned by the step.
+        infos : Dict[str, np.ndarray]
+            The infos returned by the step.
+
+        Returns
+        -------
+        int
+            The number of samples added.
+        """
+        added = 0
+        for game in np.flatnonzero(dones):
+            movers = np.array(self._movers[game])
+            # the outcome of every position for the player to move
+            self.buffer.add(
+                np.stack(self._observations[game]),
+                np.stack(self._action_masks[game]),
+                np.array(self._actions[game]),
+                np.asarray(rewards[game])[movers - 1],
+            )
+            added += len(movers)
+            for samples in (
+                self._observations,
+                self._action_masks,
+                self._actions,
+                self._movers,
+            ):
+                samples[game] = []
+        self._players = np.array(infos["player"], dtype=np.int64)
+        return added
@@ -0,0 +1,250 @@
+"""
+This module provides a rollout pool that plays games on several cores at once.
+
+The games are sharded over worker processes, each running a `QuoridorVecEnv` on its
+own slice of the batch. Observations, action masks, actions, rewards and done flags
+live in shared memory, so a step only sends a short command to every worker and no
+array is ever pickled.
+"""
+
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from typing import Dict, List, Tuple
+import numpy as np
+from Environment.vec_env import QuoridorVecEnv
+
+# name -> (shape of one game, dtype) of every shared buffer
+BUFFER_SPECS: Dict[str, Tuple[tuple, type]] = {
+    "observations": ((9, 9, 6), bool),
+    "action_masks": ((209,), np.int8),
+    "actions": ((), np.int64),
+    "rewards": ((2,), np.float32),
+    "dones": ((), bool),
+    "winner": ((), np.int64),
+    "episode_length": ((), np.int64),
+    "player": ((), np.int64),
+    "turn": ((), np.int64),
+}
+INFO_KEYS = ("winner", "episode_length", "player", "turn")
+
+
+def _attach(
+    names: Dict[str, str], num_envs: int
+) -> Tuple[List[shared_memory.SharedMemory], Dict[str, np.ndarray]]:
+    """
+    Attaches to the shared buffers created by the pool.
+
+    Parameters
+    ----------
+    names : Dict[str, str]
+        The shared memory name of every buffer.
+    num_envs : int
+        The total number of games.
+
+    Returns
+    -------
+    (list, dict)
+        The shared memory blocks, to keep them alive, and the arrays on top of them.
+    """
+    blocks = []
+    arrays = {}
+    for key, (shape, dtype) in BUFFER_SPECS.items():
+        block = shared_memory.SharedMemory(name=names[key])
+        blocks.append(block)
+        arrays[key] = np.ndarray((num_envs, *shape), dtype=dtype, buffer=block.buf)
+    return blocks, arrays
+
+
+def _worker(
+    connection, names: Dict[str, str], num_envs: int, start: int, stop: int
+) -> None:
+    """
+    Runs the games [start, stop) of the pool until it is told to close.
+
+    Parameters
+    ----------
+    connection : multiprocessing.connection.Connection
+        The pipe to the pool, carrying "reset", "step" and "close" commands.
+    names : Dict[str, str]
+        The shared memory name of every buffer.
+    num_envs : int
+        The total number of games.
+    start, stop : int
+        The slice of games of this worker.
+    """
+    blocks, arrays = _attach(names, num_envs)
+    shard = {key: array[start:stop] for key, array in arrays.items()}
+    vec_env = QuoridorVecEnv(stop - start)
+    try:
+        while True:
+            command = connection.recv()
+            if command == "close":
+                break
+            if command == "reset":
+                observations, action_masks = vec_env.reset()
+                rewards, dones = 0, False
+                infos = {
+                    "winner": 0,
+                    "episode_length": 0,
+                    "player": vec_env.current + 1,
+                    "turn": vec_env.turns + 1,
+                }
+            else:
+                observations, action_masks, rewards, dones, infos = vec_env.step(
+                    shard["actions"]
+                )
+            shard["observations"][:] = observations
+            shard["action_masks"][:] = action_masks
+            shard["rewards"][:] = rewards
+            shard["dones"][:] = dones
+            for key in INFO_KEYS:
+                shard[key][:] = infos[key]
+            connection.send(True)
+    finally:
+        connection.close()
+        # the views must be gone before the blocks can be closed
+        shard.clear()
+        arrays.clear()
+        for block in blocks:
+            block.close()
+
+
+class RolloutPool:
+    """
+    Pool of worker processes playing `num_workers * envs_per_worker` games.
+
+    The arrays returned by `reset` and `step` are views on the shared buffers and are
+    overwritten by the next call; copy them to keep them.
+    """
+
+    def __init__(self, num_workers: int, envs_per_worker: int, context: str = None):
+        """
+        Start the worker processes.
+
+        Parameters
+        ----------
+        num_workers : int
+            The number of worker processes.
+        envs_per_worker : int
+            The number of games played by every worker.
+        context : str, optional
+            The multiprocessing start method (default is the platform default).
+        """
+        self.num_envs = num_workers * envs_per_worker
+        self._blocks = []
+        self._buffers: Dict[str, np.ndarray] = {}
+        for key, (shape, dtype) in BUFFER_SPECS.items():
+            size = self.num_envs * int(np.prod(shape)) * np.dtype(dtype).itemsize
+            block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+            self._blocks.append(block)
+            self._buffers[key] = np.ndarray(
+                (self.num_envs, *shape), dtype=dtype, buffer=block.buf
+            )
+        names = {key: block.name for key, block in zip(BUFFER_SPECS, self._blocks)}
+
+        ctx = mp.get_context(context)
+        self._connections = []
+        self._processes = []
+        for worker in range(num_workers):
+            parent, child = ctx.Pipe()
+            process = ctx.Process(
+                target=_worker,
+                args=(
+                    child,
+                    names,
+                    self.num_envs,
+                    worker * envs_per_worker,
+                    (worker + 1) * envs_per_worker,
+                ),
+                daemon=True,
+            )
+            process.start()
+            child.close()
+            self._connections.append(parent)
+            self._processes.append(process)
+        self.closed = False
+
+    def reset(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Reset all games.
+
+        Returns
+        -------
+        (np.ndarray, np.ndarray)
+            The (N, 9, 9, 6) observations and (N, 209) action masks.
+        """
+        self._broadcast("reset")
+        return self._buffers["observations"], self._buffers["action_masks"]
+
+    def step(
+        self, actions: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Take a step in every game, see `QuoridorVecEnv.step`.
+
+        Parameters
+        ----------
+        actions : np.ndarray
+            The (N,) discrete actions of the players to move.
+
+        Returns
+        -------
+        tuple
+            The observations, action masks, rewards, done flags and infos.
+        """
+        self._buffers["actions"][:] = actions
+        self._broadcast("step")
+        return (
+            self._buffers["observations"],
+            self._buffers["action_masks"],
+            self._buffers["rewards"],
+            self._buffers["dones"],
+            {key: self._buffers[key] for key in INFO_KEYS},
+        )
+
+    def close(self) -> None:
+        """
+        Stop the workers and release the shared buffers.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        for connection in self._connections:
+            try:
+                connection.send("close")
+            except (BrokenPipeError, OSError):
+                pass
+            connection.close()
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._buffers = {}
+        for block in self._blocks:
+            block.unlink()
+            try:
+                block.close()
+            except BufferError:
+                # views returned to the caller are still alive, the memory is
+                # released once they are garbage collected
+                pass
+
+    def _broadcast(self, command: str) -> None:
+        """
+        Send a command to every worker and wait until all of them are done.
+
+        Parameters
+        ----------
+        command : str
+            The command.
+        """
+        for connection in self._connections:
+            connection.send(command)
+        for connection in self._connections:
+            connection.recv()
+
+    def __enter__(self) -> "RolloutPool":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
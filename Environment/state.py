@@ -0,0 +1,1046 @@
+"""
+This module provides a compact, integer-backed Quoridor game state.
+
+Cells are indexed ``row * 9 + col`` and wall slots ``row * 8 + col``, so both line up
+with the Discrete(209) action encoding of the environment: a pawn move is the index of
+the target cell, a wall move is ``81 + wall`` where ``wall`` is the slot for
+horizontal walls and ``64 + slot`` for vertical walls.
+
+The placed walls are stored in two 64-bit masks (one per orientation). The
+connectivity of the board is stored in four 81-bit masks, one per direction, with a
+bit set for every cell whose edge in that direction is still open. Placing a wall
+clears four bits, and path existence is a flood fill over those masks.
+"""
+
+import random
+from typing import Iterator, List, Tuple
+import numpy as np
+from Environment.utils import (
+    MIRROR_ACTIONS,
+    WALL_SLOT_CELLS,
+    convert_discrete_to_quoridor_move,
+    convert_quoridor_move_to_discrete,
+    decode_observations,
+)
+
+BOARD_SIZE = 9
+WALL_GRID_SIZE = 8
+NUM_CELLS = BOARD_SIZE * BOARD_SIZE
+NUM_WALL_SLOTS = WALL_GRID_SIZE * WALL_GRID_SIZE
+NUM_WALLS = 2 * NUM_WALL_SLOTS
+NUM_ACTIONS = NUM_CELLS + NUM_WALLS
+WALL_OFFSET = NUM_CELLS
+START_WALLS = 10
+START_CELLS = (4, 76)  # e1 and e9
+GOAL_ROWS = (BOARD_SIZE - 1, 0)
+
+LEFT, RIGHT, DOWN, UP = range(4)
+# Same order as the neighbour lists of the quoridor library: a-1, a+1, 1-1, 1+1.
+DIRECTION_OFFSETS = (-1, 1, -BOARD_SIZE, BOARD_SIZE)
+
+ALL_CELLS = (1 << NUM_CELLS) - 1
+ALL_WALLS = (1 << NUM_WALLS) - 1
+GOAL_MASKS = tuple(((1 << BOARD_SIZE) - 1) << (row * BOARD_SIZE) for row in GOAL_ROWS)
+# distance of the cells that cannot reach the goal, longer than any path
+UNREACHABLE = NUM_CELLS
+
+
+def _initial_open_edges() -> Tuple[int, int, int, int]:
+    """
+    Computes the open edge masks of an empty board.
+
+    Returns
+    -------
+    (int, int, int, int)
+        The left, right, down and up open edge masks.
+    """
+    left = right = down = up = 0
+    for cell in range(NUM_CELLS):
+        row, col = divmod(cell, BOARD_SIZE)
+        bit = 1 << cell
+        if col > 0:
+            left |= bit
+        if col < BOARD_SIZE - 1:
+            right |= bit
+        if row > 0:
+            down |= bit
+        if row < BOARD_SIZE - 1:
+            up |= bit
+    return left, right, down, up
+
+
+def iter_bits(mask: int) -> Iterator[int]:
+    """
+    Iterates over the indexes of the set bits of a mask, lowest first.
+
+    Parameters
+    ----------
+    mask : int
+        The mask.
+
+    Returns
+    -------
+    Iterator[int]
+        The indexes of the set bits.
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def _wall_tables() -> Tuple[tuple, tuple]:
+    """
+    Computes, for every wall, the edges it keeps open and the walls it conflicts with.
+
+    Returns
+    -------
+    (tuple, tuple)
+        For every wall index, the (left, right, down, up) masks of edges that stay open
+        once the wall is placed, and the 128-bit mask of walls that overlap or cross
+        it (the wall itself included).
+    """
+    keeps = []
+    conflicts = []
+    for wall in range(NUM_WALLS):
+        vertical, slot = divmod(wall, NUM_WALL_SLOTS)
+        row, col = divmod(slot, WALL_GRID_SIZE)
+        cell = row * BOARD_SIZE + col
+        cut = [0, 0, 0, 0]
+        if not vertical:
+            # e3h removes the connections e3-e4 and f3-f4
+            cut[UP] = 1 << cell | 1 << cell + 1
+            cut[DOWN] = cut[UP] << BOARD_SIZE
+            horizontal_conflict = 1 << slot
+            if col > 0:
+                horizontal_conflict |= 1 << slot - 1
+            if col < WALL_GRID_SIZE - 1:
+                horizontal_conflict |= 1 << slot + 1
+            vertical_conflict = 1 << slot
+        else:
+            # g6v removes the connections g6-h6 and g7-h7
+            cut[RIGHT] = 1 << cell | 1 << cell + BOARD_SIZE
+            cut[LEFT] = cut[RIGHT] << 1
+            vertical_conflict = 1 << slot
+            if row > 0:
+                vertical_conflict |= 1 << slot - WALL_GRID_SIZE
+            if row < WALL_GRID_SIZE - 1:
+                vertical_conflict |= 1 << slot + WALL_GRID_SIZE
+            horizontal_conflict = 1 << slot
+        keeps.append(tuple(ALL_CELLS ^ mask for mask in cut))
+        conflicts.append(horizontal_conflict | vertical_conflict << NUM_WALL_SLOTS)
+    return tuple(keeps), tuple(conflicts)
+
+
+def _edge_cutters(wall_keeps: tuple) -> tuple:
+    """
+    Computes, for every cell and direction, the walls that close that edge.
+
+    Parameters
+    ----------
+    wall_keeps : tuple
+        The open edge masks kept by every wall, see `_wall_tables`.
+
+    Returns
+    -------
+    tuple
+        For every cell, the (left, right, down, up) 128-bit masks of walls.
+    """
+    cutters = [[0, 0, 0, 0] for _ in range(NUM_CELLS)]
+    for wall, keeps in enumerate(wall_keeps):
+        for direction, keep in enumerate(keeps):
+            for cell in iter_bits(ALL_CELLS ^ keep):
+                cutters[cell][direction] |= 1 << wall
+    return tuple(tuple(cell_cutters) for cell_cutters in cutters)
+
+
+INITIAL_OPEN_EDGES = _initial_open_edges()
+WALL_KEEPS, WALL_CONFLICTS = _wall_tables()
+EDGE_CUTTERS = _edge_cutters(WALL_KEEPS)
+OFFSET_DIRECTIONS = {
+    offset: direction for direction, offset in enumerate(DIRECTION_OFFSETS)
+}
+
+# Zobrist keys, fixed so that keys are the same in every process
+_zobrist_random = random.Random(20230501)
+ZOBRIST_PAWNS = tuple(
+    tuple(_zobrist_random.getrandbits(64) for _ in range(NUM_CELLS)) for _ in range(2)
+)
+ZOBRIST_WALLS = tuple(_zobrist_random.getrandbits(64) for _ in range(NUM_WALLS))
+ZOBRIST_WALLS_LEFT = tuple(
+    tuple(_zobrist_random.getrandbits(64) for _ in range(NUM_WALLS + 1))
+    for _ in range(2)
+)
+ZOBRIST_SIDE = _zobrist_random.getrandbits(64)
+
+# the cell and the wall index mirrored left-right, see `MIRROR_ACTIONS`
+MIRROR_CELLS = tuple(int(cell) for cell in MIRROR_ACTIONS[:NUM_CELLS])
+MIRROR_WALLS = tuple(int(action) - WALL_OFFSET for action in MIRROR_ACTIONS[NUM_CELLS:])
+
+
+def zobrist_key(
+    pawns: List[int],
+    horizontal_walls: int,
+    vertical_walls: int,
+    walls_left: List[int],
+    current: int,
+) -> int:
+    """
+    Computes the Zobrist key of a position.
+
+    Parameters
+    ----------
+    pawns : list of int
+        The cell of the pawn of player 1 and player 2.
+    horizontal_walls : int
+        The 64-bit mask of placed horizontal walls.
+    vertical_walls : int
+        The 64-bit mask of placed vertical walls.
+    walls_left : list of int
+        The number of walls left for player 1 and player 2.
+    current : int
+        The index of the player to move.
+
+    Returns
+    -------
+    int
+        The 64-bit key.
+    """
+    key = ZOBRIST_PAWNS[0][pawns[0]] ^ ZOBRIST_PAWNS[1][pawns[1]]
+    key ^= ZOBRIST_WALLS_LEFT[0][walls_left[0]] ^ ZOBRIST_WALLS_LEFT[1][walls_left[1]]
+    for wall in iter_bits(horizontal_walls | vertical_walls << NUM_WALL_SLOTS):
+        key ^= ZOBRIST_WALLS[wall]
+    if current:
+        key ^= ZOBRIST_SIDE
+    return key
+
+
+def has_path(
+    start: int, goal_mask: int, left: int, right: int, down: int, up: int
+) -> bool:
+    """
+    Determines if a goal cell can be reached from the start cell.
+
+    The reachable set is grown one step in every open direction at a time until it
+    touches the goal mask or stops growing. Pawns are ignored, as in the rules.
+
+    Parameters
+    ----------
+    start : int
+        The start cell.
+    goal_mask : int
+        The mask of goal cells.
+    left, right, down, up : int
+        The open edge masks.
+
+    Returns
+    -------
+    bool
+        True if a goal cell is reachable, False otherwise.
+    """
+    reach = 1 << start
+    while not reach & goal_mask:
+        grown = (
+            reach
+            | (reach & left) >> 1
+            | (reach & right) << 1
+            | (reach & down) >> BOARD_SIZE
+            | (reach & up) << BOARD_SIZE
+        )
+        if grown == reach:
+            return False
+        reach = grown
+    return True
+
+
+def path_cutters(
+    start: int, goal_mask: int, left: int, right: int, down: int, up: int
+) -> int:
+    """
+    Finds a shortest path from the start cell to a goal cell and returns the walls
+    that would cut it.
+
+    Any wall outside of the returned mask leaves that path, and thus the goal,
+    reachable, so only the walls inside it need a path check.
+
+    Parameters
+    ----------
+    start : int
+        The start cell.
+    goal_mask : int
+        The mask of goal cells.
+    left, right, down, up : int
+        The open edge masks.
+
+    Returns
+    -------
+    int
+        The 128-bit mask of walls cutting the path, or all walls if there is no path.
+    """
+    frontiers = []
+    frontier = reach = 1 << start
+    while not frontier & goal_mask:
+        frontiers.append(frontier)
+        frontier = (
+            (frontier & left) >> 1
+            | (frontier & right) << 1
+            | (frontier & down) >> BOARD_SIZE
+            | (frontier & up) << BOARD_SIZE
+        ) & ~reach
+        if not frontier:
+            return ALL_WALLS
+        reach |= frontier
+    goals = frontier & goal_mask
+    cell = (goals & -goals).bit_length() - 1
+    cutters = 0
+    # walk back through the frontiers, one step closer to the start each time
+    for previous in reversed(frontiers):
+        if cell >= 1 and (previous & right) >> cell - 1 & 1:
+            cell -= 1
+            cutters |= EDGE_CUTTERS[cell][RIGHT]
+        elif (previous & left) >> cell + 1 & 1:
+            cell += 1
+            cutters |= EDGE_CUTTERS[cell][LEFT]
+        elif cell >= BOARD_SIZE and (previous & up) >> cell - BOARD_SIZE & 1:
+            cell -= BOARD_SIZE
+            cutters |= EDGE_CUTTERS[cell][UP]
+        else:
+            cell += BOARD_SIZE
+            cutters |= EDGE_CUTTERS[cell][DOWN]
+    return cutters
+
+
+class QuoridorState:
+    """
+    Compact Quoridor game state with its own move generator.
+
+    Attributes
+    ----------
+    pawns : list of int
+        The cell of the pawn of player 1 and player 2.
+    walls_left : list of int
+        The number of walls left for player 1 and player 2.
+    horizontal_walls : int
+        The 64-bit mask of placed horizontal walls.
+    vertical_walls : int
+        The 64-bit mask of placed vertical walls.
+    open_edges : list of int
+        The left, right, down and up open edge masks.
+    current : int
+        The index of the player to move (0 for player 1, 1 for player 2).
+        The winner stays the player to move once the game is terminated.
+    is_terminated : bool
+        Whether or not the game is terminated.
+    moves : list of int
+        The discrete actions played in the game.
+    key : int
+        The Zobrist key of the position, updated with every move.
+
+    Wall legality is maintained incrementally. `_conflicts` holds the walls that
+    overlap or cross a placed wall, and `_unsafe` holds, per player, the walls that
+    would cut that player off from their goal. A pawn move only re-checks the walls
+    closing the edges the pawn just crossed; a wall placement marks `_unsafe` as
+    stale, and the next query only re-checks the walls cutting one shortest path per
+    player, since any other wall leaves that path open.
+
+    The distance fields returned by `goal_distances` are computed on first use and
+    then maintained by every wall placement, which only re-relaxes the cells that
+    lost all their shortest paths through the cut edges.
+    """
+
+    __slots__ = (
+        "pawns",
+        "walls_left",
+        "horizontal_walls",
+        "vertical_walls",
+        "open_edges",
+        "current",
+        "is_terminated",
+        "moves",
+        "key",
+        "_conflicts",
+        "_unsafe",
+        "_stale",
+        "_mask_walls",
+        "_mask_array",
+        "_distances",
+        "_layers",
+    )
+
+    def __init__(self) -> None:
+        self.pawns: List[int] = list(START_CELLS)
+        self.walls_left: List[int] = [START_WALLS, START_WALLS]
+        self.horizontal_walls: int = 0
+        self.vertical_walls: int = 0
+        self.open_edges: List[int] = list(INITIAL_OPEN_EDGES)
+        self.current: int = 0
+        self.is_terminated: bool = False
+        self.moves: List[int] = []
+        self.key: int = zobrist_key(self.pawns, 0, 0, self.walls_left, self.current)
+        self._conflicts: int = 0
+        self._unsafe: List[int] = [0, 0]
+        self._stale: bool = False
+        self._mask_walls: int = -1
+        self._mask_array: np.ndarray = None
+        self._distances: List[List[int]] = None
+        self._layers: List[List[int]] = None
+
+    @classmethod
+    def init_from_pgn(cls, pgn: str) -> "QuoridorState":
+        """
+        Initializes and returns a new state from the given PGN string.
+
+        Parameters
+        ----------
+        pgn : str
+            The PGN string.
+
+        Returns
+        -------
+        QuoridorState
+            The state after playing all moves of the PGN string.
+        """
+        state = cls()
+        if pgn == "":
+            return state
+        for move in pgn.split("/"):
+            state.make_move(move)
+        return state
+
+    @classmethod
+    def from_position(
+        cls,
+        pawns: List[int],
+        walls: int,
+        walls_left: List[int],
+        current: int,
+    ) -> "QuoridorState":
+        """
+        Initializes and returns a new state holding the given position.
+
+        The moves that led to the position are unknown, so `moves` is empty. If a pawn
+        is on its goal row the game is terminated, with its player as player to move.
+
+        Parameters
+        ----------
+        pawns : list of int
+            The cell of the pawn of player 1 and player 2.
+        walls : int
+            The 128-bit mask of placed walls (horizontal slots, then vertical slots).
+        walls_left : list of int
+            The number of walls left for player 1 and player 2.
+        current : int
+            The index of the player to move.
+
+        Returns
+        -------
+        QuoridorState
+            The state.
+        """
+        state = cls()
+        state.pawns = [int(pawns[0]), int(pawns[1])]
+        state.walls_left = [int(walls_left[0]), int(walls_left[1])]
+        state.horizontal_walls = walls & (1 << NUM_WALL_SLOTS) - 1
+        state.vertical_walls = walls >> NUM_WALL_SLOTS
+        open_edges = state.open_edges
+        for wall in iter_bits(walls):
+            state._conflicts |= WALL_CONFLICTS[wall]
+            for direction, keep in enumerate(WALL_KEEPS[wall]):
+                open_edges[direction] &= keep
+        # the unsafe walls are found from scratch on the next query
+        state._stale = walls != 0
+        for player in range(2):
+            if state.pawns[player] // BOARD_SIZE == GOAL_ROWS[player]:
+                state.is_terminated = True
+                current = player
+        state.current = int(current)
+        state.key = zobrist_key(
+            state.pawns,
+            state.horizontal_walls,
+            state.vertical_walls,
+            state.walls_left,
+            state.current,
+        )
+        return state
+
+    @classmethod
+    def from_observation(cls, observation: np.ndarray, player: int) -> "QuoridorState":
+        """
+        Initializes and returns a new state from an observation of the environment.
+
+        Parameters
+        ----------
+        observation : np.ndarray
+            The (9, 9, 6) observation.
+        player : int
+            The id (1 or 2) of the player to move.
+
+        Returns
+        -------
+        QuoridorState
+            The state, `state_to_observation` of which gives back the observation.
+        """
+        cells = observation.reshape(NUM_CELLS, 6)
+        pawns = cells[:, :2].argmax(axis=0)
+        walls = np.packbits(cells[WALL_SLOT_CELLS, 2:4].T, bitorder="little")
+        walls_left = np.count_nonzero(cells[:, 4:], axis=0)
+        return cls.from_position(
+            pawns, int.from_bytes(walls.tobytes(), "little"), walls_left, player - 1
+        )
+
+    def copy(self, history: bool = True) -> "QuoridorState":
+        """
+        Returns an independent copy of the state.
+
+        Parameters
+        ----------
+        history : bool, optional
+            Whether to copy the played moves (default is True). Without them the copy
+            takes constant time, whatever the length of the game, but `get_pgn` only
+            returns the moves played after the copy.
+
+        Returns
+        -------
+        QuoridorState
+            The copy.
+        """
+        state = QuoridorState.__new__(QuoridorState)
+        state.pawns = self.pawns[:]
+        state.walls_left = self.walls_left[:]
+        state.horizontal_walls = self.horizontal_walls
+        state.vertical_walls = self.vertical_walls
+        state.open_edges = self.open_edges[:]
+        state.current = self.current
+        state.is_terminated = self.is_terminated
+        state.moves = self.moves[:] if history else []
+        state.key = self.key
+        state._conflicts = self._conflicts
+        state._unsafe = self._unsafe[:]
+        state._stale = self._stale
+        # the cached wall mask is never modified in place, so it can be shared
+        state._mask_walls = self._mask_walls
+        state._mask_array = self._mask_array
+        if self._distances is not None:
+            state._distances = [self._distances[0][:], self._distances[1][:]]
+            state._layers = [self._layers[0][:], self._layers[1][:]]
+        else:
+            state._distances = state._layers = None
+        return state
+
+    @property
+    def player(self) -> int:
+        """
+        The id (1 or 2) of the player to move.
+        """
+        return self.current + 1
+
+    @property
+    def mirror_key(self) -> int:
+        """
+        The Zobrist key of the position mirrored left-right.
+        """
+        pawns = self.pawns
+        walls = self.horizontal_walls | self.vertical_walls << NUM_WALL_SLOTS
+        key = (
+            ZOBRIST_PAWNS[0][MIRROR_CELLS[pawns[0]]]
+            ^ ZOBRIST_PAWNS[1][MIRROR_CELLS[pawns[1]]]
+            ^ ZOBRIST_WALLS_LEFT[0][self.walls_left[0]]
+            ^ ZOBRIST_WALLS_LEFT[1][self.walls_left[1]]
+        )
+        for wall in iter_bits(walls):
+            key ^= ZOBRIST_WALLS[MIRROR_WALLS[wall]]
+        if self.current:
+            key ^= ZOBRIST_SIDE
+        return key
+
+    @property
+    def canonical_key(self) -> int:
+        """
+        The key shared by the position and its mirror image, the smaller of `key`
+        and `mirror_key`.
+        """
+        return min(self.key, self.mirror_key)
+
+    def mirror(self) -> "QuoridorState":
+        """
+        Returns the position mirrored left-right, without the moves that led to it.
+
+        Returns
+        -------
+        QuoridorState
+            The mirrored state.
+        """
+        walls = 0
+        for wall in iter_bits(
+            self.horizontal_walls | self.vertical_walls << NUM_WALL_SLOTS
+        ):
+            walls |= 1 << MIRROR_WALLS[wall]
+        return QuoridorState.from_position(
+            [MIRROR_CELLS[self.pawns[0]], MIRROR_CELLS[self.pawns[1]]],
+            walls,
+            self.walls_left,
+            self.current,
+        )
+
+    def get_pgn(self) -> str:
+        """
+        Returns the PGN string representation of the moves made in the game.
+
+        Returns
+        -------
+        str
+            The PGN string.
+        """
+        return "/".join(convert_discrete_to_quoridor_move(move) for move in self.moves)
+
+    def goal_distances(self, player: int) -> List[int]:
+        """
+        Get the distance to the goal row of the given player from every cell,
+        ignoring the pawns.
+
+        Parameters
+        ----------
+        player : int
+            The index of the player (0 for player 1, 1 for player 2).
+
+        Returns
+        -------
+        list of int
+            The number of moves to the goal row from every cell, UNREACHABLE for the
+            cells that cannot reach it. The list is shared with the state and must not
+            be modified.
+        """
+        if self._distances is None:
+            fields = self._distance_field(0), self._distance_field(1)
+            self._distances = [distances for distances, _ in fields]
+            self._layers = [layers for _, layers in fields]
+        return self._distances[player]
+
+    def path_length(self, player: int) -> int:
+        """
+        Get the length of the shortest path of the pawn of the given player to their
+        goal row, ignoring the other pawn.
+
+        Parameters
+        ----------
+        player : int
+            The index of the player (0 for player 1, 1 for player 2).
+
+        Returns
+        -------
+        int
+            The number of moves, or UNREACHABLE if there is no path.
+        """
+        return self.goal_distances(player)[self.pawns[player]]
+
+    def legal_pawn_actions(self) -> List[int]:
+        """
+        Get the legal pawn moves for the player to move, including jumps.
+
+        Returns
+        -------
+        list of int
+            The target cells.
+        """
+        cell = self.pawns[self.current]
+        opponent = self.pawns[1 - self.current]
+        open_edges = self.open_edges
+        actions = []
+        for direction, offset in enumerate(DIRECTION_OFFSETS):
+            if not open_edges[direction] >> cell & 1:
+                continue
+            target = cell + offset
+            if target != opponent:
+                actions.append(target)
+            elif open_edges[direction] >> opponent & 1:
+                actions.append(opponent + offset)
+            else:
+                for side, side_offset in enumerate(DIRECTION_OFFSETS):
+                    if (
+                        open_edges[side] >> opponent & 1
+                        and opponent + side_offset != cell
+                    ):
+                        actions.append(opponent + side_offset)
+        return actions
+
+    def is_legal_wall(self, wall: int) -> bool:
+        """
+        Checks if the player to move can place the given wall.
+
+        Parameters
+        ----------
+        wall : int
+            The wall index (0..63 horizontal, 64..127 vertical).
+
+        Returns
+        -------
+        bool
+            True if the wall has no overlap, no crossing and leaves a path for both
+            players, False otherwise.
+        """
+        if self.walls_left[self.current] == 0 or self._conflicts >> wall & 1:
+            return False
+        if (self._unsafe[0] | self._unsafe[1]) >> wall & 1:
+            return False
+        if not self._stale:
+            return True
+        bit = 1 << wall
+        return not self._disconnecting(0, bit) and not self._disconnecting(1, bit)
+
+    def legal_wall_actions(self) -> List[int]:
+        """
+        Get the legal wall moves for the player to move.
+
+        Returns
+        -------
+        list of int
+            The discrete wall actions.
+        """
+        if self.walls_left[self.current] == 0:
+            return []
+        return [WALL_OFFSET + wall for wall in iter_bits(self._legal_walls())]
+
+    def legal_actions(self) -> List[int]:
+        """
+        Get the legal moves for the player to move.
+
+        Returns
+        -------
+        list of int
+            The discrete actions.
+        """
+        return self.legal_pawn_actions() + self.legal_wall_actions()
+
+    def legal_action_mask(self) -> np.ndarray:
+        """
+        Get the legal moves for the player to move as an action mask.
+
+        Returns
+        -------
+        np.ndarray
+            The (209,) int8 action mask.
+        """
+        action_mask = np.zeros(NUM_ACTIONS, dtype=np.int8)
+        action_mask[self.legal_pawn_actions()] = 1
+        if self.walls_left[self.current]:
+            legal_walls = self._legal_walls()
+            if legal_walls != self._mask_walls:
+                self._mask_walls = legal_walls
+                self._mask_array = np.unpackbits(
+                    np.frombuffer(legal_walls.to_bytes(16, "little"), dtype=np.uint8),
+                    bitorder="little",
+                )
+            action_mask[WALL_OFFSET:] = self._mask_array
+        return action_mask
+
+    def is_legal(self, action: int) -> bool:
+        """
+        Checks if the given discrete action is legal for the player to move.
+
+        Parameters
+        ----------
+        action : int
+            The discrete action.
+
+        Returns
+        -------
+        bool
+            True if the action is legal, False otherwise.
+        """
+        if self.is_terminated or not 0 <= action < NUM_ACTIONS:
+            return False
+        if action < NUM_CELLS:
+            return action in self.legal_pawn_actions()
+        return self.is_legal_wall(action - WALL_OFFSET)
+
+    def make_action(self, action: int) -> None:
+        """
+        Makes the given discrete action for the player to move.
+
+        Parameters
+        ----------
+        action : int
+            The discrete action.
+
+        Raises
+        ------
+        ValueError
+            If the game is terminated or the action is illegal.
+        """
+        action = int(action)
+        if self.is_terminated:
+            raise ValueError("You can't make a move since the game is over.")
+        if not self.is_legal(action):
+            raise ValueError(f"Illegal move: {action}")
+        self.moves.append(action)
+        if action < NUM_CELLS:
+            self._move_pawn(action)
+            if action // BOARD_SIZE == GOAL_ROWS[self.current]:
+                self.is_terminated = True
+                return
+        else:
+            self._place_wall(action - WALL_OFFSET)
+        self.current ^= 1
+        self.key ^= ZOBRIST_SIDE
+
+    def make_move(self, move: str) -> None:
+        """
+        Makes the given quoridor move (e.g. "e2" or "e3h") for the player to move.
+
+        Parameters
+        ----------
+        move : str
+            The quoridor move.
+        """
+        self.make_action(convert_quoridor_move_to_discrete(move))
+
+    def _move_pawn(self, cell: int) -> None:
+        """
+        Moves the pawn of the player to move without any legality check.
+
+        Parameters
+        ----------
+        cell : int
+            The target cell.
+        """
+        player = self.current
+        origin = self.pawns[player]
+        direction = OFFSET_DIRECTIONS.get(cell - origin)
+        if direction is not None:
+            crossed = EDGE_CUTTERS[origin][direction]
+        else:
+            # a jump passes through the cell of the opponent
+            opponent = self.pawns[1 - player]
+            crossed = (
+                EDGE_CUTTERS[origin][OFFSET_DIRECTIONS[opponent - origin]]
+                | EDGE_CUTTERS[opponent][OFFSET_DIRECTIONS[cell - opponent]]
+            )
+        self.pawns[player] = cell
+        self.key ^= ZOBRIST_PAWNS[player][origin] ^ ZOBRIST_PAWNS[player][cell]
+        # with any other wall placed, origin and target stay connected, so only the
+        # walls closing a crossed edge can change the reachability of the goal.
+        self._unsafe[player] &= ~crossed
+        if not self._stale:
+            self._unsafe[player] |= self._disconnecting(
+                player, crossed & ~self._conflicts
+            )
+
+    def _distance_field(self, player: int) -> Tuple[List[int], List[int]]:
+        """
+        Computes the distance to the goal row of a player from every cell, growing
+        the set of reached cells one step at a time from the goal row.
+
+        Parameters
+        ----------
+        player : int
+            The index of the player.
+
+        Returns
+        -------
+        (list of int, list of int)
+            The distances, see `goal_distances`, and the mask of the cells at every
+            distance.
+        """
+        distances = [UNREACHABLE] * NUM_CELLS
+        layers = []
+        frontier = reach = GOAL_MASKS[player]
+        while frontier:
+            for cell in iter_bits(frontier):
+                distances[cell] = len(layers)
+            layers.append(frontier)
+            frontier = self._expand(frontier) & ~reach
+            reach |= frontier
+        return distances, layers
+
+    def _expand(self, cells: int) -> int:
+        """
+        Get the cells one open edge away from the given cells.
+
+        Parameters
+        ----------
+        cells : int
+            The mask of cells.
+
+        Returns
+        -------
+        int
+            The mask of their neighbours.
+        """
+        left, right, down, up = self.open_edges
+        return (
+            (cells & left) >> 1
+            | (cells & right) << 1
+            | (cells & down) >> BOARD_SIZE
+            | (cells & up) << BOARD_SIZE
+        )
+
+    def _update_distances(self, wall: int) -> None:
+        """
+        Updates the distance fields after the given wall was placed.
+
+        Distances only grow when edges are cut. Going through the layers of cells at
+        the same distance, starting from the ends of the cut edges, a cell is affected
+        when none of its neighbours in the previous layer is unaffected. Only the
+        affected cells are then given a new distance, by growing the layers again
+        from the first affected one.
+
+        Parameters
+        ----------
+        wall : int
+            The wall index (0..63 horizontal, 64..127 vertical).
+        """
+        cut = [
+            (cell, cell + DIRECTION_OFFSETS[direction])
+            for direction, keep in enumerate(WALL_KEEPS[wall])
+            for cell in iter_bits(ALL_CELLS ^ keep)
+        ]
+        for distances, layers in zip(self._distances, self._layers):
+            # the cut edges that were on a shortest path
+            tight = [
+                distances[cell]
+                for cell, neighbour in cut
+                if distances[cell] == distances[neighbour] + 1
+            ]
+            if not tight:
+                continue
+            start, last = min(tight), max(tight)
+            affected = 0
+            kept = layers[start - 1]
+            for distance in range(start, len(layers)):
+                layer_affected = layers[distance] & ~self._expand(kept)
+                if not layer_affected and distance >= last:
+                    break
+                if layer_affected and not affected:
+                    start = distance
+                affected |= layer_affected
+                kept = layers[distance] & ~layer_affected
+            if not affected:
+                continue
+
+            for distance in range(start, len(layers)):
+                layers[distance] &= ~affected
+            distance = start
+            while affected and layers[distance - 1]:
+                if distance == len(layers):
+                    layers.append(0)
+                reached = affected & self._expand(layers[distance - 1])
+                for cell in iter_bits(reached):
+                    distances[cell] = distance
+                layers[distance] |= reached
+                affected ^= reached
+                distance += 1
+            for cell in iter_bits(affected):
+                distances[cell] = UNREACHABLE
+            while not layers[-1]:
+                layers.pop()
+
+    def _disconnecting(self, player: int, walls: int) -> int:
+        """
+        Finds which of the given walls would cut a player off from their goal.
+
+        Parameters
+        ----------
+        player : int
+            The index of the player.
+        walls : int
+            The 128-bit mask of walls to check.
+
+        Returns
+        -------
+        int
+            The 128-bit mask of walls that leave the player without a path.
+        """
+        start = self.pawns[player]
+        goal_mask = GOAL_MASKS[player]
+        left, right, down, up = self.open_edges
+        disconnecting = 0
+        for wall in iter_bits(walls):
+            keep_left, keep_right, keep_down, keep_up = WALL_KEEPS[wall]
+            if not has_path(
+                start,
+                goal_mask,
+                left & keep_left,
+                right & keep_right,
+                down & keep_down,
+                up & keep_up,
+            ):
+                disconnecting |= 1 << wall
+        return disconnecting
+
+    def _legal_walls(self) -> int:
+        """
+        Get the walls that can be placed, ignoring the walls left of the player.
+
+        Returns
+        -------
+        int
+            The 128-bit mask of legal walls.
+        """
+        if self._stale:
+            # walls only get added, so walls that were unsafe stay unsafe
+            for player in range(2):
+                candidates = path_cutters(
+                    self.pawns[player], GOAL_MASKS[player], *self.open_edges
+                ) & ~(self._conflicts | self._unsafe[player])
+                self._unsafe[player] |= self._disconnecting(player, candidates)
+            self._stale = False
+        return ALL_WALLS & ~(self._conflicts | self._unsafe[0] | self._unsafe[1])
+
+    def _place_wall(self, wall: int) -> None:
+        """
+        Places a wall for the player to move without any legality check.
+
+        Parameters
+        ----------
+        wall : int
+            The wall index (0..63 horizontal, 64..127 vertical).
+        """
+        if wall < NUM_WALL_SLOTS:
+            self.horizontal_walls |= 1 << wall
+        else:
+            self.vertical_walls |= 1 << wall - NUM_WALL_SLOTS
+        open_edges = self.open_edges
+        for direction, keep in enumerate(WALL_KEEPS[wall]):
+            open_edges[direction] &= keep
+        walls_left = self.walls_left[self.current]
+        self.walls_left[self.current] = walls_left - 1
+        self.key ^= (
+            ZOBRIST_WALLS[wall]
+            ^ ZOBRIST_WALLS_LEFT[self.current][walls_left]
+            ^ ZOBRIST_WALLS_LEFT[self.current][walls_left - 1]
+        )
+        self._conflicts |= WALL_CONFLICTS[wall]
+        self._stale = True
+        if self._distances is not None:
+            self._update_distances(wall)
+
+
+def states_from_observations(
+    observations: np.ndarray, players: np.ndarray
+) -> List[QuoridorState]:
+    """
+    Initializes states from a batch of observations of the environment.
+
+    Parameters
+    ----------
+    observations : np.ndarray
+        The (N, 9, 9, 6) observations.
+    players : np.ndarray
+        The (N,) ids (1 or 2) of the players to move.
+
+    Returns
+    -------
+    list of QuoridorState
+        The states, see `QuoridorState.from_observation`.
+    """
+    pawns, walls, walls_left = decode_observations(observations)
+    packed = np.packbits(walls, axis=1, bitorder="little")
+    return [
+        QuoridorState.from_position(
+            pawns[i],
+            int.from_bytes(packed[i].tobytes(), "little"),
+            walls_left[i],
+            players[i] - 1,
+        )
+        for i in range(len(packed))
+    ]
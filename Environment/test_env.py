@@ -1,13 +1,23 @@
 # pylint: skip-file
 from quoridor import Quoridor
 import numpy as np
+import pytest
 from .utils import (
+    HORIZONTAL_WALL,
+    PAWN_MOVE,
+    VERTICAL_WALL,
+    convert_discrete_to_coordinates,
     convert_discrete_to_quoridor_move,
+    convert_discrete_to_quoridor_moves,
     convert_quoridor_move_to_discrete,
+    convert_quoridor_moves_to_discrete,
     board_to_observation,
     convert_observation_quoridor_game,
+    state_to_observation,
+    update_observation,
 )
-from .env import QuoridorEnv, env
+from .state import QuoridorState
+from .env import QuoridorEnv, env, parallel_env
 
 
 def test_convert_discrete_to_quoridor_move():
@@ -33,6 +43,33 @@ def test_convert_quoridor_move_to_discrete():
     assert convert_quoridor_move_to_discrete("h8v") == 208
 
 
+def test_convert_moves_vectorized():
+    actions = np.arange(209)
+    moves = convert_discrete_to_quoridor_moves(actions)
+    assert moves.tolist() == [convert_discrete_to_quoridor_move(a) for a in actions]
+    assert np.array_equal(convert_quoridor_moves_to_discrete(moves), actions)
+    batch = np.array([[4, 81], [208, 76]])
+    assert convert_discrete_to_quoridor_moves(batch).tolist() == [
+        ["e1", "a1h"],
+        ["h8v", "e9"],
+    ]
+    assert np.array_equal(
+        convert_quoridor_moves_to_discrete([["e1", "a1h"]]), [[4, 81]]
+    )
+    with pytest.raises(ValueError):
+        convert_quoridor_moves_to_discrete(["e1", "j1"])
+
+    rows, cols, orientations = convert_discrete_to_coordinates([13, 90, 145, 208])
+    assert rows.tolist() == [1, 1, 0, 7]
+    assert cols.tolist() == [4, 1, 0, 7]
+    assert orientations.tolist() == [
+        PAWN_MOVE,
+        HORIZONTAL_WALL,
+        VERTICAL_WALL,
+        VERTICAL_WALL,
+    ]
+
+
 def test_board_to_observation():
     quoridor = Quoridor.init_from_pgn("e2/e8/e3/e7/e1h/e3v/e2h")
     observation = board_to_observation(quoridor)
@@ -83,3 +120,44 @@ def test_convert_observation_quoridor_game():
 
 def test_env():
     quoridor_env: QuoridorEnv = env()
+
+
+def test_parallel_env():
+    quoridor_env = parallel_env()
+    observations = quoridor_env.reset()
+    assert set(observations) == {"player_1", "player_2"}
+    active_agent = "player_1"
+    turns = 0
+    while quoridor_env.agents:
+        action_mask = observations[active_agent]["action_mask"]
+        actions = {
+            agent: int(np.flatnonzero(action_mask)[0]) for agent in quoridor_env.agents
+        }
+        observations, rewards, terminations, truncations, infos = quoridor_env.step(
+            actions
+        )
+        turns += 1
+        if any(terminations.values()):
+            assert sorted(rewards.values()) == [-1, 1]
+            break
+        active_agent = infos[active_agent]["active_agent"]
+    assert turns > 1
+
+
+def test_observation_buffers():
+    rng = np.random.default_rng(0)
+    state = QuoridorState()
+    buffer = np.ones((9, 9, 6), dtype=bool)
+    observation = state_to_observation(state)
+    while not state.is_terminated:
+        action = rng.choice(state.legal_actions())
+        state.make_action(action)
+        update_observation(observation, state, action)
+        assert np.array_equal(observation, state_to_observation(state))
+        assert state_to_observation(state, out=buffer) is buffer
+        assert np.array_equal(buffer, observation)
+        quoridor = Quoridor.init_from_pgn(state.get_pgn())
+        assert board_to_observation(quoridor, out=buffer) is buffer
+        assert np.array_equal(buffer, observation)
+    with pytest.raises(ValueError):
+        state_to_observation(state, out=np.zeros((9, 9, 6), dtype=bool)[:, :, ::2])
@@ -0,0 +1,164 @@
+# pylint: skip-file
+import random
+import numpy as np
+import pytest
+from .records import (
+    LEGACY_MAGIC,
+    MAGIC,
+    RECORD_HEADER,
+    GameRecord,
+    GameRecordReader,
+    GameRecordWriter,
+)
+from .state import QuoridorState
+
+PGN = "e2/e8/a1h/a8h/e3/e7/d4v"
+
+
+def random_game(rng):
+    state = QuoridorState()
+    while not state.is_terminated:
+        state.make_action(rng.choice(state.legal_actions()))
+    return state
+
+
+def test_pgn_conversion():
+    record = GameRecord.from_pgn(PGN, agent_1="a", winner=1)
+    assert record.moves.dtype == np.uint8
+    assert list(record.moves) == QuoridorState.init_from_pgn(PGN).moves
+    assert record.to_pgn() == PGN
+    assert (record.agent_1, record.agent_2, record.winner, record.seed) == (
+        "a",
+        "",
+        1,
+        None,
+    )
+    assert GameRecord.from_pgn("").to_pgn() == ""
+
+
+def test_write_read(tmp_path):
+    path = tmp_path / "games.qgr"
+    rng = random.Random(0)
+    states = [random_game(rng) for _ in range(5)]
+    with GameRecordWriter(path) as writer:
+        for i, state in enumerate(states):
+            writer.write(state.moves, "RandomAgent", "MCTSAgent", state.current + 1, i)
+        writer.write(PGN)
+    # appending to an existing file
+    with GameRecordWriter(path) as writer:
+        writer.write_record(GameRecord.from_pgn("e2", agent_2="ä", seed=2**40))
+
+    reader = GameRecordReader(path)
+    assert len(reader) == 7
+    for i, (state, record) in enumerate(zip(states, reader)):
+        assert record.to_pgn() == state.get_pgn()
+        assert record.agent_1 == "RandomAgent"
+        assert record.agent_2 == "MCTSAgent"
+        assert record.winner == state.current + 1
+        assert record.seed == i
+    assert reader[5][1:] == ("", "", 0, None)
+    assert reader[5].to_pgn() == PGN
+    assert reader[-1].agent_2 == "ä" and reader[-1].seed == 2**40
+    # a header, the names and one byte per move
+    names = len("RandomAgent") + len("MCTSAgent")
+    assert path.stat().st_size == len(MAGIC) + sum(
+        RECORD_HEADER.size + names + len(state.moves) for state in states
+    ) + (RECORD_HEADER.size + 7) + (RECORD_HEADER.size + len("ä".encode()) + 1)
+
+    with GameRecordWriter(path) as writer:
+        with pytest.raises(ValueError):
+            writer.write([209])
+        with pytest.raises(ValueError):
+            writer.write([0], winner=3)
+    assert len(GameRecordReader(path)) == 7
+
+
+def test_interrupted_write(tmp_path):
+    path = tmp_path / "games.qgr"
+    with GameRecordWriter(path) as writer:
+        writer.write(PGN, winner=1)
+        writer.write(PGN, winner=2)
+    with open(path, "r+b") as file:
+        file.truncate(path.stat().st_size - 3)
+    assert len(GameRecordReader(path)) == 1
+
+    with GameRecordWriter(path) as writer:
+        writer.write("e2", winner=2)
+    reader = GameRecordReader(path)
+    assert [record.to_pgn() for record in reader] == [PGN, "e2"]
+
+    (tmp_path / "other").write_bytes(b"e2/e8")
+    with pytest.raises(ValueError):
+        GameRecordReader(tmp_path / "other")
+    with pytest.raises(ValueError):
+        GameRecordWriter(tmp_path / "other")
+
+
+def test_interrupted_magic(tmp_path):
+    # a file cut short in its magic number is started over
+    path = tmp_path / "games.qgr"
+    path.write_bytes(MAGIC[:2])
+    with GameRecordWriter(path) as writer:
+        writer.write("e2", winner=1)
+    reader = GameRecordReader(path)
+    assert [record.to_pgn() for record in reader] == ["e2"]
+
+    (tmp_path / "other").write_bytes(b"e2")
+    with pytest.raises(ValueError):
+        GameRecordWriter(tmp_path / "other")
+    assert (tmp_path / "other").read_bytes() == b"e2"
+
+
+def test_limits(tmp_path):
+    path = tmp_path / "games.qgr"
+    with GameRecordWriter(path) as writer:
+        writer.write("e2", "a" * 255, "ä" * 127, 1, 2**63 - 1)
+        writer.write("e2", seed=-1)
+        writer.write(np.zeros(65535, dtype=np.uint8), seed=-(2**63))
+        for kwargs in (
+            {"agent_1": "a" * 256},
+            {"agent_2": "ä" * 128},
+            {"seed": 2**63},
+            {"seed": -(2**63) - 1},
+        ):
+            with pytest.raises(ValueError):
+                writer.write("e2", **kwargs)
+        with pytest.raises(ValueError):
+            writer.write(np.zeros(65536, dtype=np.uint8))
+    reader = GameRecordReader(path)
+    assert len(reader) == 3
+    assert reader[0][1:] == ("a" * 255, "ä" * 127, 1, 2**63 - 1)
+    # a seed of -1 is a seed, not a missing one
+    assert reader[1].seed == -1
+    assert reader[2].seed == -(2**63) and len(reader[2].moves) == 65535
+
+
+def test_legacy_format(tmp_path):
+    path = tmp_path / "games.qgr"
+    e2 = GameRecord.from_pgn("e2").moves.tobytes()
+    path.write_bytes(
+        LEGACY_MAGIC
+        + RECORD_HEADER.pack(1, 2, 1, 1, -1)
+        + b"ab"
+        + e2
+        + RECORD_HEADER.pack(1, 1, 0, 0, 7)
+        + e2
+    )
+    reader = GameRecordReader(path)
+    assert reader.legacy
+    assert [record[1:] for record in reader] == [("a", "b", 2, None), ("", "", 1, 7)]
+    assert reader[0].to_pgn() == "e2"
+    with pytest.raises(ValueError):
+        GameRecordWriter(path)
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / "games.qgr"
+    path.write_bytes(b"")
+    with pytest.raises(ValueError):
+        GameRecordReader(path)
+    # the writer starts an empty file
+    with GameRecordWriter(path) as writer:
+        writer.write("e2")
+    assert not GameRecordReader(path).legacy
+    assert len(GameRecordReader(path)) == 1
@@ -0,0 +1,92 @@
+# pylint: skip-file
+import numpy as np
+import pytest
+from .replay import (
+    EpisodeRecorder,
+    ReplayBuffer,
+    pack_action_masks,
+    pack_observations,
+    unpack_action_masks,
+    unpack_observations,
+)
+from .vec_env import QuoridorVecEnv
+
+
+def test_packing():
+    rng = np.random.default_rng(0)
+    observations = rng.random((5, 9, 9, 6)) < 0.3
+    action_masks = (rng.random((5, 209)) < 0.5).astype(np.int8)
+    packed = pack_observations(observations)
+    assert packed.shape == (5, 61) and packed.dtype == np.uint8
+    np.testing.assert_array_equal(unpack_observations(packed), observations)
+    packed = pack_action_masks(action_masks)
+    assert packed.shape == (5, 27)
+    unpacked = unpack_action_masks(packed)
+    assert unpacked.dtype == np.int8
+    np.testing.assert_array_equal(unpacked, action_masks)
+
+
+def test_replay_buffer(tmp_path):
+    vec_env = QuoridorVecEnv(4)
+    observations, action_masks = vec_env.reset()
+    buffer = ReplayBuffer(tmp_path / "buffer", capacity=10)
+    buffer.add(observations, action_masks, [0, 1, 2, 3], [1, -1, 1, -1])
+    assert len(buffer) == 4
+    batch = buffer.sample(100, np.random.default_rng(0))
+    assert batch["observations"].shape == (100, 9, 9, 6)
+    assert batch["action_masks"].shape == (100, 209)
+    for observation, action_mask, action, outcome in zip(*batch.values()):
+        np.testing.assert_array_equal(observation, observations[action])
+        np.testing.assert_array_equal(action_mask, action_masks[action])
+        assert outcome == (1 if action % 2 == 0 else -1)
+
+    # the ring wraps around, only the last 10 samples are kept
+    packed = pack_observations(np.repeat(observations, 3, axis=0))
+    buffer.add(packed, np.repeat(action_masks, 3, axis=0), np.arange(4, 16), 1)
+    assert (buffer.size, buffer.position) == (10, 6)
+    assert set(buffer.sample(200)["actions"]) == set(range(6, 16))
+
+    # reopening continues with the samples of the last flush
+    assert ReplayBuffer(tmp_path / "buffer").size == 0
+    buffer.flush()
+    reopened = ReplayBuffer(tmp_path / "buffer")
+    assert (reopened.capacity, reopened.size, reopened.position) == (10, 10, 6)
+    assert set(reopened.sample(200)["actions"]) == set(range(6, 16))
+    with reopened:
+        reopened.add(observations[:1], action_masks[:1], 16, 1)
+    reopened = ReplayBuffer(tmp_path / "buffer")
+    assert (reopened.size, reopened.position) == (10, 7)
+    with pytest.raises(ValueError):
+        ReplayBuffer(tmp_path / "buffer", capacity=20)
+    with pytest.raises(ValueError):
+        ReplayBuffer(tmp_path / "other")
+    with pytest.raises(ValueError):
+        ReplayBuffer(tmp_path / "empty", capacity=10).sample(1)
+
+
+def test_episode_recorder(tmp_path):
+    rng = np.random.default_rng(0)
+    vec_env = QuoridorVecEnv(3)
+    buffer = ReplayBuffer(tmp_path, capacity=100000)
+    recorder = EpisodeRecorder(buffer, 3)
+    observations, action_masks = vec_env.reset()
+    finished = 0
+    while finished < 5:
+        # mostly pawn moves, so the games end quickly
+        weights = action_masks * np.where(np.arange(209) < 81, 1.0, 0.01)
+        actions = np.array([rng.choice(209, p=w / w.sum()) for w in weights])
+        recorder.record(observations, action_masks, actions)
+        steps = vec_env.step(actions)
+        rewards, dones, infos = steps[2:]
+        added = recorder.finish(rewards, dones, infos)
+        assert added == infos["episode_length"].sum()
+        finished += dones.sum()
+        observations, action_masks = steps[:2]
+    assert len(buffer) > 0
+    batch = buffer.sample(len(buffer), rng)
+    # every sampled action was legal in its position
+    assert np.all(batch["action_masks"][np.arange(len(buffer)), batch["actions"]] == 1)
+    assert set(np.unique(batch["outcomes"])) == {-1, 1}
+    # the first move of a game is played by player 1, whose pawn is on e1
+    first = batch["observations"][:, 0, 4, 0] & batch["observations"][:, 8, 4, 1]
+    assert first.any()
@@ -0,0 +1,25 @@
+# pylint: skip-file
+import numpy as np
+from .rollout_pool import RolloutPool
+from .vec_env import QuoridorVecEnv
+
+
+def test_rollout_pool_matches_vec_env():
+    rng = np.random.default_rng(0)
+    vec_env = QuoridorVecEnv(6)
+    expected_observations, expected_masks = vec_env.reset()
+    with RolloutPool(num_workers=2, envs_per_worker=3) as pool:
+        observations, action_masks = pool.reset()
+        assert np.array_equal(observations, expected_observations)
+        assert np.array_equal(action_masks, expected_masks)
+        for _ in range(40):
+            actions = np.argmax(rng.random(action_masks.shape) * action_masks, axis=1)
+            expected = vec_env.step(actions)
+            observations, action_masks, rewards, dones, infos = pool.step(actions)
+            assert np.array_equal(observations, expected[0])
+            assert np.array_equal(action_masks, expected[1])
+            assert np.array_equal(rewards, expected[2])
+            assert np.array_equal(dones, expected[3])
+            for key, value in expected[4].items():
+                assert np.array_equal(infos[key], value)
+    assert pool.closed
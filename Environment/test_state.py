@@ -0,0 +1,236 @@
+# pylint: skip-file
+import random
+import numpy as np
+from quoridor import Quoridor
+from Policies.policy import ShortestPathPolicy
+from .state import (
+    GOAL_MASKS,
+    UNREACHABLE,
+    NUM_WALL_SLOTS,
+    NUM_WALLS,
+    WALL_CONFLICTS,
+    WALL_KEEPS,
+    WALL_OFFSET,
+    QuoridorState,
+    has_path,
+    states_from_observations,
+    zobrist_key,
+)
+from .utils import (
+    MIRROR_ACTIONS,
+    board_to_observation,
+    canonicalize_observations,
+    mirror_action_masks,
+    mirror_actions,
+    mirror_observations,
+    state_to_observation,
+    convert_discrete_to_quoridor_move,
+    convert_quoridor_move_to_discrete,
+)
+
+
+def assert_same_game(state: QuoridorState, quoridor: Quoridor):
+    legal_moves = set(quoridor.get_legal_moves())
+    assert {
+        convert_discrete_to_quoridor_move(action) for action in state.legal_actions()
+    } == legal_moves
+    assert state.is_terminated == quoridor.is_terminated
+    assert state.player == quoridor.current_player.id
+    assert state.get_pgn() == quoridor.get_pgn()
+    assert np.array_equal(state_to_observation(state), board_to_observation(quoridor))
+
+
+def test_initial_state():
+    state = QuoridorState()
+    assert state.pawns == [4, 76]
+    assert state.walls_left == [10, 10]
+    assert state.player == 1
+    assert sorted(state.legal_pawn_actions()) == [3, 5, 13]
+    assert len(state.legal_wall_actions()) == 128
+
+
+def test_jumps():
+    state = QuoridorState.init_from_pgn("e2/e8/e3/e7/e4/e6/e5")
+    assert sorted(
+        convert_discrete_to_quoridor_move(action)
+        for action in state.legal_pawn_actions()
+    ) == ["d6", "e4", "e7", "f6"]
+    state = QuoridorState.init_from_pgn("e2/e8/e3/e7/e4/e6/e5/e6h")
+    assert sorted(
+        convert_discrete_to_quoridor_move(action)
+        for action in state.legal_pawn_actions()
+    ) == ["d5", "d6", "e4", "f5", "f6"]
+
+
+def test_illegal_moves():
+    state = QuoridorState.init_from_pgn("e1h")
+    for move in ["e1h", "d1h", "f1h", "e1v", "e5"]:
+        assert not state.is_legal(convert_quoridor_move_to_discrete(move))
+    try:
+        state.make_move("e5")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("illegal move was accepted")
+
+
+def test_wall_cannot_block_path():
+    state = QuoridorState.init_from_pgn("a1h/e8/c1h/e7/e1h/e6/g1h")
+    assert not state.is_legal(convert_quoridor_move_to_discrete("h1v"))
+    assert state.is_legal(convert_quoridor_move_to_discrete("h2v"))
+
+
+def test_differential_random_games():
+    rng = random.Random(0)
+    for _ in range(6):
+        state = QuoridorState()
+        quoridor = Quoridor()
+        assert_same_game(state, quoridor)
+        while not quoridor.is_terminated:
+            move = rng.choice(sorted(quoridor.get_legal_moves()))
+            quoridor.make_move(move)
+            state.make_move(move)
+            assert_same_game(state, quoridor)
+
+
+def brute_force_legal_walls(state: QuoridorState):
+    placed = state.horizontal_walls | state.vertical_walls << NUM_WALL_SLOTS
+    legal = []
+    for wall in range(NUM_WALLS):
+        if WALL_CONFLICTS[wall] & placed:
+            continue
+        edges = [
+            edges & keep for edges, keep in zip(state.open_edges, WALL_KEEPS[wall])
+        ]
+        if all(has_path(state.pawns[p], GOAL_MASKS[p], *edges) for p in range(2)):
+            legal.append(WALL_OFFSET + wall)
+    return legal
+
+
+def test_incremental_wall_legality():
+    rng = random.Random(1)
+    for game in range(30):
+        state = QuoridorState()
+        # give both players plenty of walls to crowd the board
+        state.walls_left = [40, 40]
+        while not state.is_terminated:
+            if rng.random() < 0.5:
+                assert sorted(state.legal_wall_actions()) == brute_force_legal_walls(
+                    state
+                )
+            if rng.random() < 0.3:
+                # play without querying the legal moves, so the cache stays stale
+                action = rng.randrange(WALL_OFFSET + NUM_WALLS)
+                if state.is_legal(action):
+                    state.make_action(action)
+                continue
+            actions = state.legal_actions()
+            walls = [action for action in actions if action >= WALL_OFFSET]
+            if walls and rng.random() < 0.6:
+                action = rng.choice(walls)
+            else:
+                action = rng.choice([a for a in actions if a < WALL_OFFSET])
+            assert state.is_legal(action)
+            state.make_action(action)
+
+
+def test_zobrist_key():
+    rng = random.Random(2)
+    state = QuoridorState()
+    while not state.is_terminated:
+        state.make_action(rng.choice(state.legal_actions()))
+        assert state.key == zobrist_key(
+            state.pawns,
+            state.horizontal_walls,
+            state.vertical_walls,
+            state.walls_left,
+            state.current,
+        )
+    first = QuoridorState.init_from_pgn("e2/e8/a1h/a8h")
+    second = QuoridorState.init_from_pgn("a1h/a8h/e2/e8")
+    assert first.key == second.key
+    assert first.key != QuoridorState.init_from_pgn("e2/e8/a1h").key
+
+
+def test_from_observation():
+    rng = random.Random(3)
+    observations, players, states = [], [], []
+    for _ in range(5):
+        state = QuoridorState()
+        while not state.is_terminated:
+            observation = state_to_observation(state)
+            decoded = QuoridorState.from_observation(observation, state.player)
+            assert np.array_equal(state_to_observation(decoded), observation)
+            assert decoded.key == state.key
+            assert decoded.legal_actions() == state.legal_actions()
+            observations.append(observation)
+            players.append(state.player)
+            states.append(state.copy())
+            state.make_action(rng.choice(state.legal_actions()))
+        decoded = QuoridorState.from_observation(state_to_observation(state), 1)
+        assert decoded.is_terminated and decoded.current == state.current
+
+    decoded = states_from_observations(np.stack(observations), np.array(players))
+    for state, expected in zip(decoded, states):
+        assert state.key == expected.key
+        assert np.array_equal(state.legal_action_mask(), expected.legal_action_mask())
+
+
+def test_goal_distances():
+    rng = random.Random(4)
+    for _ in range(20):
+        state = QuoridorState()
+        state.goal_distances(0)
+        while not state.is_terminated:
+            weights = [
+                1 if action < WALL_OFFSET else 3 for action in state.legal_actions()
+            ]
+            state.make_action(rng.choices(state.legal_actions(), weights)[0])
+            fresh = state.copy()
+            fresh._distances = fresh._layers = None
+            for player in range(2):
+                assert state.goal_distances(player) == fresh.goal_distances(player)
+                assert state.path_length(player) < UNREACHABLE
+
+    quoridor = Quoridor.init_from_pgn("b8h/a1h/d8h/h1h/f8h")
+    state = QuoridorState.init_from_pgn("b8h/a1h/d8h/h1h/f8h")
+    distances = ShortestPathPolicy().distance_field(quoridor.board, "9")
+    for cell, distance in distances.items():
+        assert (
+            state.goal_distances(0)[convert_quoridor_move_to_discrete(cell)] == distance
+        )
+
+
+def test_mirror():
+    assert convert_discrete_to_quoridor_move(MIRROR_ACTIONS[0]) == "i1"
+    assert convert_discrete_to_quoridor_move(mirror_actions(81 + 2)) == "f1h"
+    assert list(mirror_actions(np.array([4, 145, 208]))) == [4, 145 + 7, 208 - 7]
+
+    rng = random.Random(3)
+    for _ in range(10):
+        state = QuoridorState()
+        mirrored = QuoridorState()
+        while not state.is_terminated:
+            observation = state_to_observation(state)
+            mirrored_observation = state_to_observation(mirrored)
+            assert np.array_equal(
+                mirror_observations(observation), mirrored_observation
+            )
+            assert np.array_equal(
+                mirror_action_masks(state.legal_action_mask()),
+                mirrored.legal_action_mask(),
+            )
+            assert state.mirror_key == mirrored.key
+            assert state.canonical_key == mirrored.canonical_key
+            assert state.mirror().key == mirrored.key
+
+            canonical, flags = canonicalize_observations(
+                np.stack([observation, mirrored_observation])
+            )
+            assert np.array_equal(canonical[0], canonical[1])
+            assert flags[0] != flags[1] or state.key == state.mirror_key
+
+            action = rng.choice(state.legal_actions())
+            state.make_action(action)
+            mirrored.make_action(int(MIRROR_ACTIONS[action]))
+        assert mirrored.is_terminated and mirrored.current == state.current
@@ -0,0 +1,79 @@
+# pylint: skip-file
+import numpy as np
+from .state import QuoridorState, iter_bits
+from .utils import state_to_observation
+from .vec_env import QuoridorVecEnv, legal_wall_masks
+
+
+def test_reset():
+    vec_env = QuoridorVecEnv(4)
+    observations, action_masks = vec_env.reset()
+    assert observations.shape == (4, 9, 9, 6)
+    assert action_masks.shape == (4, 209)
+    for i in range(4):
+        assert np.array_equal(observations[i], state_to_observation(QuoridorState()))
+        assert np.array_equal(action_masks[i], QuoridorState().legal_action_mask())
+
+
+def test_step_matches_state():
+    rng = np.random.default_rng(0)
+    num_envs = 16
+    vec_env = QuoridorVecEnv(num_envs)
+    observations, action_masks = vec_env.reset()
+    states = [QuoridorState() for _ in range(num_envs)]
+    finished = 0
+    for _ in range(300):
+        # favour walls so that the boards get crowded
+        weights = action_masks * np.where(np.arange(209) < 81, 1.0, 0.3)
+        actions = np.array([rng.choice(209, p=w / w.sum()) for w in weights])
+        observations, action_masks, rewards, dones, infos = vec_env.step(actions)
+        for i, state in enumerate(states):
+            player = state.current
+            state.make_action(actions[i])
+            assert dones[i] == state.is_terminated
+            if dones[i]:
+                finished += 1
+                assert infos["winner"][i] == player + 1
+                assert infos["episode_length"][i] == len(state.moves)
+                assert rewards[i, player] == 1 and rewards[i, 1 - player] == -1
+                states[i] = state = QuoridorState()
+            else:
+                assert not rewards[i].any()
+            assert infos["player"][i] == state.player
+            assert np.array_equal(observations[i], state_to_observation(state))
+            assert np.array_equal(action_masks[i], state.legal_action_mask())
+    assert finished > 0
+
+
+def test_illegal_action():
+    vec_env = QuoridorVecEnv(2)
+    vec_env.reset()
+    # e5 is not reachable from e1, e2 is
+    observations, action_masks, rewards, dones, infos = vec_env.step([40, 13])
+    assert dones.tolist() == [True, False]
+    assert rewards[0].tolist() == [-1, 0]
+    assert infos["winner"][0] == 0
+    assert np.array_equal(action_masks[0], QuoridorState().legal_action_mask())
+
+
+def test_legal_wall_masks():
+    rng = np.random.default_rng(1)
+    pawns, walls, walls_left, current, expected = [], [], [], [], []
+    for _ in range(10):
+        state = QuoridorState()
+        while not state.is_terminated:
+            placed = np.zeros(128, dtype=bool)
+            placed[list(iter_bits(state.horizontal_walls))] = True
+            placed[[64 + slot for slot in iter_bits(state.vertical_walls)]] = True
+            pawns.append(state.pawns[:])
+            walls.append(placed)
+            walls_left.append(state.walls_left[:])
+            current.append(state.current)
+            expected.append(state.legal_action_mask()[81:].astype(bool))
+            actions = state.legal_actions()
+            weights = np.where(np.array(actions) < 81, 1.0, 0.3)
+            state.make_action(rng.choice(actions, p=weights / weights.sum()))
+    masks = legal_wall_masks(
+        np.array(pawns), np.array(walls), np.array(walls_left), np.array(current)
+    )
+    assert np.array_equal(masks, np.array(expected))
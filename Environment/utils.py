@@ -1,7 +1,60 @@
-from typing import Tuple
+from typing import Dict, Tuple
 import numpy as np
 from quoridor import Quoridor
 
+FILES = "abcdefghi"
+NUM_ACTIONS = 209
+PAWN_MOVE, HORIZONTAL_WALL, VERTICAL_WALL = range(3)
+
+# 0-80 are pawn moves: 0 -> a1, 1 -> b1, 10 -> b2, 79 -> h9, 80 -> i9
+# 81-144 are horizontal wall moves: 81 -> a1h, 82 -> b1h, 89 -> a2h, 144 -> h8h
+# 145-208 are vertical wall moves: 145 -> a1v, 146 -> b1v, 153 -> a2v, 208 -> h8v
+DISCRETE_TO_MOVE: Tuple[str, ...] = tuple(
+    [f"{FILES[cell % 9]}{cell // 9 + 1}" for cell in range(81)]
+    + [f"{FILES[slot % 8]}{slot // 8 + 1}h" for slot in range(64)]
+    + [f"{FILES[slot % 8]}{slot // 8 + 1}v" for slot in range(64)]
+)
+MOVE_TO_DISCRETE: Dict[str, int] = {
+    move: action for action, move in enumerate(DISCRETE_TO_MOVE)
+}
+
+# the row and column of the cell of a pawn move, or of the bottom left cell of a
+# wall, and the orientation (PAWN_MOVE, HORIZONTAL_WALL or VERTICAL_WALL) per action
+_cells = np.concatenate([np.arange(81), np.tile(np.arange(64), 2)])
+_grid_sizes = np.repeat([9, 8, 8], [81, 64, 64])
+ACTION_ROWS: np.ndarray = (_cells // _grid_sizes).astype(np.int8)
+ACTION_COLS: np.ndarray = (_cells % _grid_sizes).astype(np.int8)
+ACTION_ORIENTATIONS: np.ndarray = np.repeat(
+    np.array([PAWN_MOVE, HORIZONTAL_WALL, VERTICAL_WALL], dtype=np.int8), [81, 64, 64]
+)
+MOVE_ARRAY: np.ndarray = np.array(DISCRETE_TO_MOVE)
+# the moves in sorted order, and their actions, for vectorized lookups
+_SORTED_ACTIONS = np.argsort(MOVE_ARRAY)
+_SORTED_MOVES = MOVE_ARRAY[_SORTED_ACTIONS]
+# walls left channel (flattened to 81 cells) for every possible count: the first
+# `count` cells are set
+WALLS_LEFT_PLANES: np.ndarray = np.arange(81) < np.arange(11)[:, None]
+# cell of the observation (row * 9 + col) that holds each wall slot
+WALL_SLOT_CELLS: np.ndarray = np.arange(64) + np.arange(64) // 8
+# the action mirrored left-right (a <-> i): the column of a cell becomes 8 - col and
+# the wall between columns col and col + 1 becomes the wall at column 7 - col
+MIRROR_ACTIONS: np.ndarray = np.where(
+    ACTION_ORIENTATIONS == PAWN_MOVE,
+    np.arange(NUM_ACTIONS) + 8 - 2 * ACTION_COLS,
+    np.arange(NUM_ACTIONS) + 7 - 2 * ACTION_COLS,
+)
+for _table in (
+    ACTION_ROWS,
+    ACTION_COLS,
+    ACTION_ORIENTATIONS,
+    MOVE_ARRAY,
+    WALLS_LEFT_PLANES,
+    WALL_SLOT_CELLS,
+    MIRROR_ACTIONS,
+):
+    _table.flags.writeable = False
+del _cells, _grid_sizes, _table
+
 
 def convert_discrete_to_quoridor_move(discrete_move: int) -> str:
     """
@@ -15,40 +68,11 @@ def convert_discrete_to_quoridor_move(discrete_move: int) -> str:
     Returns
     -------
     str
-        The quoridor move.
+        The quoridor move, or None if the discrete move is out of range.
     """
-    if discrete_move <= 80:
-        # 0-80 are pawn moves
-        # 0 -> a1
-        # 1 -> b1
-        # 10 -> b2
-        # 79 -> h9
-        # 80 -> i9
-        return chr(ord("a") + discrete_move % 9) + str(discrete_move // 9 + 1)
-    if discrete_move <= 144:
-        # 81-144 are horizontal wall moves
-        # 81 -> a1h
-        # 82 -> b1h
-        # 89 -> a2h
-        # 90 -> b2h
-        # 144 -> h8h
-        return (
-            chr(ord("a") + (discrete_move - 81) % 8)
-            + str((discrete_move - 81) // 8 + 1)
-            + "h"
-        )
-    if discrete_move <= 208:
-        # 145-208 are vertical wall moves
-        # 145 -> a1v
-        # 146 -> b1v
-        # 153 -> a2v
-        # 154 -> b2v
-        # 208 -> h8v
-        return (
-            chr(ord("a") + (discrete_move - 145) % 8)
-            + str((discrete_move - 145) // 8 + 1)
-            + "v"
-        )
+    if 0 <= discrete_move < NUM_ACTIONS:
+        return DISCRETE_TO_MOVE[discrete_move]
+    return None
 
 
 def convert_quoridor_move_to_discrete(move: str) -> int:
@@ -63,17 +87,107 @@ def convert_quoridor_move_to_discrete(move: str) -> int:
     Returns
     -------
     int
-        The discrete move.
+        The discrete move, or None if the move does not exist.
+    """
+    return MOVE_TO_DISCRETE.get(move)
+
+
+def convert_discrete_to_quoridor_moves(discrete_moves: np.ndarray) -> np.ndarray:
+    """
+    Converts an array of discrete moves to quoridor moves.
+
+    Parameters
+    ----------
+    discrete_moves : np.ndarray
+        The discrete moves, of any shape.
+
+    Returns
+    -------
+    np.ndarray
+        The quoridor moves, a string array of the same shape.
+    """
+    return MOVE_ARRAY[discrete_moves]
+
+
+def convert_quoridor_moves_to_discrete(moves: np.ndarray) -> np.ndarray:
+    """
+    Converts an array of quoridor moves to discrete moves.
+
+    Parameters
+    ----------
+    moves : np.ndarray
+        The quoridor moves, an array (or list) of strings of any shape.
+
+    Returns
+    -------
+    np.ndarray
+        The discrete moves, an int64 array of the same shape.
+
+    Raises
+    ------
+    ValueError
+        If one of the moves does not exist.
+    """
+    moves = np.asarray(moves)
+    index = np.searchsorted(_SORTED_MOVES, moves).clip(max=NUM_ACTIONS - 1)
+    if not np.all(_SORTED_MOVES[index] == moves):
+        raise ValueError(f"Unknown moves: {moves[_SORTED_MOVES[index] != moves]}")
+    return _SORTED_ACTIONS[index]
+
+
+def convert_discrete_to_coordinates(
+    discrete_moves: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Converts an array of discrete moves to board coordinates.
+
+    Parameters
+    ----------
+    discrete_moves : np.ndarray
+        The discrete moves, of any shape.
+
+    Returns
+    -------
+    (np.ndarray, np.ndarray, np.ndarray)
+        The rows, columns and orientations (PAWN_MOVE, HORIZONTAL_WALL or
+        VERTICAL_WALL) of the moves. The row and column of a wall are those of the
+        cell at its bottom left, as in the wall channels of the observation.
+    """
+    return (
+        ACTION_ROWS[discrete_moves],
+        ACTION_COLS[discrete_moves],
+        ACTION_ORIENTATIONS[discrete_moves],
+    )
+
+
+def _observation_buffer(out: np.ndarray = None) -> np.ndarray:
+    """
+    Returns a cleared observation buffer.
+
+    Parameters
+    ----------
+    out : np.ndarray, optional
+        A (9, 9, 6) bool buffer to reuse, a new one is allocated if not given.
+
+    Returns
+    -------
+    np.ndarray
+        The buffer, all zeros.
+
+    Raises
+    ------
+    ValueError
+        If the buffer has the wrong shape or type, or is not contiguous.
     """
-    if len(move) == 2:
-        return (ord(move[0]) - ord("a")) + 9 * (int(move[1]) - 1)
-    if move[2] == "h":
-        return 81 + (ord(move[0]) - ord("a")) + 8 * (int(move[1]) - 1)
-    if move[2] == "v":
-        return 145 + (ord(move[0]) - ord("a")) + 8 * (int(move[1]) - 1)
+    if out is None:
+        return np.zeros((9, 9, 6), dtype=bool)
+    if out.shape != (9, 9, 6) or out.dtype != bool or not out.flags.c_contiguous:
+        raise ValueError("The buffer must be a contiguous (9, 9, 6) bool array.")
+    out.fill(0)
+    return out
 
 
-def board_to_observation(board: Quoridor):
+def board_to_observation(board: Quoridor, out: np.ndarray = None) -> np.ndarray:
     """
     Converts a board to an observation.
 
@@ -81,27 +195,211 @@ def board_to_observation(board: Quoridor):
     ----------
     board : Quoridor
         The quoridor instancs.
+    out : np.ndarray, optional
+        A contiguous (9, 9, 6) bool buffer to write the observation to.
 
     Returns
     -------
     np.ndarray
-        The observation.
+        The observation (`out` if given).
     """
-    observation = np.zeros((9, 9, 6), dtype=bool)
-    observation[*convert_cell_to_xy(board.player1.pos), 0] = 1
-    observation[*convert_cell_to_xy(board.player2.pos), 1] = 1
+    observation = _observation_buffer(out)
+    # view with one row per cell (row * 9 + col) and one column per channel
+    cells = observation.reshape(81, 6)
+    cells[MOVE_TO_DISCRETE[board.player1.pos], 0] = 1
+    cells[MOVE_TO_DISCRETE[board.player2.pos], 1] = 1
     for wall in board.placed_walls:
-        if wall[2] == "h":
-            observation[*convert_cell_to_xy(wall[:2]), 2] = 1
-        else:
-            observation[*convert_cell_to_xy(wall[:2]), 3] = 1
-    for i in range(board.player1.walls):
-        observation[i // 9, i % 9, 4] = 1
-    for i in range(board.player2.walls):
-        observation[i // 9, i % 9, 5] = 1
+        action = MOVE_TO_DISCRETE[wall]
+        observation[
+            ACTION_ROWS[action], ACTION_COLS[action], 2 if wall[2] == "h" else 3
+        ] = 1
+    cells[:, 4] = WALLS_LEFT_PLANES[board.player1.walls]
+    cells[:, 5] = WALLS_LEFT_PLANES[board.player2.walls]
+    return observation
+
+
+def state_to_observation(state, out: np.ndarray = None) -> np.ndarray:
+    """
+    Converts a compact game state to an observation.
+
+    Parameters
+    ----------
+    state : QuoridorState
+        The compact game state.
+    out : np.ndarray, optional
+        A contiguous (9, 9, 6) bool buffer to write the observation to.
+
+    Returns
+    -------
+    np.ndarray
+        The observation (`out` if given), identical to `board_to_observation` of the
+        same game.
+    """
+    observation = _observation_buffer(out)
+    cells = observation.reshape(81, 6)
+    cells[state.pawns[0], 0] = 1
+    cells[state.pawns[1], 1] = 1
+    for channel, walls in ((2, state.horizontal_walls), (3, state.vertical_walls)):
+        while walls:
+            low = walls & -walls
+            slot = low.bit_length() - 1
+            cells[slot + slot // 8, channel] = 1
+            walls ^= low
+    cells[:, 4] = WALLS_LEFT_PLANES[state.walls_left[0]]
+    cells[:, 5] = WALLS_LEFT_PLANES[state.walls_left[1]]
+    return observation
+
+
+def update_observation(observation: np.ndarray, state, action: int) -> np.ndarray:
+    """
+    Updates an observation in place with the last move made in a game.
+
+    Only the channels the move changes are written: the pawn channel of the player
+    for a pawn move, the wall channel and the walls left channel of the player for
+    a wall move.
+
+    Parameters
+    ----------
+    observation : np.ndarray
+        The contiguous (9, 9, 6) observation of the game before the move.
+    state : QuoridorState
+        The compact game state after the move.
+    action : int
+        The discrete move that was made.
+
+    Returns
+    -------
+    np.ndarray
+        The updated observation, equal to `state_to_observation(state)`.
+    """
+    # the winner of a terminated game is still the player to move
+    player = state.current if state.is_terminated else 1 - state.current
+    cells = observation.reshape(81, 6)
+    if action < 81:
+        cells[:, player] = 0
+        cells[action, player] = 1
+    else:
+        channel = 2 if ACTION_ORIENTATIONS[action] == HORIZONTAL_WALL else 3
+        observation[ACTION_ROWS[action], ACTION_COLS[action], channel] = 1
+        cells[:, 4 + player] = WALLS_LEFT_PLANES[state.walls_left[player]]
     return observation
 
 
+def decode_observations(
+    observations: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Decodes a batch of observations into the arrays of a compact game state.
+
+    Parameters
+    ----------
+    observations : np.ndarray
+        The (N, 9, 9, 6) observations.
+
+    Returns
+    -------
+    (np.ndarray, np.ndarray, np.ndarray)
+        The (N, 2) cells of the pawns, the (N, 128) bool placed walls (64
+        horizontal slots, then 64 vertical slots) and the (N, 2) walls left.
+    """
+    cells = np.asarray(observations).reshape(-1, 81, 6)
+    pawns = cells[:, :, :2].argmax(axis=1)
+    walls = cells[:, WALL_SLOT_CELLS, 2:4].transpose(0, 2, 1).reshape(-1, 128)
+    walls_left = cells[:, :, 4:].sum(axis=1)
+    return pawns, walls, walls_left
+
+
+def mirror_actions(actions: np.ndarray) -> np.ndarray:
+    """
+    Mirrors discrete actions left-right.
+
+    Parameters
+    ----------
+    actions : np.ndarray
+        The discrete actions, of any shape.
+
+    Returns
+    -------
+    np.ndarray
+        The mirrored actions, e.g. a1 -> i1, c3h -> f3h and a1v -> h1v.
+    """
+    return MIRROR_ACTIONS[actions]
+
+
+def mirror_action_masks(action_masks: np.ndarray) -> np.ndarray:
+    """
+    Mirrors action masks, or any per action values such as a policy, left-right.
+
+    Parameters
+    ----------
+    action_masks : np.ndarray
+        The (..., 209) action masks.
+
+    Returns
+    -------
+    np.ndarray
+        The masks of the mirrored positions. Mirroring is its own inverse, so entry
+        ``MIRROR_ACTIONS[a]`` of the result is entry ``a`` of the input.
+    """
+    return np.asarray(action_masks)[..., MIRROR_ACTIONS]
+
+
+def mirror_observations(observations: np.ndarray) -> np.ndarray:
+    """
+    Mirrors observations left-right.
+
+    Parameters
+    ----------
+    observations : np.ndarray
+        The (..., 9, 9, 6) observations.
+
+    Returns
+    -------
+    np.ndarray
+        The observations of the mirrored positions. The walls left channels do not
+        depend on the position and are copied unchanged.
+    """
+    observations = np.asarray(observations)
+    mirrored = observations.copy()
+    # the pawns mirror over all 9 columns, the walls over the 8 columns they start at
+    mirrored[..., :2] = observations[..., ::-1, :2]
+    mirrored[..., :8, 2:4] = observations[..., 7::-1, 2:4]
+    return mirrored
+
+
+def canonicalize_observations(
+    observations: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Maps every observation and its mirror image to the same canonical observation,
+    e.g. for the key of a cache of evaluations.
+
+    Parameters
+    ----------
+    observations : np.ndarray
+        The (N, 9, 9, 6) observations.
+
+    Returns
+    -------
+    (np.ndarray, np.ndarray)
+        The (N, 9, 9, 6) canonical observations, the smaller of each observation and
+        its mirror image in the order of their bytes, and the (N,) flags of the
+        observations that were mirrored. Mirror the actions of a mirrored position to
+        play them in the original one.
+    """
+    observations = np.asarray(observations, dtype=bool)
+    mirrored = mirror_observations(observations)
+    original_bits = observations.reshape(len(observations), -1)
+    mirrored_bits = mirrored.reshape(len(observations), -1)
+    differs = original_bits != mirrored_bits
+    first = differs.argmax(axis=1)
+    rows = np.arange(len(observations))
+    flags = differs[rows, first] & (
+        mirrored_bits[rows, first] < original_bits[rows, first]
+    )
+    return np.where(flags[:, None, None, None], mirrored, observations), flags
+
+
 # need a number that goes like this the number 10 should be casted 10 (1, 0) and 11 (1, 1)
 
 
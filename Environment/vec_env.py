@@ -0,0 +1,530 @@
+"""
+This module provides a vectorized Quoridor environment that steps N games in lock-step.
+
+The games are stored as a struct of NumPy arrays (pawns, placed walls, wall counters,
+side to move, open edges) and every rule is applied to all games at once, so the cost
+of a step is a handful of array operations instead of one Python call per game.
+
+Rows of the board are stored as 9-bit masks in uint16 arrays, one per direction, with
+a bit set for every cell whose edge in that direction is still open. Path checks are a
+flood fill over those rows for all (game, wall) pairs that need one.
+
+A wall can only cut a player off if it closes a region of the board: the walls and the
+border form a graph on the 10x10 corners of the cells, and a new wall splits a region
+only when two of its three corners are already connected in that graph. Corner
+connectivity is kept as a label per corner, so only those closing walls get a path
+check.
+"""
+
+from typing import Dict, Tuple
+import numpy as np
+from Environment.state import (
+    BOARD_SIZE,
+    DIRECTION_OFFSETS,
+    GOAL_ROWS,
+    INITIAL_OPEN_EDGES,
+    NUM_ACTIONS,
+    NUM_CELLS,
+    NUM_WALL_SLOTS,
+    NUM_WALLS,
+    START_CELLS,
+    START_WALLS,
+    WALL_CONFLICTS,
+    WALL_GRID_SIZE,
+    WALL_KEEPS,
+    WALL_OFFSET,
+)
+from Environment.utils import WALL_SLOT_CELLS, WALLS_LEFT_PLANES
+
+ROW_MASK = (1 << BOARD_SIZE) - 1
+NUM_CORNERS = (BOARD_SIZE + 1) * (BOARD_SIZE + 1)
+
+
+def _to_rows(mask: int) -> np.ndarray:
+    """
+    Splits an 81-bit cell mask into its 9 row masks.
+
+    Parameters
+    ----------
+    mask : int
+        The cell mask.
+
+    Returns
+    -------
+    np.ndarray
+        The (9,) uint16 row masks.
+    """
+    return np.array(
+        [mask >> row * BOARD_SIZE & ROW_MASK for row in range(BOARD_SIZE)],
+        dtype=np.uint16,
+    )
+
+
+def _wall_corners(wall: int) -> Tuple[int, int, int]:
+    """
+    Gets the three corners (y * 10 + x) covered by a wall.
+
+    Parameters
+    ----------
+    wall : int
+        The wall index (0..63 horizontal, 64..127 vertical).
+
+    Returns
+    -------
+    (int, int, int)
+        The corners of the wall, its middle corner second.
+    """
+    vertical, slot = divmod(wall, NUM_WALL_SLOTS)
+    row, col = divmod(slot, WALL_GRID_SIZE)
+    width = BOARD_SIZE + 1
+    if not vertical:
+        # e3h lies between rows 3 and 4 from the left of column e to the right of f
+        start, step = (row + 1) * width + col, 1
+    else:
+        start, step = row * width + col + 1, width
+    return start, start + step, start + 2 * step
+
+
+def _initial_corner_labels() -> np.ndarray:
+    """
+    Gets the corner labels of an empty board, where only the border is connected.
+
+    Returns
+    -------
+    np.ndarray
+        The (100,) labels.
+    """
+    labels = np.arange(NUM_CORNERS)
+    x, y = labels % (BOARD_SIZE + 1), labels // (BOARD_SIZE + 1)
+    labels[(x == 0) | (x == BOARD_SIZE) | (y == 0) | (y == BOARD_SIZE)] = 0
+    return labels
+
+
+INITIAL_EDGE_ROWS = np.stack([_to_rows(mask) for mask in INITIAL_OPEN_EDGES])
+WALL_KEEP_ROWS = np.array(
+    [[_to_rows(keep) for keep in keeps] for keeps in WALL_KEEPS], dtype=np.uint16
+)
+WALL_CONFLICT_TABLE = np.array(
+    [
+        [conflicts >> wall & 1 for wall in range(NUM_WALLS)]
+        for conflicts in WALL_CONFLICTS
+    ],
+    dtype=bool,
+)
+WALL_CORNERS = np.array([_wall_corners(wall) for wall in range(NUM_WALLS)])
+INITIAL_CORNER_LABELS = _initial_corner_labels()
+
+
+def _has_open_edge(edge_rows: np.ndarray, cells: np.ndarray) -> np.ndarray:
+    """
+    Checks, for every game, if the edge of a cell in one direction is open.
+
+    Parameters
+    ----------
+    edge_rows : np.ndarray
+        The (N, 9) row masks of one direction.
+    cells : np.ndarray
+        The (N,) cells.
+
+    Returns
+    -------
+    np.ndarray
+        The (N,) bool result.
+    """
+    rows = edge_rows[np.arange(len(cells)), cells // BOARD_SIZE]
+    return (rows >> (cells % BOARD_SIZE).astype(np.uint16) & 1).astype(bool)
+
+
+def reaches_goal(
+    edge_rows: np.ndarray, starts: np.ndarray, goal_rows: np.ndarray
+) -> np.ndarray:
+    """
+    Determines for a batch of boards if a goal row can be reached from a start cell.
+
+    Parameters
+    ----------
+    edge_rows : np.ndarray
+        The (K, 4, 9) left, right, down and up row masks of every board.
+    starts : np.ndarray
+        The (K,) start cells.
+    goal_rows : np.ndarray
+        The (K,) goal rows.
+
+    Returns
+    -------
+    np.ndarray
+        The (K,) bool result.
+    """
+    result = np.zeros(len(starts), dtype=bool)
+    pending = np.arange(len(starts))
+    reach = np.zeros((len(starts), BOARD_SIZE), dtype=np.uint16)
+    reach[pending, starts // BOARD_SIZE] = np.left_shift(1, starts % BOARD_SIZE)
+    left, right, down, up = (edge_rows[:, direction] for direction in range(4))
+    while pending.size:
+        arrived = reach[np.arange(len(pending)), goal_rows] != 0
+        result[pending[arrived]] = True
+        grown = reach | (reach & left) >> 1 | (reach & right) << 1
+        grown[:, 1:] |= (reach & up)[:, :-1]
+        grown[:, :-1] |= (reach & down)[:, 1:]
+        # boards that reached the goal or stopped growing are done
+        keep = ~arrived & (grown != reach).any(axis=1)
+        pending, reach, goal_rows = pending[keep], grown[keep], goal_rows[keep]
+        left, right, down, up = left[keep], right[keep], down[keep], up[keep]
+    return result
+
+
+def open_edge_rows(walls: np.ndarray) -> np.ndarray:
+    """
+    Computes the open edges of a batch of boards from their placed walls.
+
+    Parameters
+    ----------
+    walls : np.ndarray
+        The (N, 128) bool placed walls.
+
+    Returns
+    -------
+    np.ndarray
+        The (N, 4, 9) uint16 left, right, down and up row masks.
+    """
+    keeps = np.where(walls[:, :, None, None], WALL_KEEP_ROWS, np.uint16(ROW_MASK))
+    return INITIAL_EDGE_ROWS & np.bitwise_and.reduce(keeps, axis=1)
+
+
+def corner_labels(walls: np.ndarray) -> np.ndarray:
+    """
+    Computes the corner labels of a batch of boards from their placed walls.
+
+    Every corner starts with its own label (0 for the border) and the corners of
+    every wall take the smallest label among them, until the labels stop changing.
+
+    Parameters
+    ----------
+    walls : np.ndarray
+        The (N, 128) bool placed walls.
+
+    Returns
+    -------
+    np.ndarray
+        The (N, 100) labels, equal for corners connected by walls or the border.
+    """
+    games, placed = np.nonzero(walls)
+    labels = np.tile(INITIAL_CORNER_LABELS, (len(walls), 1))
+    corners = WALL_CORNERS[placed]
+    while games.size:
+        wall_labels = labels[games[:, None], corners].min(axis=1)
+        merged = labels.copy()
+        for corner in range(3):
+            np.minimum.at(merged, (games, corners[:, corner]), wall_labels)
+        if np.array_equal(merged, labels):
+            break
+        labels = merged
+    return labels
+
+
+def safe_walls(
+    candidates: np.ndarray,
+    edge_rows: np.ndarray,
+    labels: np.ndarray,
+    pawns: np.ndarray,
+) -> np.ndarray:
+    """
+    Removes the walls that would cut a player off from their goal from a batch of
+    candidate walls.
+
+    A wall can only disconnect the board if its cut edges complete a cut, that is if
+    two of its three corners are already connected through walls or the border. Only
+    those closing walls get a path check, all of them in one batched flood fill.
+
+    Parameters
+    ----------
+    candidates : np.ndarray
+        The (N, 128) bool candidate walls, free of overlaps and crossings.
+    edge_rows : np.ndarray
+        The (N, 4, 9) open edge row masks of every board.
+    labels : np.ndarray
+        The (N, 100) corner labels of every board, see `corner_labels`.
+    pawns : np.ndarray
+        The (N, 2) cells of the pawns.
+
+    Returns
+    -------
+    np.ndarray
+        The (N, 128) bool legal walls.
+    """
+    candidates = candidates.copy()
+    corners = labels[:, WALL_CORNERS]
+    closing = (
+        (corners[:, :, 0] == corners[:, :, 1])
+        | (corners[:, :, 1] == corners[:, :, 2])
+        | (corners[:, :, 0] == corners[:, :, 2])
+    )
+    check_games, check_walls = np.nonzero(candidates & closing)
+    if check_games.size:
+        check_rows = edge_rows[check_games] & WALL_KEEP_ROWS[check_walls]
+        keeps_paths = np.ones(len(check_games), dtype=bool)
+        for player in range(2):
+            keeps_paths &= reaches_goal(
+                check_rows,
+                pawns[check_games, player],
+                np.full(len(check_games), GOAL_ROWS[player]),
+            )
+        candidates[check_games, check_walls] = keeps_paths
+    return candidates
+
+
+def legal_wall_masks(
+    pawns: np.ndarray,
+    walls: np.ndarray,
+    walls_left: np.ndarray,
+    current: np.ndarray,
+) -> np.ndarray:
+    """
+    Computes the legal walls of a batch of positions in one pass, without any
+    history or incremental state.
+
+    Parameters
+    ----------
+    pawns : np.ndarray
+        The (N, 2) cells of the pawns.
+    walls : np.ndarray
+        The (N, 128) bool placed walls.
+    walls_left : np.ndarray
+        The (N, 2) walls left of every player.
+    current : np.ndarray
+        The (N,) index of the player to move.
+
+    Returns
+    -------
+    np.ndarray
+        The (N, 128) bool legal walls for the player to move, the wall part of the
+        action mask.
+    """
+    walls = np.asarray(walls, dtype=bool)
+    games = np.arange(len(walls))
+    conflicts = walls.astype(np.uint8) @ WALL_CONFLICT_TABLE.astype(np.uint8) > 0
+    candidates = ~conflicts & (walls_left[games, current] > 0)[:, None]
+    return safe_walls(
+        candidates, open_edge_rows(walls), corner_labels(walls), np.asarray(pawns)
+    )
+
+
+class QuoridorVecEnv:
+    """
+    Vectorized Quoridor environment stepping `num_envs` games in lock-step.
+
+    Observations and action masks follow `QuoridorEnv`: (N, 9, 9, 6) bool observations
+    and (N, 209) int8 masks for the player to move. Rewards are given per player,
+    (N, 2) for player 1 and player 2, as in `QuoridorEnv`: +1 for the winner and -1
+    for the loser, and -1 for the player making an illegal move (0 for the other).
+    Finished games are reset automatically, so the returned observation of a game
+    that is done is the start of its next episode.
+    """
+
+    def __init__(self, num_envs: int):
+        """
+        Initialize the vectorized environment.
+
+        Parameters
+        ----------
+        num_envs : int
+            The number of games played in lock-step.
+        """
+        self.num_envs = num_envs
+        self.pawns = np.zeros((num_envs, 2), dtype=np.int64)
+        self.walls_left = np.zeros((num_envs, 2), dtype=np.int64)
+        self.current = np.zeros(num_envs, dtype=np.int64)
+        self.turns = np.zeros(num_envs, dtype=np.int64)
+        self.walls = np.zeros((num_envs, NUM_WALLS), dtype=bool)
+        self.conflicts = np.zeros((num_envs, NUM_WALLS), dtype=bool)
+        self.open_edges = np.zeros((num_envs, 4, BOARD_SIZE), dtype=np.uint16)
+        self.corner_labels = np.zeros((num_envs, NUM_CORNERS), dtype=np.int64)
+        self.action_masks = np.zeros((num_envs, NUM_ACTIONS), dtype=np.int8)
+
+    def reset(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Reset all games.
+
+        Returns
+        -------
+        (np.ndarray, np.ndarray)
+            The observations and action masks.
+        """
+        self._reset_games(np.arange(self.num_envs))
+        self.action_masks = self._compute_action_masks()
+        return self._compute_observations(), self.action_masks.copy()
+
+    def step(
+        self, actions: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Take a step in every game.
+
+        Parameters
+        ----------
+        actions : np.ndarray
+            The (N,) discrete actions of the players to move.
+
+        Returns
+        -------
+        observations : np.ndarray
+            The (N, 9, 9, 6) observations.
+        action_masks : np.ndarray
+            The (N, 209) action masks of the players to move.
+        rewards : np.ndarray
+            The (N, 2) rewards of player 1 and player 2.
+        dones : np.ndarray
+            The (N,) flags of the games that ended with this step.
+        infos : Dict[str, np.ndarray]
+            "winner": the (N,) winning player (1 or 2) of finished games, 0 otherwise.
+            "episode_length": the (N,) number of moves of finished games, 0 otherwise.
+            "player" and "turn": the (N,) player to move and turn of the returned
+            observations.
+        """
+        actions = np.asarray(actions, dtype=np.int64)
+        games = np.arange(self.num_envs)
+        in_range = (actions >= 0) & (actions < NUM_ACTIONS)
+        legal = in_range.copy()
+        legal[in_range] = self.action_masks[games[in_range], actions[in_range]] == 1
+
+        rewards = np.zeros((self.num_envs, 2), dtype=np.float32)
+        illegal = games[~legal]
+        rewards[illegal, self.current[illegal]] = -1
+
+        pawn_games = games[legal & (actions < NUM_CELLS)]
+        self.pawns[pawn_games, self.current[pawn_games]] = actions[pawn_games]
+        won = np.zeros(self.num_envs, dtype=bool)
+        won[pawn_games] = (
+            actions[pawn_games] // BOARD_SIZE
+            == np.array(GOAL_ROWS)[self.current[pawn_games]]
+        )
+        winners = games[won]
+        rewards[winners, self.current[winners]] = 1
+        rewards[winners, 1 - self.current[winners]] = -1
+
+        wall_games = games[legal & (actions >= WALL_OFFSET)]
+        self._place_walls(wall_games, actions[wall_games] - WALL_OFFSET)
+
+        self.turns[legal] += 1
+        self.current[legal & ~won] ^= 1
+
+        dones = won | ~legal
+        infos = {
+            "winner": np.where(won, self.current + 1, 0),
+            "episode_length": np.where(dones, self.turns, 0),
+        }
+        self._reset_games(games[dones])
+        self.action_masks = self._compute_action_masks()
+        infos["player"] = self.current + 1
+        infos["turn"] = self.turns + 1
+        return (
+            self._compute_observations(),
+            self.action_masks.copy(),
+            rewards,
+            dones,
+            infos,
+        )
+
+    def _reset_games(self, games: np.ndarray) -> None:
+        """
+        Reset the given games to the start position.
+
+        Parameters
+        ----------
+        games : np.ndarray
+            The indexes of the games.
+        """
+        self.pawns[games] = START_CELLS
+        self.walls_left[games] = START_WALLS
+        self.current[games] = 0
+        self.turns[games] = 0
+        self.walls[games] = False
+        self.conflicts[games] = False
+        self.open_edges[games] = INITIAL_EDGE_ROWS
+        self.corner_labels[games] = INITIAL_CORNER_LABELS
+
+    def _place_walls(self, games: np.ndarray, walls: np.ndarray) -> None:
+        """
+        Place one wall in each of the given games for the player to move.
+
+        Parameters
+        ----------
+        games : np.ndarray
+            The indexes of the games.
+        walls : np.ndarray
+            The wall index (0..63 horizontal, 64..127 vertical) per game.
+        """
+        self.walls[games, walls] = True
+        self.conflicts[games] |= WALL_CONFLICT_TABLE[walls]
+        self.open_edges[games] &= WALL_KEEP_ROWS[walls]
+        self.walls_left[games, self.current[games]] -= 1
+        # connect the three corners of the wall
+        labels = self.corner_labels[games]
+        corners = WALL_CORNERS[walls]
+        rows = np.arange(len(games))
+        merged = labels[rows, corners[:, 0]]
+        for corner in (1, 2):
+            old = labels[rows, corners[:, corner]]
+            labels = np.where(labels == old[:, None], merged[:, None], labels)
+        self.corner_labels[games] = labels
+
+    def _compute_action_masks(self) -> np.ndarray:
+        """
+        Compute the action masks of the players to move in every game.
+
+        Returns
+        -------
+        np.ndarray
+            The (N, 209) int8 action masks.
+        """
+        games = np.arange(self.num_envs)
+        cells = self.pawns[games, self.current]
+        opponents = self.pawns[games, 1 - self.current]
+        pawn_mask = np.zeros((self.num_envs, NUM_CELLS), dtype=bool)
+        for direction, offset in enumerate(DIRECTION_OFFSETS):
+            is_open = _has_open_edge(self.open_edges[:, direction], cells)
+            facing = is_open & (cells + offset == opponents)
+            step = games[is_open & ~facing]
+            pawn_mask[step, cells[step] + offset] = True
+            behind_open = facing & _has_open_edge(
+                self.open_edges[:, direction], opponents
+            )
+            jump = games[behind_open]
+            pawn_mask[jump, opponents[jump] + offset] = True
+            # blocked behind the opponent: jump diagonally around it
+            blocked = facing & ~behind_open
+            for side, side_offset in enumerate(DIRECTION_OFFSETS):
+                diagonal = games[
+                    blocked
+                    & _has_open_edge(self.open_edges[:, side], opponents)
+                    & (opponents + side_offset != cells)
+                ]
+                pawn_mask[diagonal, opponents[diagonal] + side_offset] = True
+
+        wall_mask = safe_walls(
+            ~self.conflicts & (self.walls_left[games, self.current] > 0)[:, None],
+            self.open_edges,
+            self.corner_labels,
+            self.pawns,
+        )
+
+        return np.concatenate([pawn_mask, wall_mask], axis=1).astype(np.int8)
+
+    def _compute_observations(self) -> np.ndarray:
+        """
+        Compute the observations of every game.
+
+        Returns
+        -------
+        np.ndarray
+            The (N, 9, 9, 6) bool observations.
+        """
+        observations = np.zeros((self.num_envs, NUM_CELLS, 6), dtype=bool)
+        games = np.arange(self.num_envs)
+        observations[games, self.pawns[:, 0], 0] = True
+        observations[games, self.pawns[:, 1], 1] = True
+        observations[:, WALL_SLOT_CELLS, 2] = self.walls[:, :NUM_WALL_SLOTS]
+        observations[:, WALL_SLOT_CELLS, 3] = self.walls[:, NUM_WALL_SLOTS:]
+        observations[:, :, 4] = WALLS_LEFT_PLANES[self.walls_left[:, 0]]
+        observations[:, :, 5] = WALLS_LEFT_PLANES[self.walls_left[:, 1]]
+        return observations.reshape(self.num_envs, BOARD_SIZE, BOARD_SIZE, 6)
@@ -0,0 +1,153 @@
+"""
+This module provides a heuristic evaluation of Quoridor positions, to cut rollouts
+short or to replace them.
+
+A position is scored in moves for the player to move: the shortest path of the
+opponent minus its own, half a move of tempo for being on move, so that in a pure race
+the player to move wins the ties, plus a fraction of a move for every wall it has more
+than the opponent. The score is squashed into a value between -1 and 1 with ``tanh``.
+The shortest paths ignore the pawns, as the distance fields of `ShortestPathPolicy`,
+`QuoridorState` and `RolloutEngine` do.
+"""
+
+import math
+from typing import Tuple
+import numpy as np
+from Environment.state import QuoridorState, states_from_observations
+
+# the moves a wall in hand is worth
+WALL_WEIGHT = 0.4
+# the moves being on move is worth
+TEMPO = 0.5
+# the score in moves that maps to a value of tanh(1), about 0.76
+SCALE = 3.0
+
+
+class Evaluation:
+    """
+    Heuristic value of a position for the player to move, see the module docstring.
+    """
+
+    def __init__(
+        self,
+        wall_weight: float = WALL_WEIGHT,
+        tempo: float = TEMPO,
+        scale: float = SCALE,
+    ) -> None:
+        """
+        Initializes a new Evaluation instance.
+
+        Parameters
+        ----------
+        wall_weight : float, optional
+            The moves a wall in hand is worth.
+        tempo : float, optional
+            The moves being on move is worth.
+        scale : float, optional
+            The score in moves that maps to a value of tanh(1).
+        """
+        self.wall_weight = wall_weight
+        self.tempo = tempo
+        self.scale = scale
+
+    def score(
+        self,
+        distance: int,
+        opponent_distance: int,
+        walls_left: int,
+        opponent_walls_left: int,
+    ) -> float:
+        """
+        Scores a position in moves for the player to move.
+
+        Parameters
+        ----------
+        distance : int
+            The length of the shortest path of the player to move.
+        opponent_distance : int
+            The length of the shortest path of the opponent.
+        walls_left : int
+            The walls the player to move has left.
+        opponent_walls_left : int
+            The walls the opponent has left.
+
+        Returns
+        -------
+        float
+            The score, positive when the player to move is ahead.
+        """
+        return (
+            opponent_distance
+            - distance
+            + self.tempo
+            + self.wall_weight * (walls_left - opponent_walls_left)
+        )
+
+    def value_of(
+        self,
+        distance: int,
+        opponent_distance: int,
+        walls_left: int,
+        opponent_walls_left: int,
+    ) -> float:
+        """
+        Values a position for the player to move, see `score` for the parameters.
+
+        Returns
+        -------
+        float
+            The value, between -1 and 1.
+        """
+        score = self.score(distance, opponent_distance, walls_left, opponent_walls_left)
+        return math.tanh(score / self.scale)
+
+    def value(self, state: QuoridorState) -> float:
+        """
+        Values a state for the player to move.
+
+        Parameters
+        ----------
+        state : QuoridorState
+            The state.
+
+        Returns
+        -------
+        float
+            The value, between -1 and 1, and 1 in a finished game, won by the player
+            to move.
+        """
+        if state.is_terminated:
+            return 1.0
+        player = state.current
+        return self.value_of(
+            state.path_length(player),
+            state.path_length(1 - player),
+            state.walls_left[player],
+            state.walls_left[1 - player],
+        )
+
+    def __call__(
+        self, observations: np.ndarray, action_masks: np.ndarray, players: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Values a batch of positions, as the evaluator of a PUCT search in
+        `MCTSAgent`.
+
+        Parameters
+        ----------
+        observations : np.ndarray
+            The (B, 9, 9, 6) observations.
+        action_masks : np.ndarray
+            The (B, 209) action masks.
+        players : np.ndarray
+            The (B,) ids (1 or 2) of the players to move.
+
+        Returns
+        -------
+        (np.ndarray, np.ndarray)
+            The (B, 209) uniform priors over the legal actions and the (B,) values for
+            the players to move.
+        """
+        states = states_from_observations(observations, players)
+        values = np.array([self.value(state) for state in states])
+        return np.asarray(action_masks, dtype=float), values
@@ -1,3 +1,4 @@
+from collections import deque
 from typing import Dict, List
 from quoridor import Quoridor
 import numpy as np
@@ -61,22 +62,19 @@ class ShortestPathPolicy:
             The shortest path.
         """
         # Take into account the waiting player position for jump moves
-
+        neighbours = self.get_neighbours(board, current_player_pos, waiting_player_pos)
         # Get the shortest path
-        self.update_board(board, current_player_pos, waiting_player_pos)
-        path = self.bfs(board, current_player_pos, goal)
-        # Return the shortest path
-        return path
+        return self.bfs(board, current_player_pos, goal, neighbours)
 
-    def update_board(
+    def get_neighbours(
         self,
         board: Dict[str, List[str]],
         current_player_pos: str,
         waiting_player_pos: str,
-    ) -> None:
+    ) -> List[str]:
         """
-        Update the nodes of the board for the current player taking into account
-        the position of the waiting player.
+        Get the cells the current player can move to, taking into account the
+        position of the waiting player for jump moves. The board is not modified.
 
         Parameters
         ----------
@@ -86,43 +84,41 @@ class ShortestPathPolicy:
             The current player position.
         waiting_player_pos : str
             The waiting player position.
+
+        Returns
+        -------
+        List[str]
+            The reachable cells.
         """
+        neighbours = board[current_player_pos]
         # check if the other player is in range of current player for jumping moves
-        if waiting_player_pos in board[current_player_pos]:
-            board[current_player_pos].remove(waiting_player_pos)
-            # same row
-            if current_player_pos[1] == waiting_player_pos[1]:
-                if current_player_pos[0] > waiting_player_pos[0]:
-                    pos_behind = (
-                        chr(ord(current_player_pos[0]) - 2) + current_player_pos[1]
-                    )
-                else:
-                    pos_behind = (
-                        chr(ord(current_player_pos[0]) + 2) + current_player_pos[1]
-                    )
-
-            elif current_player_pos[0] == waiting_player_pos[0]:  # same column
-                if current_player_pos[1] > waiting_player_pos[1]:
-                    pos_behind = current_player_pos[0] + chr(
-                        ord(current_player_pos[1]) - 2
-                    )
-                else:
-                    pos_behind = current_player_pos[0] + chr(
-                        ord(current_player_pos[1]) + 2
-                    )
-            if pos_behind in board[waiting_player_pos]:
-                board[current_player_pos].append(pos_behind)
-            else:
-                board[current_player_pos].extend(
-                    pos
-                    for pos in board[waiting_player_pos]
-                    if pos != current_player_pos
-                )
-
-    def bfs(self, board: Dict[str, List[str]], pos: str, goal: str) -> List[str]:
+        if waiting_player_pos not in neighbours:
+            return list(neighbours)
+        neighbours = [pos for pos in neighbours if pos != waiting_player_pos]
+        # the cell behind the waiting player, seen from the current player
+        pos_behind = chr(
+            2 * ord(waiting_player_pos[0]) - ord(current_player_pos[0])
+        ) + chr(2 * ord(waiting_player_pos[1]) - ord(current_player_pos[1]))
+        if pos_behind in board[waiting_player_pos]:
+            neighbours.append(pos_behind)
+        else:
+            neighbours.extend(
+                pos for pos in board[waiting_player_pos] if pos != current_player_pos
+            )
+        return neighbours
+
+    def bfs(
+        self,
+        board: Dict[str, List[str]],
+        pos: str,
+        goal: str,
+        start_neighbours: List[str] = None,
+    ) -> List[str]:
         """
         Breadth-first search to find the shortest path.
 
+        Every cell is visited once; the path is rebuilt from parent pointers.
+
         Parameters
         ----------
         board : Dict[str, List[str]]
@@ -130,45 +126,63 @@ class ShortestPathPolicy:
         pos : str
             The player position.
         goal : str
-            The goal.
+            The goal row.
+        start_neighbours : List[str], optional
+            The cells reachable from the player position, if they differ from the
+            board (see `get_neighbours`).
 
         Returns
         -------
         List[str]
-            The shortest path.
+            The shortest path, starting with the player position, or an empty list if
+            the goal cannot be reached.
         """
-
-        # Initialize the queue
-        queue = [[pos]]
-        # Initialize the visited nodes
-        visited = set()
-        # While the queue is not empty
+        parents = {pos: None}
+        queue = deque([pos])
         while queue:
-            # Get the path
-            path = queue.pop(0)
-            # Get the node
-            node = path[-1]
-            # If the node is not visited
-            if node not in visited:
-                # Get the neighbors
-                neighbors = board[node]
-                # For each neighbor
-                for neighbor in neighbors:
-                    # Get the new path
-                    new_path = list(path)
-                    # Append the neighbor to the new path
-                    new_path.append(neighbor)
-                    # Add the new path to the queue
-                    queue.append(new_path)
-                    # If the neighbor is the goal
-                    if neighbor[1] == goal:
-                        # Return the new path
-                        return new_path
-                # Add the node to the visited nodes
-                visited.add(node)
-        # Return an empty list
+            node = queue.popleft()
+            neighbours = board[node]
+            if node == pos and start_neighbours is not None:
+                neighbours = start_neighbours
+            for neighbour in neighbours:
+                if neighbour in parents:
+                    continue
+                parents[neighbour] = node
+                if neighbour[1] == goal:
+                    path = [neighbour]
+                    while parents[path[-1]] is not None:
+                        path.append(parents[path[-1]])
+                    return path[::-1]
+                queue.append(neighbour)
         return []
 
+    def distance_field(self, board: Dict[str, List[str]], goal: str) -> Dict[str, int]:
+        """
+        Get the distance to the goal row of every cell, ignoring the pawns.
+
+        Parameters
+        ----------
+        board : Dict[str, List[str]]
+            The board.
+        goal : str
+            The goal row.
+
+        Returns
+        -------
+        Dict[str, int]
+            The number of moves to the goal row from every cell that can reach it.
+        """
+        distances = {cell: 0 for cell in board if cell[1] == goal}
+        queue = deque(distances)
+        while queue:
+            node = queue.popleft()
+            distance = distances[node] + 1
+            for neighbour in board[node]:
+                if neighbour not in distances:
+                    distances[neighbour] = distance
+                    queue.append(neighbour)
+        return distances
+
 
 class RandomPolicy:
     """
@@ -0,0 +1,319 @@
+"""
+This module provides a fast rollout engine that plays out games with pawn moves only.
+
+Walls cannot change during a rollout, so the board is loaded once into a flat
+adjacency table of ``cell * 4 + direction`` entries, holding the neighbouring cell or
+-1 when the edge is closed. The engine then only moves two integers around: the move
+generator writes into a preallocated buffer and no list, string or state object is
+created per ply.
+"""
+
+import random
+from typing import List, Optional, Tuple
+from Environment.state import (
+    BOARD_SIZE,
+    DIRECTION_OFFSETS,
+    GOAL_ROWS,
+    NUM_CELLS,
+    NUM_WALL_SLOTS,
+    QuoridorState,
+    WALL_KEEPS,
+    iter_bits,
+)
+from .evaluation import Evaluation
+
+ROLLOUT_POLICIES = ("random", "shortest_path")
+# rollouts that last longer are decided by the distances of the players to their goal
+MAX_ROLLOUT_PLIES = 10000
+UNREACHABLE = NUM_CELLS
+
+
+def _neighbour_table() -> List[int]:
+    """
+    Computes the adjacency table of an empty board.
+
+    Returns
+    -------
+    list of int
+        For every ``cell * 4 + direction``, the neighbouring cell or -1 off the board.
+    """
+    table = []
+    for cell in range(NUM_CELLS):
+        row = cell // BOARD_SIZE
+        for offset in DIRECTION_OFFSETS:
+            target = cell + offset
+            if offset in (-1, 1) and target // BOARD_SIZE != row:
+                target = -1
+            elif not 0 <= target < NUM_CELLS:
+                target = -1
+            table.append(target)
+    return table
+
+
+def _wall_cut_table() -> tuple:
+    """
+    Computes the adjacency table entries closed by every wall.
+
+    Returns
+    -------
+    tuple
+        For every wall index, the four ``cell * 4 + direction`` entries it closes.
+    """
+    table = []
+    for keeps in WALL_KEEPS:
+        entries = []
+        for direction, keep in enumerate(keeps):
+            for cell in iter_bits(((1 << NUM_CELLS) - 1) ^ keep):
+                entries.append(cell * 4 + direction)
+        table.append(tuple(entries))
+    return tuple(table)
+
+
+NEIGHBOURS = _neighbour_table()
+WALL_CUTS = _wall_cut_table()
+
+
+class RolloutEngine:
+    """
+    Plays out games from a position with pawn moves only, until a pawn reaches its
+    goal row.
+
+    The "random" policy picks a legal pawn move uniformly. The "shortest_path" policy
+    takes a move towards the goal (the one with the smallest distance) and, with
+    probability `epsilon`, a random move instead.
+
+    `play` plays out to the end of the game. `value` stops after a number of plies and
+    values the position reached with an `Evaluation`, from the distances the engine
+    computes anyway: walls cannot change, so they are computed once per board.
+    """
+
+    def __init__(
+        self, policy: str = "random", epsilon: float = 0.1, seed: Optional[int] = None
+    ) -> None:
+        """
+        Initializes a new RolloutEngine instance.
+
+        Parameters
+        ----------
+        policy : str, optional
+            The rollout policy, "random" or "shortest_path" (default is "random").
+        epsilon : float, optional
+            The probability of a random move with the "shortest_path" policy.
+        seed : int, optional
+            The seed of the random generator of the engine. Without a seed the engine
+            draws from the global `random` generator, so `random.seed` makes its
+            rollouts reproducible.
+        """
+        if policy not in ROLLOUT_POLICIES:
+            raise ValueError(f"Unknown rollout policy: {policy}")
+        self.policy = policy
+        self.epsilon = epsilon
+        self._random = random.random if seed is None else random.Random(seed).random
+        self._adjacent: List[int] = NEIGHBOURS[:]
+        self._distances: List[List[int]] = [[0] * NUM_CELLS, [0] * NUM_CELLS]
+        self._queue: List[int] = [0] * NUM_CELLS
+        self._moves: List[int] = [0] * 8
+        # the walls of the loaded board and whether the distances are up to date
+        self._walls = (0, 0)
+        self._has_distances = False
+
+    def play(self, state: QuoridorState) -> int:
+        """
+        Plays out the game from the given state, which is not modified.
+
+        Parameters
+        ----------
+        state : QuoridorState
+            The start position.
+
+        Returns
+        -------
+        int
+            The index of the winner (0 for player 1, 1 for player 2).
+        """
+        if state.is_terminated:
+            return state.current
+        winner, player, cells = self._play_out(state, MAX_ROLLOUT_PLIES)
+        if winner >= 0:
+            return winner
+        self._compute_distances()
+        distances = self._distances
+        if distances[player][cells[player]] <= distances[1 - player][cells[1 - player]]:
+            return player
+        return 1 - player
+
+    def value(
+        self, state: QuoridorState, max_plies: int, evaluation: Evaluation
+    ) -> float:
+        """
+        Plays out the game from the given state for at most `max_plies` plies, and
+        values the position reached if the game did not end.
+
+        Parameters
+        ----------
+        state : QuoridorState
+            The start position, not modified.
+        max_plies : int
+            The number of plies after which the rollout is cut, 0 values the start
+            position.
+        evaluation : Evaluation
+            The evaluation of the position reached.
+
+        Returns
+        -------
+        float
+            The value for the player to move in the start position, between -1 and 1:
+            1 or -1 if the game ended. A finished start position is won by the
+            player to move.
+        """
+        if state.is_terminated:
+            return 1.0
+        winner, player, cells = self._play_out(state, max_plies)
+        if winner >= 0:
+            return 1.0 if winner == state.current else -1.0
+        self._compute_distances()
+        distances = self._distances
+        walls_left = state.walls_left
+        value = evaluation.value_of(
+            distances[player][cells[player]],
+            distances[1 - player][cells[1 - player]],
+            walls_left[player],
+            walls_left[1 - player],
+        )
+        return value if player == state.current else -value
+
+    def _play_out(
+        self, state: QuoridorState, max_plies: int
+    ) -> Tuple[int, int, List[int]]:
+        """
+        Plays pawn moves from the given state until a pawn reaches its goal row or
+        `max_plies` plies are played.
+
+        Parameters
+        ----------
+        state : QuoridorState
+            The start position, not finished.
+        max_plies : int
+            The maximum number of plies.
+
+        Returns
+        -------
+        (int, int, list of int)
+            The index of the winner, -1 if the game did not end, the index of the
+            player to move and the cells of the pawns.
+        """
+        self._load(state)
+        shortest_path = self.policy == "shortest_path"
+        if shortest_path:
+            self._compute_distances()
+        rand = self._random
+        epsilon = self.epsilon
+        moves = self._moves
+        distances = self._distances
+        pawns = state.pawns
+        cells = [pawns[0], pawns[1]]
+        player = state.current
+        for _ in range(max_plies):
+            count = self._pawn_moves(cells[player], cells[1 - player])
+            if shortest_path and rand() >= epsilon:
+                player_distances = distances[player]
+                target = moves[0]
+                for i in range(1, count):
+                    if player_distances[moves[i]] < player_distances[target]:
+                        target = moves[i]
+            else:
+                target = moves[int(rand() * count)]
+            cells[player] = target
+            if target // BOARD_SIZE == GOAL_ROWS[player]:
+                return player, player, cells
+            player ^= 1
+        return -1, player, cells
+
+    def _load(self, state: QuoridorState) -> None:
+        """
+        Loads the walls of the given state into the adjacency table.
+
+        Parameters
+        ----------
+        state : QuoridorState
+            The state.
+        """
+        walls = (state.horizontal_walls, state.vertical_walls)
+        if walls == self._walls:
+            return
+        adjacent = self._adjacent
+        adjacent[:] = NEIGHBOURS
+        for wall in iter_bits(walls[0] | walls[1] << NUM_WALL_SLOTS):
+            for entry in WALL_CUTS[wall]:
+                adjacent[entry] = -1
+        self._walls = walls
+        self._has_distances = False
+
+    def _compute_distances(self) -> None:
+        """
+        Computes the distance of every cell to the goal row of both players, ignoring
+        the pawns, with a breadth first search over the adjacency table.
+        """
+        if self._has_distances:
+            return
+        adjacent = self._adjacent
+        queue = self._queue
+        for player, distances in enumerate(self._distances):
+            distances[:] = [UNREACHABLE] * NUM_CELLS
+            head = tail = 0
+            first = GOAL_ROWS[player] * BOARD_SIZE
+            for cell in range(first, first + BOARD_SIZE):
+                distances[cell] = 0
+                queue[tail] = cell
+                tail += 1
+            while head < tail:
+                cell = queue[head]
+                head += 1
+                distance = distances[cell] + 1
+                for entry in range(cell * 4, cell * 4 + 4):
+                    neighbour = adjacent[entry]
+                    if neighbour >= 0 and distances[neighbour] == UNREACHABLE:
+                        distances[neighbour] = distance
+                        queue[tail] = neighbour
+                        tail += 1
+        self._has_distances = True
+
+    def _pawn_moves(self, cell: int, opponent: int) -> int:
+        """
+        Writes the legal pawn moves, including jumps, into the move buffer.
+
+        Parameters
+        ----------
+        cell : int
+            The cell of the pawn to move.
+        opponent : int
+            The cell of the other pawn.
+
+        Returns
+        -------
+        int
+            The number of moves written.
+        """
+        adjacent = self._adjacent
+        moves = self._moves
+        count = 0
+        for direction in range(4):
+            target = adjacent[cell * 4 + direction]
+            if target < 0:
+                continue
+            if target != opponent:
+                moves[count] = target
+                count += 1
+                continue
+            jump = adjacent[opponent * 4 + direction]
+            if jump >= 0:
+                moves[count] = jump
+                count += 1
+                continue
+            # the straight jump is blocked, jump diagonally
+            for side in range(opponent * 4, opponent * 4 + 4):
+                jump = adjacent[side]
+                if jump >= 0 and jump != cell:
+                    moves[count] = jump
+                    count += 1
+        return count
@@ -0,0 +1,37 @@
+# pylint: skip-file
+import math
+import numpy as np
+import pytest
+from Environment.state import QuoridorState
+from Environment.utils import state_to_observation
+from .evaluation import SCALE, TEMPO, WALL_WEIGHT, Evaluation
+
+
+def test_value():
+    evaluation = Evaluation()
+    # an even race, the player to move has the tempo
+    assert evaluation.value(QuoridorState()) == pytest.approx(math.tanh(TEMPO / SCALE))
+    # player 1 is 2 moves closer and player 2 placed a wall, player 2 to move
+    state = QuoridorState.init_from_pgn("e2/a1h/e3/e8/e4")
+    score = 5 - 7 + TEMPO - WALL_WEIGHT
+    assert evaluation.score(7, 5, 9, 10) == pytest.approx(score)
+    assert evaluation.value(state) == pytest.approx(math.tanh(score / SCALE))
+    assert -1 < evaluation.value(state) < 0
+
+    finished = QuoridorState.init_from_pgn(
+        "e2/d9/e3/c9/e4/b9/e5/a9/e6/a8/e7/a7/e8/a6/e9"
+    )
+    assert evaluation.value(finished) == 1
+
+
+def test_evaluator():
+    evaluation = Evaluation(wall_weight=1, tempo=0, scale=1)
+    states = [QuoridorState(), QuoridorState.init_from_pgn("e2/a1h/e3/e8/e4")]
+    observations = np.stack([state_to_observation(state) for state in states])
+    masks = np.stack([state.legal_action_mask() for state in states])
+    players = np.array([state.player for state in states])
+
+    priors, values = evaluation(observations, masks, players)
+    assert np.array_equal(priors, masks)
+    assert values == pytest.approx([evaluation.value(state) for state in states])
+    assert values[1] == pytest.approx(math.tanh(-3))
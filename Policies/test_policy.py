@@ -24,3 +24,42 @@ def test_get_shortest_path():
         quoridor.current_player.goal,
     )
     assert shorest_path[1:] == ["e6", "e7", "e8", "e9"]
+
+
+def test_get_shortest_path_does_not_mutate_board():
+    quoridor = Quoridor()
+    quoridor.current_player.pos = "e4"
+    quoridor.waiting_player.pos = "e5"
+    board = {cell: list(neighbours) for cell, neighbours in quoridor.board.items()}
+    policy = ShortestPathPolicy()
+    policy.get_shortest_path(quoridor.board, "e4", "e5", "9")
+    assert quoridor.board == board
+
+
+def test_get_neighbours():
+    policy = ShortestPathPolicy()
+    quoridor = Quoridor.init_from_pgn("e2/e8/e3/e7/e4/e6/e6h")
+    # the straight jump over e6 is blocked by e6h, so the jumps go diagonally
+    assert sorted(policy.get_neighbours(quoridor.board, "e5", "e6")) == [
+        "d5",
+        "d6",
+        "e4",
+        "f5",
+        "f6",
+    ]
+
+
+def test_distance_field():
+    policy = ShortestPathPolicy()
+    quoridor = Quoridor()
+    distances = policy.distance_field(quoridor.board, "9")
+    assert len(distances) == 81
+    assert distances["e1"] == 8 and distances["a9"] == 0
+
+    quoridor = Quoridor.init_from_pgn("b8h/a1h/d8h/h1h/f8h")
+    distances = policy.distance_field(quoridor.board, "9")
+    # only a8, h8 and i8 still lead to row 9
+    assert distances["h8"] == 1
+    assert distances["c8"] == 3
+    assert distances["e8"] == 4
+    assert distances["e1"] == 11
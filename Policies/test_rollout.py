@@ -0,0 +1,68 @@
+# pylint: skip-file
+import random
+import pytest
+from Environment.state import QuoridorState
+from .evaluation import Evaluation
+from .rollout import RolloutEngine
+
+
+def test_pawn_moves_match_state():
+    rng = random.Random(0)
+    engine = RolloutEngine()
+    for _ in range(50):
+        state = QuoridorState()
+        while not state.is_terminated:
+            engine._load(state)
+            count = engine._pawn_moves(
+                state.pawns[state.current], state.pawns[1 - state.current]
+            )
+            assert sorted(engine._moves[:count]) == sorted(state.legal_pawn_actions())
+            state.make_action(rng.choice(state.legal_actions()))
+
+
+def test_play():
+    state = QuoridorState.init_from_pgn("e2/e8/a1h/a8h")
+    engine = RolloutEngine(seed=0)
+    winners = [engine.play(state) for _ in range(100)]
+    assert set(winners) == {0, 1}
+    assert state.get_pgn() == "e2/e8/a1h/a8h"
+
+    finished = QuoridorState.init_from_pgn(
+        "e2/d9/e3/c9/e4/b9/e5/a9/e6/a8/e7/a7/e8/a6/e9"
+    )
+    assert engine.play(finished) == 0
+
+
+def test_shortest_path_policy():
+    engine = RolloutEngine("shortest_path", epsilon=0)
+    # player 2 jumps over player 1 in the middle of the board and arrives first
+    assert engine.play(QuoridorState()) == 1
+    assert engine._distances[0][4] == 8
+    # walls behind the pawns do not change the distances
+    state = QuoridorState.init_from_pgn("e2/e8/a1h/h8h")
+    assert engine.play(state) == 1
+    assert engine._distances[1][state.pawns[1]] == 7
+
+
+def test_value():
+    evaluation = Evaluation()
+    engine = RolloutEngine(seed=0)
+    # without plies the start position is valued
+    for pgn in ("e2/e8/a1h/a8h", "e2/a1h/e3/e8/e4"):
+        state = QuoridorState.init_from_pgn(pgn)
+        assert engine.value(state, 0, evaluation) == pytest.approx(
+            evaluation.value(state)
+        )
+        values = [engine.value(state, 6, evaluation) for _ in range(20)]
+        assert all(-1 < value < 1 for value in values)
+        assert len(set(values)) > 1
+        assert state.get_pgn() == pgn
+
+    # player 1 reaches the goal row in a ply
+    state = QuoridorState.init_from_pgn("e2/d9/e3/c9/e4/b9/e5/a9/e6/a8/e7/a7/e8/a6")
+    engine = RolloutEngine("shortest_path", epsilon=0)
+    assert engine.value(state, 1, evaluation) == 1
+    finished = QuoridorState.init_from_pgn(
+        "e2/d9/e3/c9/e4/b9/e5/a9/e6/a8/e7/a7/e8/a6/e9"
+    )
+    assert engine.value(finished, 10, evaluation) == 1
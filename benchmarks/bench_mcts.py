@@ -0,0 +1,88 @@
+"""
+Benchmark of the MCTS agent: search iterations per second early and late in a game.
+
+A node holds a snapshot of the position without its move history, so the number of
+iterations per second should not drop as the game gets longer.
+
+Usage: python -m benchmarks.bench_mcts [--iterations N] [--seed S]
+"""
+
+import argparse
+import random
+import time
+from Agents.mcts_agent import MCTSAgent
+from Environment.state import QuoridorState
+
+PLIES = (5, 60)
+
+
+def random_position(plies: int, seed: int) -> QuoridorState:
+    """
+    Plays random moves, mostly pawn moves, until the given ply.
+
+    Parameters
+    ----------
+    plies : int
+        The number of moves to play.
+    seed : int
+        The seed of the random moves.
+
+    Returns
+    -------
+    QuoridorState
+        A position at the given ply that is not finished and where the player to move
+        still has walls.
+    """
+    rng = random.Random(seed)
+    while True:
+        state = QuoridorState()
+        while len(state.moves) < plies and not state.is_terminated:
+            if rng.random() < 0.3:
+                action = rng.choice(state.legal_actions())
+            else:
+                action = rng.choice(state.legal_pawn_actions())
+            state.make_action(action)
+        if not state.is_terminated and state.walls_left[state.current] > 0:
+            return state
+
+
+def iterations_per_second(state: QuoridorState, iterations: int) -> float:
+    """
+    Runs MCTS iterations from the given position.
+
+    Parameters
+    ----------
+    state : QuoridorState
+        The root position.
+    iterations : int
+        The number of iterations.
+
+    Returns
+    -------
+    float
+        The number of iterations per second.
+    """
+    agent = MCTSAgent(player=state.player, max_iterations=iterations)
+    root = agent.Node(state, entry=agent._get_entry(state.key))
+    start = time.perf_counter()
+    for _ in range(iterations):
+        node = agent._tree_traversal(root)
+        agent._backpropagate(node, agent._rollout(node))
+    return iterations / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for plies in PLIES:
+        random.seed(args.seed)
+        state = random_position(plies, args.seed)
+        rate = iterations_per_second(state, args.iterations)
+        print(f"ply {plies:3d}: {rate:8.1f} iterations/s")
+
+
+if __name__ == "__main__":
+    main()
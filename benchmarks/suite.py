@@ -0,0 +1,325 @@
+"""
+Throughput benchmark suite of the environment, the policies and the agents.
+
+Every benchmark measures a rate (steps, conversions, searches, iterations or games per
+second) and reports the best of a few repeats, which is the least sensitive to noise
+from the rest of the machine. The results can be written to a JSON file and compared
+against a stored baseline; a benchmark that got slower than the baseline by more than
+the tolerance counts as a regression and makes the run exit with status 1.
+
+Usage: python -m benchmarks.suite [--only NAME ...] [--repeat R] [--scale F]
+       [--seed S] [--output FILE] [--baseline FILE] [--tolerance T]
+"""
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+from Agents import RandomAgent, RandomShortestPathAgent
+from Environment import QuoridorEnv
+from Environment.utils import (
+    NUM_ACTIONS,
+    convert_discrete_to_quoridor_move,
+    convert_discrete_to_quoridor_moves,
+    convert_observation_quoridor_game,
+    convert_quoridor_move_to_discrete,
+    convert_quoridor_moves_to_discrete,
+    state_to_observation,
+)
+from Policies.policy import ShortestPathPolicy
+from benchmarks.bench_mcts import iterations_per_second, random_position
+from tournament import Tournament
+
+BASELINE = "benchmarks/baseline.json"
+# the fraction a rate may drop below the baseline before it counts as a regression
+TOLERANCE = 0.2
+
+
+def bench_env_step_observe(number: int, seed: int) -> float:
+    """
+    Plays random legal moves in a `QuoridorEnv`, observing the position after every
+    step like an agent does. Finished games are reset.
+
+    Parameters
+    ----------
+    number : int
+        The number of steps.
+    seed : int
+        The seed of the random moves.
+
+    Returns
+    -------
+    float
+        The number of steps per second.
+    """
+    rng = random.Random(seed)
+    quoridor_env = QuoridorEnv()
+    quoridor_env.reset()
+    start = time.perf_counter()
+    observation = quoridor_env.observe(quoridor_env.agent_selection)
+    for _ in range(number):
+        action = rng.choice(np.flatnonzero(observation["action_mask"]))
+        quoridor_env.step(action)
+        if quoridor_env.terminations[quoridor_env.agent_selection]:
+            quoridor_env.reset()
+        observation = quoridor_env.observe(quoridor_env.agent_selection)
+    return number / (time.perf_counter() - start)
+
+
+def bench_conversions(number: int, seed: int) -> float:
+    """
+    Converts every discrete action to its move and back, one at a time.
+
+    Parameters
+    ----------
+    number : int
+        The number of round trips over all actions.
+    seed : int
+        Unused, the conversions are deterministic.
+
+    Returns
+    -------
+    float
+        The number of conversions per second.
+    """
+    start = time.perf_counter()
+    for _ in range(number):
+        for action in range(NUM_ACTIONS):
+            convert_quoridor_move_to_discrete(convert_discrete_to_quoridor_move(action))
+    return 2 * number * NUM_ACTIONS / (time.perf_counter() - start)
+
+
+def bench_vectorized_conversions(number: int, seed: int) -> float:
+    """
+    Converts batches of random discrete actions to moves and back.
+
+    Parameters
+    ----------
+    number : int
+        The number of batches of 4096 actions.
+    seed : int
+        The seed of the actions.
+
+    Returns
+    -------
+    float
+        The number of conversions per second.
+    """
+    actions = np.random.default_rng(seed).integers(NUM_ACTIONS, size=4096)
+    start = time.perf_counter()
+    for _ in range(number):
+        convert_quoridor_moves_to_discrete(convert_discrete_to_quoridor_moves(actions))
+    return 2 * number * actions.size / (time.perf_counter() - start)
+
+
+def bench_bfs(number: int, seed: int) -> float:
+    """
+    Searches the shortest path to the goal with `ShortestPathPolicy.bfs` in positions
+    with walls on the board.
+
+    Parameters
+    ----------
+    number : int
+        The number of searches.
+    seed : int
+        The seed of the positions.
+
+    Returns
+    -------
+    float
+        The number of searches per second.
+    """
+    policy = ShortestPathPolicy()
+    games = []
+    for plies in (5, 30, 60):
+        state = random_position(plies, seed)
+        games.append(
+            convert_observation_quoridor_game(state_to_observation(state), state.player)
+        )
+    start = time.perf_counter()
+    for i in range(number):
+        game = games[i % len(games)]
+        policy.bfs(game.board, game.current_player.pos, game.current_player.goal)
+    return number / (time.perf_counter() - start)
+
+
+def bench_mcts(number: int, seed: int) -> float:
+    """
+    Runs MCTS iterations from a fixed position in the middle of a game, see
+    `benchmarks.bench_mcts`.
+
+    Parameters
+    ----------
+    number : int
+        The number of iterations.
+    seed : int
+        The seed of the position and of the rollouts.
+
+    Returns
+    -------
+    float
+        The number of iterations per second.
+    """
+    state = random_position(30, seed)
+    random.seed(seed)
+    return iterations_per_second(state, number)
+
+
+def bench_tournament(number: int, seed: int) -> float:
+    """
+    Plays full games between the random agents with `Tournament.play`.
+
+    Parameters
+    ----------
+    number : int
+        The number of games.
+    seed : int
+        The seed of the agents.
+
+    Returns
+    -------
+    float
+        The number of games per second.
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+    tournament = Tournament([RandomShortestPathAgent, RandomAgent])
+    start = time.perf_counter()
+    for i in range(number):
+        if i % 2:
+            tournament.play(RandomAgent, RandomShortestPathAgent)
+        else:
+            tournament.play(RandomShortestPathAgent, RandomAgent)
+    return number / (time.perf_counter() - start)
+
+
+# name -> (benchmark, default number of operations, unit of the rate)
+BENCHMARKS: Dict[str, Tuple[Callable[[int, int], float], int, str]] = {
+    "env_step_observe": (bench_env_step_observe, 2000, "steps/s"),
+    "conversions": (bench_conversions, 2000, "conversions/s"),
+    "vectorized_conversions": (bench_vectorized_conversions, 500, "conversions/s"),
+    "bfs": (bench_bfs, 2000, "searches/s"),
+    "mcts": (bench_mcts, 1000, "iterations/s"),
+    "tournament": (bench_tournament, 10, "games/s"),
+}
+
+
+def run_benchmarks(
+    names: Optional[List[str]] = None,
+    repeat: int = 3,
+    scale: float = 1.0,
+    seed: int = 0,
+) -> Dict[str, dict]:
+    """
+    Runs benchmarks of the suite.
+
+    Parameters
+    ----------
+    names : List[str], optional
+        The benchmarks to run (default is all of them).
+    repeat : int, optional
+        The number of runs of every benchmark, the best rate is kept.
+    scale : float, optional
+        The factor applied to the default number of operations of every benchmark.
+    seed : int, optional
+        The seed of the benchmarks.
+
+    Returns
+    -------
+    Dict[str, dict]
+        For every benchmark, its best "rate", the "unit" of the rate and the "number"
+        of operations per run.
+    """
+    results = {}
+    for name in names or BENCHMARKS:
+        if name not in BENCHMARKS:
+            raise ValueError(f"Unknown benchmark: {name}")
+        benchmark, number, unit = BENCHMARKS[name]
+        number = max(1, int(number * scale))
+        rate = max(benchmark(number, seed) for _ in range(repeat))
+        results[name] = {"rate": rate, "unit": unit, "number": number}
+    return results
+
+
+def compare(
+    results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float = TOLERANCE
+) -> Dict[str, float]:
+    """
+    Compares results with a baseline.
+
+    Parameters
+    ----------
+    results : Dict[str, dict]
+        The results, see `run_benchmarks`.
+    baseline : Dict[str, dict]
+        The baseline results. Benchmarks missing from either side are skipped.
+    tolerance : float, optional
+        The fraction a rate may drop below the baseline rate.
+
+    Returns
+    -------
+    Dict[str, float]
+        The regressions: the ratio of the rate to the baseline rate of every benchmark
+        that is slower than the tolerance allows.
+    """
+    regressions = {}
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio = result["rate"] / baseline[name]["rate"]
+        if ratio < 1 - tolerance:
+            regressions[name] = ratio
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument(
+        "--baseline",
+        nargs="?",
+        const=BASELINE,
+        help=f"compare with the results in this JSON file (default {BASELINE})",
+    )
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.only, args.repeat, args.scale, args.seed)
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)["results"]
+
+    for name, result in results.items():
+        line = f"{name:24s}{result['rate']:14.1f} {result['unit']}"
+        if name in baseline:
+            line += f"  ({result['rate'] / baseline[name]['rate']:.2f}x baseline)"
+        print(line)
+
+    if args.output:
+        report = {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "seed": args.seed,
+            "results": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+
+    regressions = compare(results, baseline, args.tolerance)
+    for name, ratio in regressions.items():
+        print(f"regression: {name} runs at {ratio:.2f}x the baseline rate")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
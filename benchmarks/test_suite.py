@@ -0,0 +1,25 @@
+# pylint: skip-file
+import pytest
+from .suite import BENCHMARKS, compare, run_benchmarks
+
+
+def test_run_benchmarks():
+    results = run_benchmarks(["conversions", "bfs"], repeat=1, scale=0.01)
+    assert list(results) == ["conversions", "bfs"]
+    for name, result in results.items():
+        assert result["rate"] > 0
+        assert result["unit"] == BENCHMARKS[name][2]
+    with pytest.raises(ValueError):
+        run_benchmarks(["unknown"])
+
+
+def test_compare():
+    baseline = {"bfs": {"rate": 100.0}, "mcts": {"rate": 100.0}}
+    results = {
+        "bfs": {"rate": 70.0},
+        "mcts": {"rate": 90.0},
+        "tournament": {"rate": 1.0},
+    }
+    assert compare(results, baseline) == {"bfs": 0.7}
+    assert compare(results, baseline, tolerance=0.05) == {"bfs": 0.7, "mcts": 0.9}
+    assert compare(results, {}) == {}
@@ -0,0 +1,211 @@
+"""Module to rate agents from the results of their games."""
+
+import math
+from statistics import NormalDist
+from typing import Optional, Tuple
+import numpy as np
+
+# the Elo difference of a player that is expected to score 10 times as much
+ELO_SCALE = 400
+
+
+def expected_score(elo: float) -> float:
+    """
+    Compute the expected score of a player with the given Elo advantage.
+
+    Parameters
+    ----------
+    elo : float
+        The Elo difference between the player and its opponent.
+
+    Returns
+    -------
+    float
+        The probability that the player wins.
+    """
+    return 1 / (1 + 10 ** (-elo / ELO_SCALE))
+
+
+def elo_ratings(
+    wins: np.ndarray,
+    confidence: float = 0.95,
+    prior: float = 1.0,
+    max_iterations: int = 1000,
+    tolerance: float = 1e-9,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Compute the Elo ratings of players with the maximum likelihood estimate of the
+    Bradley-Terry model, together with confidence intervals.
+
+    The ratings have a mean of 0. The intervals come from the curvature of the
+    likelihood at its maximum (normal approximation). A player without games gets a
+    rating of 0 and an infinite interval, and is left out of the estimate.
+
+    Parameters
+    ----------
+    wins : np.ndarray
+        The (N, N) number of wins, where ``wins[i, j]`` is how often player ``i`` beat
+        player ``j``.
+    confidence : float, optional
+        The confidence level of the intervals (default is 0.95).
+    prior : float, optional
+        The number of virtual games, split evenly between wins and losses, added to
+        every pair of players that played each other. It keeps the rating of a player
+        that won or lost all of its games finite.
+    max_iterations : int, optional
+        The maximum number of iterations of the estimate.
+    tolerance : float, optional
+        The largest change of the log strengths at which the estimate stops.
+
+    Returns
+    -------
+    (np.ndarray, np.ndarray, np.ndarray)
+        The (N,) ratings and the lower and upper bounds of their intervals.
+    """
+    wins = np.asarray(wins, dtype=float)
+    played = (wins + wins.T).sum(axis=1) > 0
+    ratings = np.zeros(len(wins))
+    lower = np.full(len(wins), -math.inf)
+    upper = np.full(len(wins), math.inf)
+    if played.any():
+        fitted = _fit_elo_ratings(
+            wins[np.ix_(played, played)],
+            confidence,
+            prior,
+            max_iterations,
+            tolerance,
+        )
+        ratings[played], lower[played], upper[played] = fitted
+    return ratings, lower, upper
+
+
+def _fit_elo_ratings(
+    wins: np.ndarray,
+    confidence: float,
+    prior: float,
+    max_iterations: int,
+    tolerance: float,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Fit the ratings of `elo_ratings` for players that all played a game.
+    """
+    games = wins + wins.T
+    wins = wins + np.where(games > 0, prior / 2, 0.0)
+    games = wins + wins.T
+    total_wins = wins.sum(axis=1)
+
+    # minorization-maximization updates of the strengths (Hunter, 2004)
+    strengths = np.ones(len(wins))
+    for _ in range(max_iterations):
+        pair_strengths = strengths[:, None] + strengths[None, :]
+        updated = total_wins / (games / pair_strengths).sum(axis=1)
+        updated /= math.exp(np.log(updated).mean())
+        change = np.abs(np.log(updated) - np.log(strengths)).max()
+        strengths = updated
+        if change < tolerance:
+            break
+    log_strengths = np.log(strengths)
+
+    # the Fisher information of the log strengths, its pseudo-inverse is the
+    # covariance under the constraint of a zero mean
+    probabilities = strengths[:, None] / (strengths[:, None] + strengths[None, :])
+    information = -games * probabilities * probabilities.T
+    np.fill_diagonal(information, 0)
+    np.fill_diagonal(information, -information.sum(axis=1))
+    variances = np.diag(np.linalg.pinv(information))
+
+    to_elo = ELO_SCALE / math.log(10)
+    ratings = to_elo * log_strengths
+    margins = (
+        NormalDist().inv_cdf((1 + confidence) / 2)
+        * to_elo
+        * np.sqrt(np.maximum(variances, 0))
+    )
+    return ratings, ratings - margins, ratings + margins
+
+
+class SPRT:
+    """
+    Sequential probability ratio test between two players.
+
+    The test weighs the hypothesis H0 that the first player is `elo0` Elo stronger
+    than the second one against the hypothesis H1 that it is `elo1` Elo stronger, and
+    stops as soon as the games played decide one of them with error rates `alpha`
+    (accepting H1 when H0 holds) and `beta` (accepting H0 when H1 holds). With the
+    default symmetric hypotheses a decision tells which of the two players is the
+    stronger one.
+    """
+
+    def __init__(
+        self,
+        elo0: float = -30.0,
+        elo1: float = 30.0,
+        alpha: float = 0.05,
+        beta: float = 0.05,
+    ):
+        """
+        Initialize a SPRT instance.
+
+        Parameters
+        ----------
+        elo0 : float, optional
+            The Elo difference of hypothesis H0 (default is -30).
+        elo1 : float, optional
+            The Elo difference of hypothesis H1 (default is 30).
+        alpha : float, optional
+            The probability of accepting H1 when H0 holds (default is 0.05).
+        beta : float, optional
+            The probability of accepting H0 when H1 holds (default is 0.05).
+        """
+        if elo0 >= elo1:
+            raise ValueError("elo0 must be smaller than elo1")
+        self.elo0 = elo0
+        self.elo1 = elo1
+        self.lower = math.log(beta / (1 - alpha))
+        self.upper = math.log((1 - beta) / alpha)
+        p0 = expected_score(elo0)
+        p1 = expected_score(elo1)
+        self._win = math.log(p1 / p0)
+        self._loss = math.log((1 - p1) / (1 - p0))
+
+    def llr(self, wins: int, losses: int) -> float:
+        """
+        Compute the log-likelihood ratio of H1 over H0.
+
+        Parameters
+        ----------
+        wins : int
+            The number of wins of the first player.
+        losses : int
+            The number of losses of the first player.
+
+        Returns
+        -------
+        float
+            The log-likelihood ratio.
+        """
+        return wins * self._win + losses * self._loss
+
+    def decide(self, wins: int, losses: int) -> Optional[bool]:
+        """
+        Decide the test.
+
+        Parameters
+        ----------
+        wins : int
+            The number of wins of the first player.
+        losses : int
+            The number of losses of the first player.
+
+        Returns
+        -------
+        bool or None
+            True if H1 is accepted, False if H0 is accepted and None if more games are
+            needed.
+        """
+        llr = self.llr(wins, losses)
+        if llr >= self.upper:
+            return True
+        if llr <= self.lower:
+            return False
+        return None
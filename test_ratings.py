@@ -0,0 +1,55 @@
+# pylint: skip-file
+import numpy as np
+import pytest
+from ratings import SPRT, elo_ratings, expected_score
+
+
+def test_expected_score():
+    assert expected_score(0) == 0.5
+    assert expected_score(400) == pytest.approx(10 / 11)
+    assert expected_score(-100) == pytest.approx(1 - expected_score(100))
+
+
+def test_elo_ratings():
+    # player 0 scores 75% against player 1, which is about 191 Elo
+    ratings, lower, upper = elo_ratings(np.array([[0, 300], [100, 0]]), prior=0)
+    assert ratings.sum() == pytest.approx(0)
+    assert ratings[0] - ratings[1] == pytest.approx(400 * np.log10(3))
+    assert np.all(lower < ratings) and np.all(ratings < upper)
+
+    # more games give narrower intervals
+    _, lower_few, upper_few = elo_ratings(np.array([[0, 3], [1, 0]]), prior=0)
+    assert np.all(upper_few - lower_few > upper - lower)
+
+    wins = np.array([[0, 30, 40], [10, 0, 25], [5, 15, 0]])
+    ratings, lower, upper = elo_ratings(wins)
+    assert list(np.argsort(-ratings)) == [0, 1, 2]
+
+    # a player that won all of its games still gets a finite rating
+    ratings, lower, upper = elo_ratings(np.array([[0, 10], [0, 0]]))
+    assert np.all(np.isfinite(ratings)) and np.all(np.isfinite(upper))
+
+
+def test_elo_ratings_without_games():
+    wins = np.array([[0, 10, 0], [5, 0, 0], [0, 0, 0]])
+    ratings, lower, upper = elo_ratings(wins)
+    expected = elo_ratings(wins[:2, :2])
+    assert np.allclose(ratings[:2], expected[0])
+    assert np.allclose(lower[:2], expected[1])
+    assert np.allclose(upper[:2], expected[2])
+    assert ratings[2] == 0
+    assert lower[2] == -np.inf and upper[2] == np.inf
+
+    ratings, lower, upper = elo_ratings(np.zeros((2, 2)))
+    assert np.all(ratings == 0)
+    assert np.all(lower == -np.inf) and np.all(upper == np.inf)
+
+
+def test_sprt():
+    sprt = SPRT(elo0=-30, elo1=30, alpha=0.05, beta=0.05)
+    assert sprt.llr(10, 10) == pytest.approx(0)
+    assert sprt.decide(10, 10) is None
+    assert sprt.decide(100, 20) is True
+    assert sprt.decide(20, 100) is False
+    with pytest.raises(ValueError):
+        SPRT(elo0=30, elo1=0)
@@ -0,0 +1,155 @@
+# pylint: skip-file
+import json
+import pytest
+from Agents import RandomAgent, RandomShortestPathAgent, ShortestPathAgent
+from Agents.mcts_agent import MCTSAgent
+from ratings import SPRT
+from tournament import Tournament, play_game
+
+AGENTS = [RandomAgent, RandomShortestPathAgent]
+
+
+class SmallMCTSAgent(MCTSAgent):
+    def __init__(self, action_space=None, player=None):
+        super().__init__(action_space, player, max_iterations=20)
+
+
+def test_play_game():
+    games = [play_game(SmallMCTSAgent, RandomAgent, seed=5) for _ in range(2)]
+    assert games[0] == games[1]
+    winner, moves = games[0]
+    # the winner made the last move, player 1 makes the odd moves
+    assert winner == 2 - moves % 2
+
+
+def test_run():
+    tournament = Tournament(AGENTS, games_per_pairing=2, seed=1)
+    tournament.run()
+    assert [record["game"] for record in tournament.results] == [0, 1, 2, 3]
+    assert sum(wins for _, wins in tournament.get_ranking()) == 4
+
+    # the results do not depend on the number of workers
+    parallel = Tournament(AGENTS, games_per_pairing=2, num_workers=2, seed=1)
+    parallel.run()
+    assert sorted(parallel.results, key=lambda record: record["game"]) == (
+        tournament.results
+    )
+    assert parallel.get_ranking() == tournament.get_ranking()
+
+
+def test_resume(tmp_path):
+    checkpoint = tmp_path / "checkpoint.jsonl"
+    complete = Tournament(AGENTS, games_per_pairing=2, seed=1, checkpoint=checkpoint)
+    complete.run()
+    lines = checkpoint.read_text().splitlines()
+    assert [json.loads(line) for line in lines] == complete.results
+
+    # an interrupted run: two games finished and a third one being written
+    checkpoint.write_text(lines[0] + "\n" + lines[1] + "\n" + lines[2][:10])
+    resumed = Tournament(AGENTS, games_per_pairing=2, seed=1, checkpoint=checkpoint)
+    resumed.run()
+    assert resumed.results == complete.results
+    assert resumed.get_ranking() == complete.get_ranking()
+    assert checkpoint.read_text().splitlines() == lines
+
+    # running it again plays no game
+    again = Tournament(AGENTS, games_per_pairing=2, seed=1, checkpoint=checkpoint)
+    again.run()
+    assert again.results == complete.results
+    assert checkpoint.read_text().splitlines() == lines
+
+    other = Tournament(AGENTS, games_per_pairing=2, seed=2, checkpoint=checkpoint)
+    with pytest.raises(ValueError):
+        other.run()
+
+
+def test_sprt():
+    tournament = Tournament(
+        [RandomAgent, ShortestPathAgent], games_per_pairing=50, sprt=SPRT()
+    )
+    tournament.run()
+    # the shortest path agent wins every game, the test stops long before 100 games
+    assert tournament.is_decided(RandomAgent, ShortestPathAgent)
+    assert len(tournament.results) < 30
+    assert tournament.get_wins().tolist() == [[0, 0], [len(tournament.results), 0]]
+    ratings = tournament.get_ratings()
+    assert [rating[0] for rating in ratings] == [ShortestPathAgent, RandomAgent]
+    assert ratings[0][2] > ratings[1][3]
+
+
+class OtherRandomAgent(RandomAgent):
+    pass
+
+
+def test_sprt_reallocation(tmp_path):
+    agents = [RandomAgent, OtherRandomAgent, ShortestPathAgent]
+    checkpoint = tmp_path / "checkpoint.jsonl"
+    tournament = Tournament(
+        agents,
+        games_per_pairing=6,
+        seed=2,
+        checkpoint=checkpoint,
+        sprt=SPRT(elo0=-100, elo1=100),
+    )
+    # agents without games are rated 0 with an infinite interval
+    for _, rating, lower, upper in tournament.get_ratings():
+        assert (rating, lower, upper) == (0, -float("inf"), float("inf"))
+    tournament.run()
+    wins = tournament.get_wins()
+    # the shortest path agent wins its pairings in 6 games each, the 24 games they
+    # saved go to the close pairing of the random agents, which stays undecided
+    assert wins[2].tolist() == [6, 6, 0]
+    assert wins[0, 1] + wins[1, 0] == 24
+    assert not tournament.is_decided(RandomAgent, OtherRandomAgent)
+    assert len(tournament.results) == 6 * 6
+    for record in tournament.results:
+        assert tournament._scheduled_game(record["game"]) == (
+            record["game"],
+            *(
+                agent
+                for name in (record["agent_1"], record["agent_2"])
+                for agent in agents
+                if agent.__name__ == name
+            ),
+            record["seed"],
+        )
+
+    # resuming in the extra rounds plays the same games
+    lines = checkpoint.read_text().splitlines()
+    checkpoint.write_text("\n".join(lines[:30]) + "\n")
+    resumed = Tournament(
+        agents,
+        games_per_pairing=6,
+        seed=2,
+        checkpoint=checkpoint,
+        sprt=SPRT(elo0=-100, elo1=100),
+    )
+    resumed.run()
+    assert sorted(resumed.results, key=lambda record: record["game"]) == sorted(
+        tournament.results, key=lambda record: record["game"]
+    )
+
+
+def test_telemetry():
+    tournament = Tournament(AGENTS, games_per_pairing=2, seed=1, telemetry=True)
+    tournament.run()
+    telemetry = tournament.get_telemetry()
+    names = {agent.__name__: agent for agent in AGENTS}
+    moves = {agent: 0 for agent in AGENTS}
+    for record in tournament.results:
+        # player 1 makes the odd moves
+        played = record["turns"]
+        moves[names[record["agent_1"]]] += (played + 1) // 2
+        moves[names[record["agent_2"]]] += played // 2
+    for agent in AGENTS:
+        assert telemetry[agent].counters == {"games": 4}
+        assert len(telemetry[agent].samples["move_time"]) == moves[agent]
+
+    # the same measurements are collected by the workers
+    parallel = Tournament(
+        AGENTS, games_per_pairing=2, num_workers=2, seed=1, telemetry=True
+    )
+    parallel.run()
+    for agent in AGENTS:
+        assert parallel.get_telemetry()[agent].counters == {"games": 4}
+        assert len(parallel.get_telemetry()[agent].samples["move_time"]) == moves[agent]
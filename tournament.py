@@ -1,21 +1,166 @@
 """Module to play a tournament between agents."""
 
+import json
+import multiprocessing as mp
+import os
+import random
+import time
 from collections import Counter
+from functools import partial
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
 from Agents import RandomAgent, RandomShortestPathAgent
 from Agents.agent import Agent
+from Agents.telemetry import Telemetry
 from Environment import QuoridorEnv, env
 from play import HumanAgent
+from ratings import SPRT, elo_ratings
 
 AGENTS = [RandomAgent, RandomShortestPathAgent]
 
 
+def game_seed(seed: int, game: int) -> int:
+    """
+    Derive the seed of a game from the seed of the tournament.
+
+    Parameters
+    ----------
+    seed : int
+        The seed of the tournament.
+    game : int
+        The index of the game in the schedule.
+
+    Returns
+    -------
+    int
+        The seed of the game, independent of the order the games are played in.
+    """
+    return int(np.random.SeedSequence([seed, game]).generate_state(1)[0])
+
+
+def play_game(
+    agent_1: type,
+    agent_2: type,
+    seed: Optional[int] = None,
+    telemetry: Optional[Sequence[Telemetry]] = None,
+) -> Tuple[int, int]:
+    """
+    Play a game between two agents.
+
+    Parameters
+    ----------
+    agent_1 : type
+        The agent class of player 1.
+    agent_2 : type
+        The agent class of player 2.
+    seed : int, optional
+        The seed of the `random` and `numpy.random` generators the agents draw from.
+    telemetry : Sequence[Telemetry], optional
+        The collectors of player 1 and 2. The agents publish their measurements to
+        them, and the seconds every move took are sampled as "move_time".
+
+    Returns
+    -------
+    (int, int)
+        The winning player (1 or 2) and the number of moves played.
+    """
+    if seed is not None:
+        random.seed(seed)
+        np.random.seed(seed)
+    quoridor_env: QuoridorEnv = env()
+
+    agents = {
+        "player_1": agent_1(quoridor_env.action_spaces["player_1"], 1),
+        "player_2": agent_2(quoridor_env.action_spaces["player_2"], 2),
+    }
+
+    collectors = {}
+    if telemetry is not None:
+        collectors = dict(zip(agents, telemetry))
+        for agent, collector in collectors.items():
+            agents[agent].set_telemetry(collector)
+
+    quoridor_env.reset()
+    for agent in quoridor_env.agent_iter():
+        observation, reward, termination, truncation, info = quoridor_env.last()
+        if termination:
+            winner = 1 if quoridor_env.rewards["player_1"] == 1 else 2
+            break
+        if collectors:
+            start = time.perf_counter()
+            action = agents[agent].act(observation, reward, info)
+            collectors[agent].observe("move_time", time.perf_counter() - start)
+        else:
+            action = agents[agent].act(observation, reward, info)
+        quoridor_env.step(action)
+    for collector in collectors.values():
+        collector.count("games")
+    for player in agents.values():
+        if hasattr(player, "close"):
+            player.close()
+    return winner, len(quoridor_env.unwrapped.board.moves)
+
+
+def _play_scheduled_game(
+    game: Tuple[int, type, type, int], telemetry: bool = False
+) -> Tuple[int, int, int, Optional[List[Dict]]]:
+    """
+    Play a game of the schedule, in a worker process of the pool.
+
+    Parameters
+    ----------
+    game : (int, type, type, int)
+        The index of the game, the agent classes of player 1 and 2 and the seed.
+    telemetry : bool, optional
+        Whether to collect the measurements of the agents.
+
+    Returns
+    -------
+    (int, int, int, List[Dict] or None)
+        The index of the game, the winning player, the number of moves played and the
+        measurements of player 1 and 2, see `Telemetry.to_dict`.
+    """
+    index, agent_1, agent_2, seed = game
+    collectors = [Telemetry(), Telemetry()] if telemetry else None
+    winner, turns = play_game(agent_1, agent_2, seed, collectors)
+    if collectors is None:
+        return index, winner, turns, None
+    return index, winner, turns, [collector.to_dict() for collector in collectors]
+
+
 class Tournament:
     """
-    A tournament is a round-robin competition where every agent plays every other agent twice
-    (once as player 1 and once as player 2). The ranking is based on the total number of wins.
+    A tournament is a round-robin competition where every agent plays every other agent
+    `games_per_pairing` times as player 1 and as many times as player 2. The ranking is
+    based on the total number of wins.
+
+    Every game of the schedule has its own seed derived from the seed of the tournament,
+    which seeds the global `random` and `numpy.random` generators before the game. The
+    results are reproducible whatever the number of workers for agents that only draw
+    from these generators and do not depend on time, such as `MCTSAgent` with a
+    `max_iterations` limit and without worker processes. With a checkpoint file
+    every finished game is appended to it as a line of JSON, and a tournament that is
+    run again with the same checkpoint only plays the games that are missing.
+
+    With a SPRT a pairing stops as soon as it is decided, and the games it saves are
+    played by the close pairings in extra rounds, so the tournament plays at most as
+    many games as without a SPRT.
+
+    Besides the number of wins, the agents are rated with Elo ratings and confidence
+    intervals, see `get_ratings`. With `telemetry` the measurements the agents publish
+    in the games played by `run` are aggregated per agent, see `get_telemetry`.
     """
 
-    def __init__(self, agents: list[Agent]):
+    def __init__(
+        self,
+        agents: list[Agent],
+        games_per_pairing: int = 1,
+        num_workers: int = 1,
+        seed: int = 0,
+        checkpoint: Optional[str] = None,
+        sprt: Optional[SPRT] = None,
+        telemetry: bool = False,
+    ):
         """
         Initialize a Tournament instance.
 
@@ -23,24 +168,99 @@ class Tournament:
         ----------
         agents : list[Agent]
             List of agents participating in the tournament.
+        games_per_pairing : int, optional
+            The number of games of every ordered pair of agents (default is 1).
+        num_workers : int, optional
+            The number of worker processes playing games (default is 1, no pool).
+        seed : int, optional
+            The seed of the tournament (default is 0).
+        checkpoint : str, optional
+            The file finished games are appended to and resumed from.
+        sprt : SPRT, optional
+            The test that stops a pairing once it is decided, `games_per_pairing`
+            times the number of ordered pairs is then the budget of games, see `run`.
+        telemetry : bool, optional
+            Whether to collect the measurements of the agents (default is False).
         """
         self._agents: list[Agent] = agents
         self._ranking: Counter = Counter({agent: 0 for agent in agents})
+        self.games_per_pairing = games_per_pairing
+        self.num_workers = num_workers
+        self.seed = seed
+        self.checkpoint = checkpoint
+        self.sprt = sprt
+        self.telemetry = telemetry
+        self._telemetry: Dict[Agent, Telemetry] = {
+            agent: Telemetry() for agent in agents
+        }
+        # the records of the games played by `run`, see `_finish`
+        self.results: List[Dict] = []
+
+    def schedule(self) -> Iterator[Tuple[int, type, type, int]]:
+        """
+        Enumerate the games of the tournament.
+
+        Yields
+        ------
+        (int, type, type, int)
+            The index of the game, the agent classes of player 1 and 2 and the seed.
+        """
+        for pair in range(len(self._pairs())):
+            for game_round in range(self.games_per_pairing):
+                yield self._game(pair, game_round)
 
     def run(self):
         """
-        Run the tournament.
+        Run the tournament, skipping the games already in the checkpoint.
+
+        With a SPRT the games are played in rounds of one game per ordered pair of
+        agents, and a pairing stops as soon as the test decides which of its agents is
+        stronger. After the `games_per_pairing` rounds of the schedule, the close
+        pairings play extra rounds with the games the decided pairings saved, until
+        all pairings are decided or the budget of the schedule is spent.
         """
-        # every agent plays every other agent twice
-        for agent_1 in self._agents:
-            for agent_2 in self._agents:
-                if agent_1 == agent_2:
-                    continue
-                self.play(agent_1, agent_2)
+        for record in self._load_checkpoint():
+            self._add_result(record)
+
+        pool = mp.Pool(self.num_workers) if self.num_workers > 1 else None
+        try:
+            if self.sprt is None:
+                done = {record["game"] for record in self.results}
+                self._play_games(
+                    [game for game in self.schedule() if game[0] not in done], pool
+                )
+                return
+            pairs = self._pairs()
+            budget = len(pairs) * self.games_per_pairing
+            game_round = 0
+            while True:
+                games = [
+                    self._game(pair, game_round)
+                    for pair, (agent_1, agent_2) in enumerate(pairs)
+                    if not self.is_decided(agent_1, agent_2)
+                ]
+                if not games:
+                    break
+                if game_round >= self.games_per_pairing:
+                    # the extra rounds share the games the decided pairings saved
+                    indices = {game[0] for game in games}
+                    spent = sum(
+                        record["game"] not in indices for record in self.results
+                    )
+                    games = games[: max(0, budget - spent)]
+                    if not games:
+                        break
+                done = {record["game"] for record in self.results}
+                self._play_games([game for game in games if game[0] not in done], pool)
+                game_round += 1
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
 
-    def play(self, agent_1: Agent, agent_2: Agent):
+    def is_decided(self, agent_1: Agent, agent_2: Agent) -> bool:
         """
-        Play a game between two agents.
+        Check whether the SPRT of the tournament decided which agent is stronger.
 
         Parameters
         ----------
@@ -48,26 +268,39 @@ class Tournament:
             First agent.
         agent_2 : Agent
             Second agent.
+
+        Returns
+        -------
+        bool
+            True if the pairing is decided, always False without a SPRT.
         """
-        quoridor_env: QuoridorEnv = env()
+        if self.sprt is None:
+            return False
+        wins = self.get_wins()
+        i, j = self._agents.index(agent_1), self._agents.index(agent_2)
+        return self.sprt.decide(wins[i, j], wins[j, i]) is not None
 
-        agents = {
-            "player_1": agent_1(quoridor_env.action_spaces["player_1"], 1),
-            "player_2": agent_2(quoridor_env.action_spaces["player_2"], 2),
-        }
+    def play(self, agent_1: Agent, agent_2: Agent, seed: Optional[int] = None) -> int:
+        """
+        Play a game between two agents.
 
-        quoridor_env.reset()
-        for agent in quoridor_env.agent_iter():
-            observation, reward, termination, truncation, info = quoridor_env.last()
-            if termination:
-                if quoridor_env.rewards["player_1"] == 1:
-                    self._ranking[agent_1] += 1
-                else:
-                    self._ranking[agent_2] += 1
+        Parameters
+        ----------
+        agent_1 : Agent
+            First agent.
+        agent_2 : Agent
+            Second agent.
+        seed : int, optional
+            The seed of the game.
 
-                break
-            action = agents[agent].act(observation, reward, info)
-            quoridor_env.step(action)
+        Returns
+        -------
+        int
+            The winning player, 1 or 2.
+        """
+        winner, _ = play_game(agent_1, agent_2, seed)
+        self._ranking[agent_1 if winner == 1 else agent_2] += 1
+        return winner
 
     def get_ranking(self):
         """
@@ -81,8 +314,234 @@ class Tournament:
         """
         return self._ranking.most_common()
 
+    def get_wins(self) -> np.ndarray:
+        """
+        Count the wins of the games played by `run`.
+
+        Returns
+        -------
+        np.ndarray
+            The (N, N) number of wins, where ``wins[i, j]`` is how often agent ``i``
+            beat agent ``j``, whatever the colours.
+        """
+        indices = {agent.__name__: i for i, agent in enumerate(self._agents)}
+        wins = np.zeros((len(self._agents), len(self._agents)), dtype=int)
+        for record in self.results:
+            players = (indices[record["agent_1"]], indices[record["agent_2"]])
+            winner = players[record["winner"] - 1]
+            wins[winner, players[0] + players[1] - winner] += 1
+        return wins
+
+    def get_ratings(self, confidence: float = 0.95):
+        """
+        Get the Elo ratings of the agents from the games played by `run`.
+
+        Parameters
+        ----------
+        confidence : float, optional
+            The confidence level of the intervals (default is 0.95).
+
+        Returns
+        -------
+        list[tuple[Agent, float, float, float]]
+            A list of tuples representing the agent, its rating and the lower and upper
+            bounds of its confidence interval, sorted by rating in descending order.
+        """
+        ratings, lower, upper = elo_ratings(self.get_wins(), confidence)
+        return sorted(
+            zip(self._agents, ratings, lower, upper),
+            key=lambda rating: rating[1],
+            reverse=True,
+        )
+
+    def get_telemetry(self) -> Dict[Agent, Telemetry]:
+        """
+        Get the measurements of the agents in the games played by `run`, with
+        `telemetry` enabled. The games resumed from a checkpoint have none.
+
+        Returns
+        -------
+        Dict[Agent, Telemetry]
+            The collector of every agent, with the measurements of all its games.
+        """
+        return self._telemetry
+
+    def _pairs(self) -> List[Tuple[type, type]]:
+        """
+        List the ordered pairs of agents, in the order of the schedule.
+
+        Returns
+        -------
+        List[(type, type)]
+            The agent classes of player 1 and 2.
+        """
+        return [
+            (agent_1, agent_2)
+            for agent_1 in self._agents
+            for agent_2 in self._agents
+            if agent_1 != agent_2
+        ]
+
+    def _game(self, pair: int, game_round: int) -> Tuple[int, type, type, int]:
+        """
+        Get a game of an ordered pair of agents.
+
+        The games of the schedule are numbered pair by pair, and the games of the
+        extra rounds of a SPRT follow them round by round.
+
+        Parameters
+        ----------
+        pair : int
+            The index of the ordered pair, see `_pairs`.
+        game_round : int
+            The round of the game, from `games_per_pairing` on an extra round.
+
+        Returns
+        -------
+        (int, type, type, int)
+            The index of the game, the agent classes of player 1 and 2 and the seed.
+        """
+        pairs = self._pairs()
+        gpp = self.games_per_pairing
+        if game_round < gpp:
+            index = pair * gpp + game_round
+        else:
+            index = len(pairs) * gpp + (game_round - gpp) * len(pairs) + pair
+        agent_1, agent_2 = pairs[pair]
+        return index, agent_1, agent_2, game_seed(self.seed, index)
+
+    def _scheduled_game(self, index: int) -> Optional[Tuple[int, type, type, int]]:
+        """
+        Get a game by its index, the inverse of `_game`.
+
+        Parameters
+        ----------
+        index : int
+            The index of the game.
+
+        Returns
+        -------
+        (int, type, type, int) or None
+            The game, None if the tournament has no game with this index.
+        """
+        num_pairs = len(self._pairs())
+        gpp = self.games_per_pairing
+        if 0 <= index < num_pairs * gpp:
+            return self._game(*divmod(index, gpp))
+        if self.sprt is not None and index >= num_pairs * gpp:
+            extra_round, pair = divmod(index - num_pairs * gpp, num_pairs)
+            return self._game(pair, gpp + extra_round)
+        return None
+
+    def _play_games(self, games: List[Tuple[int, type, type, int]], pool):
+        """
+        Play games of the schedule, on the pool if there is one.
+
+        Parameters
+        ----------
+        games : List[(int, type, type, int)]
+            The games.
+        pool : multiprocessing.pool.Pool or None
+            The pool of worker processes.
+        """
+        play = partial(_play_scheduled_game, telemetry=self.telemetry)
+        if pool is None or len(games) < 2:
+            results = map(play, games)
+        else:
+            results = pool.imap_unordered(play, games)
+        by_index = {game[0]: game for game in games}
+        for index, winner, turns, telemetry in results:
+            game = by_index[index]
+            if telemetry is not None:
+                for agent, measurements in zip(game[1:3], telemetry):
+                    self._telemetry[agent].merge(Telemetry.from_dict(measurements))
+            self._finish(game, winner, turns)
+
+    def _finish(self, game: Tuple[int, type, type, int], winner: int, turns: int):
+        """
+        Record a finished game and append it to the checkpoint.
+
+        Parameters
+        ----------
+        game : (int, type, type, int)
+            The game of the schedule.
+        winner : int
+            The winning player, 1 or 2.
+        turns : int
+            The number of moves played.
+        """
+        index, agent_1, agent_2, seed = game
+        record = {
+            "game": index,
+            "agent_1": agent_1.__name__,
+            "agent_2": agent_2.__name__,
+            "seed": seed,
+            "winner": winner,
+            "turns": turns,
+        }
+        self._add_result(record)
+        if self.checkpoint:
+            with open(self.checkpoint, "a", encoding="utf-8") as file:
+                file.write(json.dumps(record) + "\n")
+
+    def _add_result(self, record: Dict):
+        """
+        Add the record of a game to the results and the ranking.
+
+        Parameters
+        ----------
+        record : Dict
+            The record of the game.
+        """
+        self.results.append(record)
+        names = {agent.__name__: agent for agent in self._agents}
+        winner = record["agent_1"] if record["winner"] == 1 else record["agent_2"]
+        self._ranking[names[winner]] += 1
+
+    def _load_checkpoint(self) -> List[Dict]:
+        """
+        Read the games finished by an earlier run from the checkpoint.
+
+        Returns
+        -------
+        List[Dict]
+            The records of the finished games that are not in the results yet. A last
+            line cut short by an interruption is removed from the checkpoint.
+        """
+        if not self.checkpoint or not os.path.exists(self.checkpoint):
+            return []
+        with open(self.checkpoint, encoding="utf-8") as file:
+            lines = file.read().split("\n")
+        if lines[-1]:
+            # drop the line cut short, the next record would be appended to it
+            with open(self.checkpoint, "w", encoding="utf-8") as file:
+                file.writelines(line + "\n" for line in lines[:-1])
+        done = {record["game"] for record in self.results}
+        records = []
+        for line in lines[:-1]:
+            record = json.loads(line)
+            index = record["game"]
+            game = self._scheduled_game(index)
+            if game is None:
+                raise ValueError(f"Game {index} of the checkpoint is not scheduled")
+            _, agent_1, agent_2, seed = game
+            if (record["agent_1"], record["agent_2"], record["seed"]) != (
+                agent_1.__name__,
+                agent_2.__name__,
+                seed,
+            ):
+                raise ValueError(
+                    f"Game {index} of the checkpoint belongs to another tournament"
+                )
+            if index not in done:
+                done.add(index)
+                records.append(record)
+        return records
+
 
 if __name__ == "__main__":
-    tournament = Tournament(AGENTS)
+    tournament = Tournament(AGENTS, games_per_pairing=5, num_workers=os.cpu_count())
     tournament.run()
     print(tournament.get_ranking())
+    for agent, rating, lower, upper in tournament.get_ratings():
+        print(f"{agent.__name__}: {rating:.0f} Elo ({lower:.0f} to {upper:.0f})")